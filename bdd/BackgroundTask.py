@@ -0,0 +1,25 @@
+from PyQt6.QtCore import QThread, pyqtSignal
+
+
+class BackgroundTask(QThread):
+    """
+    Runs ``func(progress)`` in a background thread.
+
+    ``func`` opens its own connections and may call ``progress(message)`` to
+    report what it is doing; ``done`` is emitted with its result and an error
+    message ('' on success).
+    """
+    progress = pyqtSignal(str)
+    done = pyqtSignal(object, str)
+
+    def __init__(self, func, parent=None):
+        super().__init__(parent)
+        self.func = func
+
+    def run(self):
+        result, error = None, ''
+        try:
+            result = self.func(self.progress.emit)
+        except Exception as e:
+            error = str(e) or type(e).__name__
+        self.done.emit(result, error)
@@ -1,17 +1,145 @@
 from PyQt6.QtWidgets import (
-    QApplication, QWidget, QVBoxLayout, QToolButton, QMenu, QLabel, QWidgetAction,
-    QHBoxLayout, QStyle, QSizePolicy, QScrollArea, QCheckBox, QRadioButton,
-    QLineEdit
+    QApplication, QWidget, QToolButton, QMenu, QWidgetAction,
+    QHBoxLayout, QSizePolicy, QListView, QLineEdit
 )
-from PyQt6.QtGui import QAction, QIcon, QFontMetrics
-from PyQt6.QtCore import Qt, QTimer, QPoint, pyqtSignal
+from PyQt6.QtCore import Qt, QAbstractListModel, QModelIndex, pyqtSignal
 import sys
 
 
+class TrigramIndex:
+    """
+    Substring search over the labels. Each trigram of the lowercased labels
+    lists the rows containing it (ascending): a search only checks the rows
+    of the rarest trigram of the text. Texts shorter than 3 characters match
+    too many labels for an index to help, they are scanned.
+    """
+
+    def __init__(self):
+        self.texts = []
+        self.grams = {}
+
+    def add(self, text):
+        row = len(self.texts)
+        text = text.lower()
+        self.texts.append(text)
+        for gram in {text[i:i + 3] for i in range(len(text) - 2)}:
+            self.grams.setdefault(gram, []).append(row)
+
+    def search(self, text):
+        """Rows (ascending) whose text contains ``text``."""
+        text = text.lower()
+        if not text:
+            return range(len(self.texts))
+        if len(text) < 3:
+            return [row for row, t in enumerate(self.texts) if text in t]
+        rarest = min((self.grams.get(text[i:i + 3], ()) for i in range(len(text) - 2)), key=len)
+        texts = self.texts
+        return [row for row in rarest if text in texts[row]]
+
+
+class CheckListModel(QAbstractListModel):
+    """Items (label, value, tooltip) of a CheckComboBox and their check state, with the rows of each value."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.items = []         # list of (label, value, tooltip)
+        self.rows = {}          # value -> row
+        self.checked = set()    # checked rows
+        self.search_index = TrigramIndex()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.items)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        if role == Qt.ItemDataRole.DisplayRole:
+            return self.items[index.row()][0]
+        if role == Qt.ItemDataRole.CheckStateRole:
+            return Qt.CheckState.Checked if index.row() in self.checked else Qt.CheckState.Unchecked
+        if role == Qt.ItemDataRole.ToolTipRole:
+            return self.items[index.row()][2]
+        return None
+
+    def addItems(self, items):
+        """Add (label, value, tooltip) items, in one insertion."""
+        if not items:
+            return
+        first = len(self.items)
+        self.beginInsertRows(QModelIndex(), first, first + len(items) - 1)
+        for row, (label, value, tooltip) in enumerate(items, first):
+            self.items.append((label, value, tooltip))
+            self.rows.setdefault(value, row)
+            self.search_index.add(label)
+        self.endInsertRows()
+
+    def setCheckedRows(self, rows):
+        """Check ``rows`` only; only the rows whose state changes are repainted."""
+        rows = set(rows)
+        changed = rows ^ self.checked
+        self.checked = rows
+        for row in changed:
+            index = self.index(row)
+            self.dataChanged.emit(index, index, [Qt.ItemDataRole.CheckStateRole])
+
+    def checkedRows(self):
+        return sorted(self.checked)
+
+
+class CheckFilterModel(QAbstractListModel):
+    """
+    Rows of a CheckListModel matching the search text. Unlike a
+    QSortFilterProxyModel, nothing is asked row by row: the matching rows come
+    from the trigram index and the model is only reset with them.
+    """
+
+    def __init__(self, source: CheckListModel, parent=None):
+        super().__init__(parent)
+        self.source = source
+        self.text = ''
+        self.rows = range(0)
+        self.positions = None   # source row -> row here, built when needed
+        source.dataChanged.connect(self._sourceDataChanged)
+        source.rowsInserted.connect(lambda *args: self.setFilter(self.text))
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        return self.source.data(self.source.index(self.rows[index.row()]), role)
+
+    def sourceRow(self, row):
+        return self.rows[row]
+
+    def setFilter(self, text):
+        self.beginResetModel()
+        self.text = text
+        self.rows = self.source.search_index.search(text)
+        self.positions = None
+        self.endResetModel()
+
+    def _sourceDataChanged(self, top, bottom, roles=()):
+        if isinstance(self.rows, range):
+            row = top.row() - self.rows.start   # no filter: same rows
+        else:
+            if self.positions is None:
+                self.positions = {source_row: row for row, source_row in enumerate(self.rows)}
+            row = self.positions.get(top.row())
+        if row is not None and 0 <= row < len(self.rows):
+            index = self.index(row)
+            self.dataChanged.emit(index, index, roles)
+
 
 class CheckComboBox(QWidget):
     """
     Widget simulant un QComboBox à sélection multiple ou simple.
+
+    The items are rows of a model shown by a QListView (only the visible
+    rows are painted), searched with a trigram index, and the selection is
+    a set of rows: adding, filtering and selecting do not depend on a widget
+    per item.
     """
     selectionChanged = pyqtSignal(list)
 
@@ -23,10 +151,11 @@ class CheckComboBox(QWidget):
         parent=None
     ):
         super().__init__(parent)
-        self._items = []          # list of (label, value, tooltip)
-        self._buttons = []        # QCheckBox or QRadioButton
+        self.placeholder = placeholder
         self.maxVisibleItems = maxVisibleItems
         self.multiSelect = multiSelect
+        self.model = CheckListModel(self)
+        self.filter = CheckFilterModel(self.model, self)
 
         # Bouton principal stylisé comme QComboBox
         self.button = QToolButton(self)
@@ -40,36 +169,33 @@ class CheckComboBox(QWidget):
 
         # Menu principal
         self.menu = QMenu(self)
-        self.menu.setStyleSheet("QMenu { menu-scrollable: 1; }")
         self.button.setMenu(self.menu)
         self.menu.aboutToShow.connect(self._syncMenuWidth)
 
-        # Zone scrollable pour les boutons
-        self.container = QWidget()
-        self.vbox = QVBoxLayout(self.container)
-        self.vbox.setContentsMargins(0, 0, 0, 0)
-        self.vbox.setSpacing(0)
-
         # -- Add search field above the list --
         self.search_field = QLineEdit(self)
         self.search_field.setPlaceholderText("Search…")
         self.search_field.textChanged.connect(self._filterItems)
+        self.search_field.returnPressed.connect(self._toggleFirst)
         search_action = QWidgetAction(self.menu)
         search_action.setDefaultWidget(self.search_field)
         self.menu.addAction(search_action)                 # put it at the top of the layout
 
-
-        self.scroll = QScrollArea()
-        self.scroll.setWidget(self.container)
-        self.scroll.setWidgetResizable(True)
-        self.scroll.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
-        self.scroll.setVerticalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAsNeeded)
+        # Liste des items : une ligne du modèle par item, pas un widget
+        self.view = QListView()
+        self.view.setModel(self.filter)
+        self.view.setUniformItemSizes(True)
+        self.view.setEditTriggers(QListView.EditTrigger.NoEditTriggers)
+        self.view.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
+        self.view.setStyleSheet("QListView::item { padding: 4px; }")
+        self.view.clicked.connect(self._toggle)
+        self.view.activated.connect(self._toggle)
         self._updateScrollHeight()
 
         # Intégration dans le menu via QWidgetAction
-        scroll_action = QWidgetAction(self.menu)
-        scroll_action.setDefaultWidget(self.scroll)
-        self.menu.addAction(scroll_action)
+        list_action = QWidgetAction(self.menu)
+        list_action.setDefaultWidget(self.view)
+        self.menu.addAction(list_action)
 
         self.menu.aboutToShow.connect(self.search_field.setFocus)
 
@@ -81,7 +207,7 @@ class CheckComboBox(QWidget):
     def _syncMenuWidth(self):
         width = self.button.width()
         self.menu.setMinimumWidth(width)
-        self.scroll.setMinimumWidth(width)
+        self.view.setMinimumWidth(width)
 
     def addItem(self, label: str, value=None, tooltip: str = None):
         """
@@ -90,88 +216,70 @@ class CheckComboBox(QWidget):
         - value: valeur retournée (par défaut = label)
         - tooltip: texte affiché au survol (optionnel)
         """
-        if value is None:
-            value = label
-
-        # Choix du widget selon multiSelect
-        if self.multiSelect:
-            btn = QCheckBox(label)
-        else:
-            btn = QRadioButton(label)
-            btn.setAutoExclusive(False)
-        btn.setStyleSheet(type(btn).__name__ + " { padding: 4px; }")
-        if tooltip:
-            btn.setToolTip(tooltip)
-        btn.toggled.connect(lambda checked, b=btn: self._onToggled(b, checked))
-
-        self.vbox.addWidget(btn)
-        self._items.append((label, value, tooltip))
-        self._buttons.append(btn)
-        self._updateScrollHeight()
-
-    def _filterItems(self, text: str):
-        """Show only the buttons whose label contains the search text."""
-        text = text.lower()
-        for btn in self._buttons:
-            btn.setVisible(text in btn.text().lower())
-        self._updateScrollHeight()    # adjust scroll area if nécessaire
+        self.addItems([(label, value, tooltip)])
 
     def addItems(self, items):
+        rows = []
         for it in items:
             if isinstance(it, str):
-                self.addItem(it)
-            elif len(it) == 2:
-                self.addItem(it[0], it[1])
-            elif len(it) == 3:
-                self.addItem(it[0], it[1], it[2])
+                rows.append((it, it, None))
+            elif len(it) in (2, 3):
+                label, value, tooltip = (*it, None)[:3]
+                rows.append((label, label if value is None else value, tooltip))
             else:
                 raise ValueError("Items must be str or tuple(label, value[, tooltip])")
+        self.model.addItems(rows)
+        self._updateScrollHeight()
+
+    def _filterItems(self, text: str):
+        """Show only the items whose label contains the search text."""
+        self.filter.setFilter(text)
+        self._updateScrollHeight()    # adjust the list if nécessaire
 
     def _updateScrollHeight(self):
-        if not self._buttons:
-            return
-        fm = self.container.fontMetrics()
-        item_h = fm.height() + 8
-        self.scroll.setMaximumHeight(item_h * self.maxVisibleItems)
-
-    def _onToggled(self, btn, checked):
-        # Sélection simple : décocher les autres
-        if not self.multiSelect and checked:
-            for b in self._buttons:
-                if b is not btn:
-                    b.blockSignals(True)
-                    b.setChecked(False)
-                    b.blockSignals(False)
+        rows = max(1, min(self.maxVisibleItems, self.filter.rowCount()))
+        item_h = self.view.sizeHintForRow(0) if self.filter.rowCount() else self.view.fontMetrics().height() + 8
+        self.view.setFixedHeight(item_h * rows + 2 * self.view.frameWidth())
+
+    def _toggle(self, index):
+        row = self.filter.sourceRow(index.row())
+        if not self.multiSelect and row not in self.model.checked:
+            # Sélection simple : décocher les autres
+            self.model.setCheckedRows({row})
             # fermer le menu
             self.menu.hide()
+        else:
+            self.model.setCheckedRows(self.model.checked ^ {row})
         self._updateDisplay()
         self.search_field.setFocus()
 
+    def _toggleFirst(self):
+        if self.filter.rowCount():
+            self._toggle(self.filter.index(0))
+
     def _updateDisplay(self):
         labels = []
         values = []
-        for (label, value, _), btn in zip(self._items, self._buttons):
-            if btn.isChecked():
-                labels.append(label)
-                values.append(value)
+        for row in self.model.checkedRows():
+            label, value, _ = self.model.items[row]
+            labels.append(label)
+            values.append(value)
 
-        text = ", ".join(labels) if labels else "Sélectionnez..."
+        text = ", ".join(labels) if labels else self.placeholder
         fm = self.button.fontMetrics()
         avail = max(10, self.button.width() - 20)
         self.button.setText(fm.elidedText(text, Qt.TextElideMode.ElideRight, avail))
         self.selectionChanged.emit(values)
 
     def selectedValues(self):
-        return [v for (_, v, _), b in zip(self._items, self._buttons) if b.isChecked()]
+        return [self.model.items[row][1] for row in self.model.checkedRows()]
 
     def setSelectedValues(self, values):
-        for (_, v, _), b in zip(self._items, self._buttons):
-            b.setChecked(v in values)
+        self.model.setCheckedRows(self.model.rows[v] for v in values if v in self.model.rows)
         self._updateDisplay()
 
     def clearSelection(self):
-        for b in self._buttons:
-            b.setChecked(False)
+        self.model.setCheckedRows(())
         self._updateDisplay()
 
     def resizeEvent(self, event):
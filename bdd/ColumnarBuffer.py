@@ -0,0 +1,156 @@
+import sys
+from array import array
+
+NoneType = type(None)
+KIND_TYPES = {'int': int, 'float': float, 'text': str}
+
+
+class Column:
+    """
+    One column of a ColumnarBuffer.
+
+    Storage depends on the values met so far:
+    - 'int'    : array('q') + null bitmap (also used while the column only holds NULLs)
+    - 'float'  : array('d') + null bitmap
+    - 'text'   : dictionary encoded, array('I') of codes into a list of distinct strings + null bitmap
+    - 'object' : plain list, for mixed types, blobs and text with too many distinct values
+    """
+    # text columns with more distinct values than this ratio of their values are stored as a plain list
+    TEXT_RATIO = 0.5
+    TEXT_CHECK_ROWS = 4096
+
+    def __init__(self):
+        self.kind = 'int'
+        self.data = array('q')
+        self.nulls = bytearray()   # bit i set when row i is NULL
+        self.strings = []          # text: code -> string
+        self.codes = {}            # text: string -> code
+        self.non_null = 0
+
+    def __len__(self):
+        return len(self.data)
+
+    def nbytes(self):
+        """Approximate memory used by the values of the column."""
+        if self.kind == 'object':
+            return sys.getsizeof(self.data) + sum(map(sys.getsizeof, self.data))
+        size = self.data.itemsize * len(self.data) + len(self.nulls)
+        if self.kind == 'text':
+            size += sum(map(sys.getsizeof, self.strings)) * 2   # strings + their codes dict
+        return size
+
+    def _grow_nulls(self, size):
+        missing = (size + 7) // 8 - len(self.nulls)
+        if missing > 0:
+            self.nulls.extend(bytes(missing))
+
+    def _set_null(self, row):
+        self.nulls[row >> 3] |= 1 << (row & 7)
+
+    def is_null(self, row):
+        if self.kind == 'object':
+            return self.data[row] is None
+        return bool(self.nulls[row >> 3] & (1 << (row & 7)))
+
+    def value(self, row):
+        if self.kind == 'object':
+            return self.data[row]
+        if self.nulls[row >> 3] & (1 << (row & 7)):
+            return None
+        if self.kind == 'text':
+            return self.strings[self.data[row]]
+        return self.data[row]
+
+    def extend(self, values):
+        types = set(map(type, values))
+        has_null = NoneType in types
+        types.discard(NoneType)
+        if self.kind != 'object' and types:
+            if not self.non_null and len(types) == 1:
+                # first non NULL values: they give the type of the column
+                self._set_kind(types.pop())
+            elif types != {KIND_TYPES[self.kind]}:
+                self._to_object()
+        if self.kind == 'object':
+            self.data.extend(values)
+            return
+
+        start = len(self.data)
+        self._grow_nulls(start + len(values))
+        n_null = 0
+        if has_null:
+            null_rows = [i for i, v in enumerate(values) if v is None]
+            for i in null_rows:
+                self._set_null(start + i)
+            n_null = len(null_rows)
+            fill = '' if self.kind == 'text' else KIND_TYPES[self.kind]()
+            values = [fill if v is None else v for v in values]
+        if self.kind == 'text':
+            codes = self.codes
+            for value in dict.fromkeys(values).keys() - codes.keys():
+                codes[value] = len(self.strings)
+                self.strings.append(value)
+            self.data.extend(map(codes.__getitem__, values))
+        else:
+            self.data.extend(values)
+        self.non_null += len(values) - n_null
+
+        if self.kind == 'text' and self.non_null >= self.TEXT_CHECK_ROWS \
+                and len(self.strings) > self.TEXT_RATIO * self.non_null:
+            self._to_object()
+
+    def _set_kind(self, typ):
+        n = len(self.data)
+        if typ is float:
+            self.kind, self.data = 'float', array('d', bytes(8 * n))
+        elif typ is str:
+            self.kind, self.data = 'text', array('I', bytes(4 * n))
+        elif typ is not int:
+            self._to_object()
+
+    def _to_object(self):
+        self.data = [self.value(row) for row in range(len(self.data))]
+        self.kind = 'object'
+        self.nulls = bytearray()
+        self.strings = []
+        self.codes = {}
+
+
+class ColumnarBuffer:
+    """
+    Column-oriented storage of query results.
+
+    Integers and reals are kept in typed arrays and text is dictionary encoded,
+    with a null bitmap per column, instead of one tuple of Python objects per
+    row. The number of columns is taken from the first rows appended.
+    """
+
+    def __init__(self, rows=None):
+        self.columns = []
+        self._len = 0
+        if rows:
+            self.extend(rows)
+
+    def __len__(self):
+        return self._len
+
+    def extend(self, rows):
+        if not rows:
+            return
+        if not self.columns:
+            self.columns = [Column() for _ in rows[0]]
+        for i, column in enumerate(self.columns):
+            column.extend([r[i] for r in rows])
+        self._len += len(rows)
+
+    def nbytes(self):
+        return sum(c.nbytes() for c in self.columns)
+
+    def value(self, row, col):
+        return self.columns[col].value(row)
+
+    def row(self, row):
+        return tuple(c.value(row) for c in self.columns)
+
+    def __getitem__(self, row):
+        return self.row(row)
@@ -0,0 +1,169 @@
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from urllib.parse import quote
+from dataTransfer import quote_ident
+
+# Named connection profiles; the ``connection_profiles`` section of .db_manager_config.yaml
+# overrides or adds entries, ``connection_profile`` is the default one and
+# ``database_profiles`` maps a database path to its profile.
+#   journal_mode : None keeps the mode stored in the file (WAL is persistent)
+#   cache_size   : pages, or KiB when negative
+#   mmap_size    : bytes of the file read through mmap, 0 to disable
+#   temp_store   : MEMORY made large GROUP BY / ORDER BY sorts slower (and slower at each run) than DEFAULT
+#   immutable    : the file is opened read-only and never checked for changes (archived files)
+#   cached_statements : prepared statements kept by each connection (sqlite3 keeps 128), so the
+#                  saved / predefined queries run again with other parameters are not parsed again
+PROFILES = {
+    'default': {'journal_mode': None, 'synchronous': None, 'cache_size': -65536, 'mmap_size': 268435456,
+                'temp_store': 'DEFAULT', 'busy_timeout': 5000, 'immutable': False, 'cached_statements': 256},
+    'wal': {'journal_mode': 'WAL', 'synchronous': 'NORMAL', 'cache_size': -65536, 'mmap_size': 268435456,
+            'temp_store': 'DEFAULT', 'busy_timeout': 5000, 'immutable': False, 'cached_statements': 256},
+    'archive': {'journal_mode': None, 'synchronous': None, 'cache_size': -131072, 'mmap_size': 1073741824,
+                'temp_store': 'DEFAULT', 'busy_timeout': 0, 'immutable': True, 'cached_statements': 256},
+}
+JOURNAL_MODES = {'DELETE', 'TRUNCATE', 'PERSIST', 'MEMORY', 'WAL', 'OFF'}
+SYNCHRONOUS = {'OFF', 'NORMAL', 'FULL', 'EXTRA'}
+TEMP_STORES = {'DEFAULT', 'FILE', 'MEMORY'}
+
+
+def profiles(config):
+    """Built-in profiles updated with the ones of ``config``."""
+    merged = {name: dict(profile) for name, profile in PROFILES.items()}
+    for name, profile in (config.get('connection_profiles') or {}).items():
+        merged[name] = {**merged.get(name, PROFILES['default']), **(profile or {})}
+    return merged
+
+
+def profile_for(config, db_path):
+    """(name, profile) used to open ``db_path``."""
+    available = profiles(config)
+    name = (config.get('database_profiles') or {}).get(str(db_path)) or config.get('connection_profile', 'default')
+    if name not in available:
+        name = 'default'
+    return name, available[name]
+
+
+def read_only_uri(db_path, immutable=False):
+    uri = f"file:{quote(Path(db_path).resolve().as_posix())}?mode=ro"
+    return uri + "&immutable=1" if immutable else uri
+
+
+def attach(conn, alias, db_path, read_only=False):
+    """ATTACH ``db_path`` as ``alias`` (read-only connections attach it read-only too)."""
+    conn.execute(f"ATTACH DATABASE ? AS {quote_ident(alias)}", (read_only_uri(db_path) if read_only else str(db_path),))
+
+
+def connect(db_path, profile=None, read_only=False, attached=None, **kwargs):
+    """
+    ``sqlite3.connect`` with the pragmas of ``profile`` and the databases of
+    ``attached`` (alias -> path) attached.
+
+    Read-only connections (and every connection of an immutable profile) are
+    opened through a ``mode=ro`` URI, so they can not take the write lock.
+    """
+    profile = {**PROFILES['default'], **(profile or {})}
+    read_only = read_only or profile['immutable']
+    kwargs.setdefault('cached_statements', int(profile['cached_statements']))
+    if read_only:
+        conn = sqlite3.connect(read_only_uri(db_path, profile['immutable']), uri=True, **kwargs)
+    else:
+        conn = sqlite3.connect(db_path, **kwargs)
+    try:
+        conn.execute(f"PRAGMA busy_timeout = {int(profile['busy_timeout'])}")
+        conn.execute(f"PRAGMA cache_size = {int(profile['cache_size'])}")
+        conn.execute(f"PRAGMA mmap_size = {int(profile['mmap_size'])}")
+        if str(profile['temp_store']).upper() in TEMP_STORES:
+            conn.execute(f"PRAGMA temp_store = {profile['temp_store'].upper()}")
+        if not read_only:
+            if str(profile['journal_mode']).upper() in JOURNAL_MODES:
+                conn.execute(f"PRAGMA journal_mode = {profile['journal_mode'].upper()}")
+            if str(profile['synchronous']).upper() in SYNCHRONOUS:
+                conn.execute(f"PRAGMA synchronous = {profile['synchronous'].upper()}")
+        else:
+            conn.execute("PRAGMA query_only = ON")
+        for alias, path in (attached or {}).items():
+            attach(conn, alias, path, read_only)
+    except sqlite3.Error:
+        conn.close()
+        raise
+    return conn
+
+
+class ConnectionPool:
+    """
+    Read-only connections to one database, shared by the background threads.
+
+    ``acquire`` lends an idle connection (or opens a new one) and takes it
+    back when the ``with`` block ends; ``get`` / ``put`` do the same when the
+    connection outlives a block. At most ``size`` idle connections are kept
+    open. In WAL mode the readers never block the writer nor wait for it;
+    with a rollback journal they still share the file lock with it.
+    """
+
+    def __init__(self, db_path, profile=None, size=4):
+        self.db_path = db_path
+        self.profile = profile
+        self.size = size
+        self.attached = {}   # alias -> path, attached to every connection
+        self._idle = []
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def connect(self):
+        """New read-only connection, not managed by the pool."""
+        return connect(self.db_path, self.profile, read_only=True, attached=self.attached, check_same_thread=False)
+
+    def attach(self, alias, db_path):
+        """Attach ``db_path`` to the connections lent from now on."""
+        self.attached[alias] = db_path
+        self._drop_idle()
+
+    def detach(self, alias):
+        self.attached.pop(alias, None)
+        self._drop_idle()
+
+    def _drop_idle(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+    def get(self):
+        """Idle connection of the pool, or a new one; give it back with ``put``."""
+        with self._lock:
+            conn = self._idle.pop() if self._idle else None
+        return conn if conn is not None else self.connect()
+
+    def put(self, conn):
+        try:
+            conn.set_progress_handler(None, 0)
+            if conn.in_transaction:
+                conn.rollback()
+            # lent before an attach / detach
+            schemas = {r[0] for r in conn.execute("SELECT name FROM pragma_database_list")} - {'main', 'temp'}
+        except sqlite3.Error:
+            conn.close()
+            return
+        if schemas != self.attached.keys():
+            conn.close()
+            return
+        with self._lock:
+            if not self._closed and len(self._idle) < self.size:
+                self._idle.append(conn)
+                return
+        conn.close()
+
+    @contextmanager
+    def acquire(self):
+        conn = self.get()
+        try:
+            yield conn
+        finally:
+            self.put(conn)
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+        self._drop_idle()
@@ -0,0 +1,362 @@
+import re
+import shutil
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+from itertools import permutations
+from pathlib import Path
+from dataTransfer import quote_ident, shadow_tables
+from ConnectionPool import attach
+
+PLAN_ROW = re.compile(r"(SCAN|SEARCH) (\S+)(.*)")
+TABLE_REF = re.compile(r'\b(?:FROM|JOIN)\s+("(?:[^"]|"")+"|`[^`]+`|\[[^\]]+\]|[A-Za-z_]\w*)(?:\s+(?:AS\s+)?([A-Za-z_]\w*))?',
+                       re.I)
+NOT_ALIASES = {'WHERE', 'JOIN', 'LEFT', 'RIGHT', 'FULL', 'INNER', 'OUTER', 'CROSS', 'NATURAL', 'ON', 'USING',
+               'GROUP', 'ORDER', 'LIMIT', 'HAVING', 'WINDOW', 'UNION', 'EXCEPT', 'INTERSECT', 'INDEXED', 'NOT',
+               'SET', 'VALUES', 'RETURNING'}
+STRINGS = re.compile(r"'(?:[^']|'')*'")
+
+
+class _Nulls(dict):
+    # binds NULL to every named parameter
+    def __missing__(self, key):
+        return None
+
+
+def explain(conn, sql):
+    """EXPLAIN QUERY PLAN details of ``sql``; its parameters, if any, are bound to NULL."""
+    return [r[3] for r in execute(conn, "EXPLAIN QUERY PLAN " + sql)]
+
+
+def execute(conn, sql):
+    """``conn.execute(sql)``, binding NULL to the parameters of ``sql`` if it has some."""
+    try:
+        return conn.execute(sql)
+    except sqlite3.ProgrammingError as e:
+        m = re.search(r"uses (\d+), and there are 0 supplied", str(e))
+        if m:
+            return conn.execute(sql, (None,) * int(m.group(1)))
+        if 'binding parameter' in str(e):
+            return conn.execute(sql, _Nulls())
+        raise
+
+
+def plan_score(plan):
+    """Cost of a plan: full table scans, automatic indexes and temp B-trees."""
+    score = 0
+    for detail in plan:
+        if detail.startswith('USE TEMP B-TREE'):
+            score += 2
+            continue
+        m = PLAN_ROW.match(detail)
+        if m is None:
+            continue
+        kind, rest = m.group(1), m.group(3)
+        if 'AUTOMATIC' in rest:
+            score += 2
+        elif kind == 'SCAN':
+            score += 1 if 'INDEX' in rest else 3
+    return score
+
+
+def plan_issues(plan):
+    """Readable problems of a plan."""
+    issues = []
+    for detail in plan:
+        m = PLAN_ROW.match(detail)
+        if detail.startswith('USE TEMP B-TREE'):
+            issues.append(detail.lower().replace('use ', '', 1))
+        elif m and 'AUTOMATIC' in m.group(3):
+            issues.append(f"automatic index on {m.group(2)}")
+        elif m and m.group(1) == 'SCAN' and 'INDEX' not in m.group(3):
+            issues.append(f"full scan of {m.group(2)}")
+    return issues
+
+
+def index_name(table, columns):
+    return re.sub(r'\W', '_', f"idx_{table}_{'_'.join(columns)}")
+
+
+def index_sql(table, columns, name=None):
+    name = name or index_name(table, columns)
+    return f"CREATE INDEX {quote_ident(name)} ON {quote_ident(table)} ({', '.join(map(quote_ident, columns))})"
+
+
+class IndexAdvisor:
+    """
+    Proposes indexes for a set of queries (name -> SQL).
+
+    For each query whose EXPLAIN QUERY PLAN has a full table scan, an
+    automatic index or a temp B-tree, indexes on the columns the query uses
+    are tried one after the other, keeping those that make the plan cheaper,
+    then widened to covering indexes when SQLite uses them as such. Plans do
+    not depend on the data (only on sqlite_stat1, which is copied), so the
+    candidates are tried on an empty in-memory copy of the schema.
+    The latency of the queries is then measured before and after creating
+    the proposed indexes on a scratch copy of the database made with the
+    backup API; the database itself is only changed by ``apply_indexes``.
+    ``connect(db_path, **kwargs)`` opens the database (with its profile and
+    attached databases): the databases it attaches are attached read-only to
+    the schema copy and the scratch copy too, for the queries that use them.
+    """
+    REPEAT = 5
+    MAX_COLUMNS = 4
+    CANDIDATE = "__index_advisor_candidate"
+
+    def __init__(self, db_path, queries, connect=sqlite3.connect):
+        self.db_path = db_path
+        self.queries = queries
+        self.connect = connect
+        self.attached = {}   # alias -> path of the databases attached by connect
+        self.cancelled = False
+        self._lock = threading.Lock()
+        self._conns = []
+
+    def cancel(self):
+        with self._lock:
+            self.cancelled = True
+            for conn in self._conns:
+                conn.interrupt()
+
+    def _connect(self, path, connect=sqlite3.connect, **kwargs):
+        conn = connect(path, isolation_level=None, **kwargs)
+        for alias, attached in self.attached.items():
+            attach(conn, alias, attached, read_only=True)
+        with self._lock:
+            self._conns.append(conn)
+        return conn
+
+    def _check(self):
+        if self.cancelled:
+            raise sqlite3.OperationalError("Index advisor cancelled")
+
+    # ---- schema ----
+    def _read_schema(self, src):
+        self.shadows = shadow_tables(src)
+        self.tables = {}     # table -> columns (without the INTEGER PRIMARY KEY, already indexed by rowid)
+        # virtual tables (and their shadow tables) can not be indexed
+        for (table,) in src.execute("SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%' "
+                                    "AND sql NOT LIKE 'CREATE VIRTUAL TABLE%'"):
+            if table in self.shadows:
+                continue
+            info = src.execute("SELECT name, type, pk FROM pragma_table_info(?)", (table,)).fetchall()
+            pks = [c for c in info if c[2]]
+            rowid_alias = pks[0][0] if len(pks) == 1 and pks[0][1].upper() == 'INTEGER' else None
+            self.tables[table] = [c[0] for c in info if c[0] != rowid_alias]
+
+    def _planner(self, src):
+        """Empty in-memory copy of the schema (and statistics) of ``src``."""
+        # EXPLAIN programs do not check the schema cookie: a cached statement would keep the plan it was
+        # prepared with after the candidate indexes change
+        planner = self._connect(':memory:', cached_statements=0)
+        objects = src.execute(
+            "SELECT name, sql FROM sqlite_master WHERE sql NOT NULL AND name NOT LIKE 'sqlite_%' "
+            "ORDER BY CASE type WHEN 'table' THEN 0 WHEN 'index' THEN 1 ELSE 2 END").fetchall()
+        for name, sql in objects:
+            if name not in self.shadows:   # created by their virtual table
+                planner.execute(sql)
+        if src.execute("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'").fetchone():
+            planner.execute("ANALYZE")
+            planner.execute("DELETE FROM sqlite_stat1")
+            planner.executemany("INSERT INTO sqlite_stat1 VALUES (?, ?, ?)",
+                                src.execute("SELECT tbl, idx, stat FROM sqlite_stat1"))
+            planner.execute("ANALYZE sqlite_schema")   # reloads the statistics
+        return planner
+
+    # ---- candidates ----
+    def _aliases(self, sql):
+        aliases = {}
+        for table, alias in TABLE_REF.findall(sql):
+            table = table.strip('"`[]').replace('""', '"')
+            if table not in self.tables:
+                continue
+            aliases[table] = table
+            if alias and alias.upper() not in NOT_ALIASES:
+                aliases[alias] = table
+        return aliases
+
+    def _candidates(self, sql, plan):
+        text = STRINGS.sub("''", sql)
+        aliases = self._aliases(text)
+        qualified = {}
+        for alias, column in re.findall(r'\b([A-Za-z_]\w*)\.("?[A-Za-z_]\w*"?)', text):
+            if alias in aliases:
+                qualified.setdefault(aliases[alias], set()).add(column.strip('"'))
+        bare = set(re.findall(r'[A-Za-z_]\w*', re.sub(r'\b\w+\.\w+', ' ', text)))
+
+        candidates = set()
+        for table in set(aliases.values()):
+            used = [c for c in self.tables[table] if c in qualified.get(table, ()) or c in bare]
+            candidates.update((table, (c,)) for c in used)
+            candidates.update((table, pair) for pair in permutations(used[:6], 2))
+        # columns of the automatic indexes SQLite had to build
+        for detail in plan:
+            m = PLAN_ROW.match(detail)
+            if m and 'AUTOMATIC' in m.group(3) and aliases.get(m.group(2)) in self.tables:
+                columns = tuple(re.findall(r'(\w+)[=<>]', m.group(3)))
+                if columns:
+                    candidates.add((aliases[m.group(2)], columns))
+        return candidates, qualified, bare
+
+    def _try(self, planner, sql, table, columns):
+        planner.execute(index_sql(table, columns, self.CANDIDATE))
+        try:
+            plan = explain(planner, sql)
+        finally:
+            planner.execute(f"DROP INDEX {quote_ident(self.CANDIDATE)}")
+        return plan_score(plan), plan
+
+    def _try_pairs(self, planner, sql, singles):
+        """Best (score, [(table, columns), ...]) over pairs of one column indexes on two tables."""
+        best, chosen = None, []
+        for i, (t1, c1) in enumerate(singles):
+            self._check()
+            planner.execute(index_sql(t1, c1, self.CANDIDATE + '1'))
+            try:
+                for t2, c2 in singles[i + 1:]:
+                    if t2 == t1:
+                        continue
+                    score = self._try(planner, sql, t2, c2)[0]
+                    if best is None or score < best:
+                        best, chosen = score, [(t1, c1), (t2, c2)]
+            finally:
+                planner.execute(f"DROP INDEX {quote_ident(self.CANDIDATE + '1')}")
+        return (float('inf') if best is None else best), chosen
+
+    def _advise(self, planner, sql, plan):
+        """Indexes (table, columns) making the plan of ``sql`` cheaper."""
+        candidates, qualified, bare = self._candidates(sql, plan)
+        score = plan_score(plan)
+        kept = []
+        try:
+            # greedy: keep the best candidate, then look for another one with it in place
+            while candidates:
+                self._check()
+                tried = [(self._try(planner, sql, t, c)[0], len(c), t, c) for t, c in candidates]
+                best = min(tried)
+                if best[0] < score:
+                    chosen = [best[2:]]
+                else:
+                    # a join may need an index on two tables before its plan changes
+                    best, chosen = self._try_pairs(planner, sql, [k for k in candidates if len(k[1]) == 1])
+                    if best >= score:
+                        break
+                score = best if isinstance(best, int) else best[0]
+                for table, columns in chosen:
+                    name = index_name(table, columns)
+                    planner.execute(index_sql(table, columns, name))
+                    kept.append([table, columns, name])
+                    candidates.discard((table, columns))
+
+            # covering: add the other columns the query uses, if SQLite then reads only the index
+            for entry in kept:
+                table, columns, name = entry
+                extra = [c for c in self.tables[table]
+                         if c not in columns and (c in qualified.get(table, ()) or c in bare)]
+                wide = (columns + tuple(extra))[:self.MAX_COLUMNS]
+                if len(wide) == len(columns):
+                    continue
+                planner.execute(f"DROP INDEX {quote_ident(name)}")
+                wide_score, wide_plan = self._try(planner, sql, table, wide)
+                if wide_score <= score and any(f"COVERING INDEX {self.CANDIDATE}" in d for d in wide_plan):
+                    entry[1], entry[2] = wide, index_name(table, wide)
+                planner.execute(index_sql(table, entry[1], entry[2]))
+        finally:
+            for _, _, name in kept:
+                planner.execute(f"DROP INDEX IF EXISTS {quote_ident(name)}")
+        return [(table, columns) for table, columns, _ in kept]
+
+    # ---- timing ----
+    def _time(self, conn, sql):
+        execute(conn, sql).fetchall()   # warm up
+        times = []
+        for _ in range(self.REPEAT):
+            self._check()
+            start = time.perf_counter()
+            execute(conn, sql).fetchall()
+            times.append(time.perf_counter() - start)
+        return statistics.median(times)
+
+    def run(self, progress=None):
+        """
+        Return ``{'queries': [...], 'indexes': [...]}``: for each query its name,
+        sql, issues, proposed indexes and ``before`` / ``after`` median latency
+        in seconds; for each index its table, columns, name, sql and the
+        queries it helps.
+        """
+        report = lambda text: progress(text) if progress else None
+        src = self.connect(self.db_path, isolation_level=None)
+        with self._lock:
+            self._conns.append(src)
+        self.attached = {name: path for _, name, path in src.execute("PRAGMA database_list")
+                         if name not in ('main', 'temp') and path}
+        scratch_dir = tempfile.mkdtemp(prefix='index_advisor_')
+        try:
+            self._read_schema(src)
+            planner = self._planner(src)
+            queries, proposals = [], {}
+            for i, (name, sql) in enumerate(self.queries.items(), 1):
+                self._check()
+                report(f"Index advisor: query plan {i}/{len(self.queries)} ({name})")
+                entry = {'name': name, 'sql': sql, 'issues': [], 'indexes': [], 'before': None, 'after': None}
+                queries.append(entry)
+                if re.search(r"\{\w+\}", sql):
+                    entry['error'] = "template query, not analyzed"
+                    continue
+                try:
+                    plan = explain(planner, sql)
+                except sqlite3.Error as e:
+                    entry['error'] = str(e)
+                    continue
+                entry['issues'] = plan_issues(plan)
+                if not entry['issues']:
+                    continue
+                for table, columns in self._advise(planner, sql, plan):
+                    proposals.setdefault((table, columns), []).append(name)
+            planner.close()
+
+            # an index whose columns start another proposed index is served by it
+            for table, columns in sorted(proposals, key=lambda k: len(k[1])):
+                wider = [k for k in proposals if k[0] == table and len(k[1]) > len(columns)
+                         and k[1][:len(columns)] == columns]
+                if wider:
+                    proposals[wider[0]] += proposals.pop((table, columns))
+            indexes = [{'table': t, 'columns': list(c), 'name': index_name(t, c), 'sql': index_sql(t, c),
+                        'queries': sorted(set(names))} for (t, c), names in sorted(proposals.items())]
+            for entry in queries:
+                entry['indexes'] = [ix['name'] for ix in indexes if entry['name'] in ix['queries']]
+
+            timed = [e for e in queries if e['indexes'] and e['sql'].lstrip().upper().startswith(('SELECT', 'WITH'))]
+            if timed:
+                report("Index advisor: copying the database")
+                scratch = self._connect(str(Path(scratch_dir) / 'scratch.db'))
+                src.backup(scratch)
+                for i, entry in enumerate(timed, 1):
+                    report(f"Index advisor: timing {i}/{len(timed)} before")
+                    entry['before'] = self._time(scratch, entry['sql'])
+                for ix in indexes:
+                    report(f"Index advisor: creating {ix['name']} on the copy")
+                    scratch.execute(ix['sql'])
+                for i, entry in enumerate(timed, 1):
+                    report(f"Index advisor: timing {i}/{len(timed)} after")
+                    entry['after'] = self._time(scratch, entry['sql'])
+                scratch.close()
+            return {'queries': queries, 'indexes': indexes}
+        except sqlite3.OperationalError as e:
+            if self.cancelled:
+                raise sqlite3.OperationalError("Index advisor cancelled") from e
+            raise
+        finally:
+            with self._lock:
+                self._conns = []
+            src.close()
+            shutil.rmtree(scratch_dir, ignore_errors=True)
+
+
+def apply_indexes(conn, indexes):
+    """Create the indexes (as returned by IndexAdvisor.run) in the database of ``conn``."""
+    with conn:
+        for ix in indexes:
+            conn.execute(ix['sql'].replace("CREATE INDEX", "CREATE INDEX IF NOT EXISTS", 1))
@@ -0,0 +1,170 @@
+import sqlite3
+from datetime import datetime, timedelta
+from dataTransfer import normalize_sql
+from QueryStore import like_pattern
+
+
+class QueryHistory:
+    """
+    Log of the queries and scripts run from the manager, for every database.
+
+    Each distinct (normalized) SQL text is stored once, with its number of
+    successful runs and their total and longest time, so the slowest queries
+    are read from an index. A run only adds a small row (query, database,
+    start, seconds, rows, error). The texts are indexed with an FTS5 trigram
+    index (LIKE when FTS5 is not available): searching does not depend on
+    the number of runs. Scripts are logged as ``.read <path>``. Only the last
+    ``size`` runs are kept: older ones are pruned every ``PRUNE_EVERY`` runs
+    logged, and the statistics of their queries counted again.
+    """
+    SIZE = 1_000_000
+    PRUNE_EVERY = 1000
+
+    def __init__(self, path, size=SIZE):
+        self.path = path
+        self.size = size
+        self._added = 0   # runs logged since the last prune
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.execute("PRAGMA synchronous = NORMAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS query_text (
+                id INTEGER PRIMARY KEY,
+                sql TEXT NOT NULL UNIQUE,
+                runs INTEGER NOT NULL DEFAULT 0,
+                total_seconds REAL NOT NULL DEFAULT 0,
+                max_seconds REAL
+            );
+            CREATE INDEX IF NOT EXISTS query_text_max_seconds ON query_text (max_seconds);
+            CREATE TABLE IF NOT EXISTS history_database (id INTEGER PRIMARY KEY, path TEXT NOT NULL UNIQUE);
+            CREATE TABLE IF NOT EXISTS history (
+                id INTEGER PRIMARY KEY,
+                query_id INTEGER NOT NULL REFERENCES query_text (id),
+                database_id INTEGER REFERENCES history_database (id),
+                started_at TEXT NOT NULL,
+                seconds REAL NOT NULL,
+                rows INTEGER,
+                error TEXT
+            );
+            CREATE INDEX IF NOT EXISTS history_query ON history (query_id);
+        """)
+        try:
+            self.conn.executescript("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS query_fts
+                    USING fts5(sql, content='query_text', content_rowid='id', tokenize='trigram');
+                CREATE TRIGGER IF NOT EXISTS query_text_fts_insert AFTER INSERT ON query_text BEGIN
+                    INSERT INTO query_fts (rowid, sql) VALUES (new.id, new.sql);
+                END;
+                CREATE TRIGGER IF NOT EXISTS query_text_fts_delete AFTER DELETE ON query_text BEGIN
+                    INSERT INTO query_fts (query_fts, rowid, sql) VALUES ('delete', old.id, old.sql);
+                END;
+            """)
+            self.fts = True
+        except sqlite3.OperationalError:
+            # SQLite built without FTS5 (or older than 3.34 for the trigram tokenizer)
+            self.fts = False
+        self.prune()
+
+    def add(self, sql, database, seconds, rows=None, error=None, started_at=None):
+        """Log one run of ``sql`` on ``database`` (path) that took ``seconds``."""
+        if not sql.startswith('.read '):
+            sql = normalize_sql(sql)
+        if started_at is None:
+            started_at = (datetime.now() - timedelta(seconds=seconds)).isoformat(timespec='seconds')
+        ok = not error
+        with self.conn:
+            # only successful runs count in the statistics of the query
+            query_id = self.conn.execute(
+                "INSERT INTO query_text (sql, runs, total_seconds, max_seconds) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (sql) DO UPDATE SET runs = runs + excluded.runs, "
+                "total_seconds = total_seconds + excluded.total_seconds, "
+                "max_seconds = max(coalesce(max_seconds, excluded.max_seconds), "
+                "coalesce(excluded.max_seconds, max_seconds)) RETURNING id",
+                (sql, int(ok), seconds if ok else 0.0, seconds if ok else None)).fetchone()[0]
+            database_id = None
+            if database:
+                database_id = self.conn.execute(
+                    "INSERT INTO history_database (path) VALUES (?) "
+                    "ON CONFLICT (path) DO UPDATE SET path = path RETURNING id", (str(database),)).fetchone()[0]
+            self.conn.execute("INSERT INTO history (query_id, database_id, started_at, seconds, rows, error) "
+                              "VALUES (?, ?, ?, ?, ?, ?)", (query_id, database_id, started_at, seconds, rows, error))
+        self._added += 1
+        if self._added >= self.PRUNE_EVERY:
+            self.prune()
+
+    def _matching(self, text):
+        """(SQL condition on query_text.id, params) of the texts containing every word of ``text``."""
+        words = text.split()
+        if self.fts and words and all(len(w) >= 3 for w in words):
+            # trigram phrases: substrings, case-insensitive
+            match = " ".join('"' + w.replace('"', '""') + '"' for w in words)
+            return "IN (SELECT rowid FROM query_fts WHERE query_fts MATCH ?)", (match,)
+        conditions = " AND ".join(["sql LIKE ? ESCAPE '\\'"] * len(words))
+        return f"IN (SELECT id FROM query_text WHERE {conditions})", tuple(map(like_pattern, words))
+
+    def search(self, text='', limit=200):
+        """Last runs whose SQL contains every word of ``text``, newest first:
+        [(sql, database, started_at, seconds, rows, error)]."""
+        where, params = "", ()
+        if text.strip():
+            condition, params = self._matching(text)
+            # runs of the matching queries: few are read from the index on query_id (then sorted),
+            # many are met early enough going back from the last run (the index is then disabled by +)
+            matched = self.conn.execute(f"SELECT coalesce(sum(runs), 0) FROM query_text WHERE id {condition}",
+                                        params).fetchone()[0]
+            last = self.conn.execute("SELECT coalesce(max(id), 0) FROM history").fetchone()[0]
+            column = "+h.query_id" if matched * matched > limit * last else "h.query_id"
+            where = f"WHERE {column} {condition}"
+        return self.conn.execute(f"""
+            SELECT q.sql, d.path, h.started_at, h.seconds, h.rows, h.error
+            FROM history h
+            JOIN query_text q ON q.id = h.query_id
+            LEFT JOIN history_database d ON d.id = h.database_id
+            {where}
+            ORDER BY h.id DESC LIMIT ?""", params + (limit,)).fetchall()
+
+    def slowest(self, text='', limit=100):
+        """Queries by longest successful run: [(sql, runs, max_seconds, average_seconds, last database)]."""
+        where, params = "", ()
+        if text.strip():
+            condition, params = self._matching(text)
+            where = f"AND q.id {condition}"
+        return self.conn.execute(f"""
+            SELECT q.sql, q.runs, q.max_seconds, q.total_seconds / q.runs,
+                   (SELECT d.path FROM history h JOIN history_database d ON d.id = h.database_id
+                    WHERE h.query_id = q.id ORDER BY h.id DESC LIMIT 1)
+            FROM query_text q
+            WHERE q.max_seconds IS NOT NULL {where}
+            ORDER BY q.max_seconds DESC LIMIT ?""", params + (limit,)).fetchall()
+
+    def count(self):
+        return self.conn.execute("SELECT COUNT(*) FROM history").fetchone()[0]
+
+    def prune(self):
+        """Forget the runs older than the last ``size`` ones, and the texts and databases left without a run."""
+        self._added = 0
+        last = self.conn.execute("SELECT max(id) FROM history").fetchone()[0]
+        if last is not None and last > self.size:
+            cut = last - self.size
+            with self.conn:
+                # statistics of the queries losing runs, from the successful runs that stay
+                self.conn.execute(
+                    "UPDATE query_text SET (runs, total_seconds, max_seconds) = "
+                    "(SELECT count(*), total(seconds), max(seconds) FROM history "
+                    " WHERE query_id = query_text.id AND id > :cut AND coalesce(error, '') = '') "
+                    "WHERE id IN (SELECT query_id FROM history WHERE id <= :cut)", {'cut': cut})
+                self.conn.execute("DELETE FROM history WHERE id <= ?", (cut,))
+                # the delete trigger removes the texts from query_fts
+                self.conn.execute("DELETE FROM query_text WHERE NOT EXISTS "
+                                  "(SELECT 1 FROM history WHERE query_id = query_text.id)")
+                self.conn.execute("DELETE FROM history_database WHERE id NOT IN "
+                                  "(SELECT database_id FROM history WHERE database_id IS NOT NULL)")
+
+    def clear(self):
+        with self.conn:
+            self.conn.execute("DELETE FROM history")
+            self.conn.execute("DELETE FROM history_database")
+            self.conn.execute("DELETE FROM query_text")
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,161 @@
+import json
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from dataTransfer import normalize_sql
+
+
+def sidecar_path(db_path):
+    """File kept next to a database for the manager's own data (profiles...): recipe.db -> recipe.manager.db."""
+    return Path(db_path).with_suffix('.manager.db')
+
+
+class QueryProfiler:
+    """
+    Profiles one statement on its own connection.
+
+    The statement runs twice, each time in a transaction that is rolled back,
+    so profiling an UPDATE or DELETE does not change the database:
+    - once with a progress handler called every ``STEP`` VM instructions,
+      counting them, and a trace callback recording every statement SQLite
+      runs (the statement, then once per trigger program it fires);
+    - once with nothing attached, for the wall time and the number of rows.
+    Its EXPLAIN QUERY PLAN is read as (id, parent, detail) rows and the
+    triggers the statement may fire are taken from its EXPLAIN program.
+    The connection is opened by ``connect(db_path, **kwargs)``, so the
+    profile and the attached databases of the manager apply.
+    ``cancel`` may be called from another thread.
+    """
+    STEP = 10
+
+    def __init__(self, db_path, sql, timeout=None, params=(), connect=sqlite3.connect):
+        self.db_path = db_path
+        self.connect = connect
+        self.sql = sql.strip()
+        self.params = params
+        self.timeout = timeout
+        self.cancelled = False
+        self._conn = None
+        self._deadline = None
+        self._lock = threading.Lock()
+
+    def cancel(self):
+        with self._lock:
+            self.cancelled = True
+            if self._conn is not None:
+                self._conn.interrupt()
+
+    def _rolled_back(self, conn):
+        conn.execute("BEGIN")
+        try:
+            cursor = conn.execute(self.sql, self.params)
+            rows = 0
+            while batch := cursor.fetchmany(1000):
+                rows += len(batch)
+            return rows if cursor.description else max(cursor.rowcount, 0)
+        finally:
+            conn.execute("ROLLBACK")
+
+    def run(self, progress=None):
+        """Return the profile as a dict (sql, plan, triggers, statements, vm_steps, seconds, rows, started_at)."""
+        conn = self.connect(self.db_path, isolation_level=None)
+        with self._lock:
+            self._conn = conn
+        if self.timeout:
+            self._deadline = time.perf_counter() + self.timeout
+        profile = {'sql': normalize_sql(self.sql), 'started_at': datetime.now().isoformat(timespec='seconds')}
+        try:
+            if progress:
+                progress("Profiling: query plan")
+            profile['plan'] = [(r[0], r[1], r[3]) for r in conn.execute("EXPLAIN QUERY PLAN " + self.sql, self.params)]
+            profile['triggers'] = [r[5][len('-- TRIGGER '):] for r in conn.execute("EXPLAIN " + self.sql, self.params)
+                                   if r[1] == 'Init' and (r[5] or '').startswith('-- TRIGGER ')]
+
+            if progress:
+                progress("Profiling: counting VM steps")
+            steps = [0]
+            statements = []
+
+            def count():
+                steps[0] += self.STEP
+                return self._interrupted()
+
+            conn.set_progress_handler(count, self.STEP)
+            conn.set_trace_callback(statements.append)
+            self._rolled_back(conn)
+            conn.set_trace_callback(None)
+            profile['vm_steps'] = steps[0]
+            # our BEGIN / ROLLBACK are not part of the query
+            profile['statements'] = [s for s in statements if s not in ('BEGIN', 'ROLLBACK')]
+
+            if progress:
+                progress("Profiling: timing")
+            conn.set_progress_handler(self._interrupted, 1000)
+            start = time.perf_counter()
+            profile['rows'] = self._rolled_back(conn)
+            profile['seconds'] = time.perf_counter() - start
+        except sqlite3.OperationalError as e:
+            if self.cancelled:
+                raise sqlite3.OperationalError("Profiling cancelled") from e
+            if self._deadline is not None and time.perf_counter() > self._deadline:
+                raise sqlite3.OperationalError(f"Profiling timed out after {self.timeout} s") from e
+            raise
+        finally:
+            with self._lock:
+                self._conn = None
+            conn.close()
+        return profile
+
+    def _interrupted(self):
+        if self.cancelled:
+            return 1
+        return 1 if self._deadline is not None and time.perf_counter() > self._deadline else 0
+
+
+class ProfileStore:
+    """Profiles of the queries of a database, kept in its sidecar file to compare runs over time."""
+
+    def __init__(self, db_path):
+        self.path = sidecar_path(db_path)
+        self.conn = sqlite3.connect(self.path)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS profile_run (
+                id INTEGER PRIMARY KEY,
+                sql TEXT NOT NULL,
+                name TEXT,
+                started_at TEXT NOT NULL,
+                seconds REAL,
+                rows INTEGER,
+                vm_steps INTEGER,
+                plan TEXT,
+                statements TEXT
+            )""")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS profile_run_sql ON profile_run (sql, started_at)")
+        self.conn.commit()
+
+    def add(self, profile, name=None):
+        self.conn.execute(
+            "INSERT INTO profile_run (sql, name, started_at, seconds, rows, vm_steps, plan, statements) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (profile['sql'], name, profile['started_at'], profile['seconds'], profile['rows'], profile['vm_steps'],
+             json.dumps(profile['plan']), json.dumps(profile['statements'])))
+        self.conn.commit()
+
+    def runs(self, sql, limit=50):
+        """Previous runs of ``sql`` (compared normalized), most recent first."""
+        cursor = self.conn.execute(
+            "SELECT started_at, name, seconds, rows, vm_steps, plan FROM profile_run "
+            "WHERE sql = ? ORDER BY started_at DESC, id DESC LIMIT ?", (normalize_sql(sql), limit))
+        return [{'started_at': r[0], 'name': r[1], 'seconds': r[2], 'rows': r[3], 'vm_steps': r[4],
+                 'plan': [tuple(p) for p in json.loads(r[5] or '[]')]} for r in cursor]
+
+    def queries(self, limit=100):
+        """Distinct profiled queries as (sql, name), most recently profiled first."""
+        return self.conn.execute(
+            "SELECT sql, max(name) FROM profile_run GROUP BY sql ORDER BY max(started_at) DESC LIMIT ?",
+            (limit,)).fetchall()
+
+    def close(self):
+        self.conn.close()
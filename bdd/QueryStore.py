@@ -0,0 +1,132 @@
+import sqlite3
+import yaml
+from datetime import datetime
+from pathlib import Path
+from dataTransfer import normalize_sql
+from QueryProfiler import sidecar_path
+
+
+def like_pattern(text):
+    """LIKE pattern matching ``text`` anywhere (with ESCAPE '\\')."""
+    return '%' + text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+
+
+class QueryStore:
+    """
+    Saved queries of a database, kept in its sidecar file.
+
+    Names are unique (case-insensitive) and indexed, as are the tags and the
+    normalized SQL (to find the name of a query from its text). Saving or
+    deleting a query only writes its own rows, in one transaction. The
+    queries of the legacy ``<db>.yaml`` file are imported when it changed
+    since the last import.
+    """
+
+    def __init__(self, db_path):
+        self.path = sidecar_path(db_path)
+        self.conn = sqlite3.connect(self.path)
+        self.conn.execute("PRAGMA foreign_keys = ON")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS saved_query (
+                id INTEGER PRIMARY KEY,
+                name TEXT NOT NULL COLLATE NOCASE UNIQUE,
+                sql TEXT NOT NULL,
+                normalized TEXT NOT NULL,
+                created_at TEXT NOT NULL,
+                updated_at TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS saved_query_normalized ON saved_query (normalized);
+            CREATE TABLE IF NOT EXISTS saved_query_tag (
+                tag TEXT NOT NULL COLLATE NOCASE,
+                query_id INTEGER NOT NULL REFERENCES saved_query (id) ON DELETE CASCADE,
+                PRIMARY KEY (tag, query_id)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS saved_query_tag_query ON saved_query_tag (query_id);
+            CREATE TABLE IF NOT EXISTS saved_query_meta (key TEXT PRIMARY KEY, value TEXT);
+        """)
+        self.import_yaml(Path(db_path).with_suffix('.yaml'))
+
+    def import_yaml(self, path):
+        """Import (name -> sql) from a YAML file if it changed since its last import; return the number imported."""
+        path = Path(path)
+        if not path.exists():
+            return 0
+        stamp = str(path.stat().st_mtime_ns)
+        row = self.conn.execute("SELECT value FROM saved_query_meta WHERE key = 'yaml_mtime'").fetchone()
+        if row and row[0] == stamp:
+            return 0
+        queries = yaml.safe_load(path.read_text(encoding='utf-8-sig')) or {}
+        with self.conn:
+            for name, sql in queries.items():
+                self._save(str(name), str(sql))
+            self.conn.execute("INSERT OR REPLACE INTO saved_query_meta VALUES ('yaml_mtime', ?)", (stamp,))
+        return len(queries)
+
+    def count(self):
+        return self.conn.execute("SELECT COUNT(*) FROM saved_query").fetchone()[0]
+
+    def search(self, text='', limit=50):
+        """
+        ([(name, sql)], total) of the queries whose name or a tag contains
+        ``text`` (``#tag`` for one tag), names starting with it first.
+        """
+        text = text.strip()
+        where, params, order, order_params = "", (), "name", ()
+        if text.startswith('#'):
+            where = "WHERE id IN (SELECT query_id FROM saved_query_tag WHERE tag = ?)"
+            params = (text[1:],)
+        elif text:
+            where = ("WHERE name LIKE ? ESCAPE '\\' "
+                     "OR id IN (SELECT query_id FROM saved_query_tag WHERE tag LIKE ? ESCAPE '\\')")
+            params = (like_pattern(text),) * 2
+            order, order_params = "instr(lower(name), lower(?)) != 1, name", (text,)
+        total = self.conn.execute(f"SELECT COUNT(*) FROM saved_query {where}", params).fetchone()[0]
+        rows = self.conn.execute(f"SELECT name, sql FROM saved_query {where} ORDER BY {order} LIMIT ?",
+                                 params + order_params + (limit,)).fetchall()
+        return rows, total
+
+    def get(self, name):
+        row = self.conn.execute("SELECT sql FROM saved_query WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else None
+
+    def name_of(self, sql):
+        """Name of the saved query with the same (normalized) SQL, or None."""
+        row = self.conn.execute("SELECT name FROM saved_query WHERE normalized = ? ORDER BY name LIMIT 1",
+                                (normalize_sql(sql),)).fetchone()
+        return row[0] if row else None
+
+    def all(self):
+        return dict(self.conn.execute("SELECT name, sql FROM saved_query ORDER BY name"))
+
+    def tags(self, name):
+        return [r[0] for r in self.conn.execute(
+            "SELECT tag FROM saved_query_tag WHERE query_id = (SELECT id FROM saved_query WHERE name = ?) ORDER BY tag",
+            (name,))]
+
+    def _save(self, name, sql, tags=None):
+        now = datetime.now().isoformat(timespec='seconds')
+        query_id = self.conn.execute(
+            "INSERT INTO saved_query (name, sql, normalized, created_at, updated_at) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT (name) DO UPDATE SET sql = excluded.sql, normalized = excluded.normalized, "
+            "updated_at = excluded.updated_at RETURNING id",
+            (name, sql, normalize_sql(sql), now, now)).fetchone()[0]
+        if tags is not None:
+            self.conn.execute("DELETE FROM saved_query_tag WHERE query_id = ?", (query_id,))
+            self.conn.executemany("INSERT OR IGNORE INTO saved_query_tag VALUES (?, ?)",
+                                  ((tag, query_id) for tag in tags if tag))
+
+    def save(self, name, sql, tags=None):
+        """Create or replace the query ``name``; ``tags`` replace its tags when given."""
+        with self.conn:
+            self._save(name, sql, tags)
+
+    def delete(self, name):
+        with self.conn:
+            return self.conn.execute("DELETE FROM saved_query WHERE name = ?", (name,)).rowcount > 0
+
+    def clear(self):
+        with self.conn:
+            self.conn.execute("DELETE FROM saved_query")
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,142 @@
+import hashlib
+from collections import OrderedDict
+from pathlib import Path
+from PyQt6.QtCore import (Qt, QObject, QRunnable, QThreadPool, QSize, QBuffer, QByteArray,
+                          QIODevice, QStandardPaths, pyqtSignal)
+from PyQt6.QtGui import QImage, QImageReader, QPixmap
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.gif', '.bmp', '.webp')
+
+
+def is_image_path(value):
+    return isinstance(value, str) and value.lower().endswith(IMAGE_EXTENSIONS)
+
+
+def read_scaled(reader, size):
+    """Decode the image of a QImageReader directly at ``size`` (aspect ratio kept)."""
+    reader.setAutoTransform(True)
+    full = reader.size()
+    if full.isValid():
+        reader.setScaledSize(full.scaled(size, Qt.AspectRatioMode.KeepAspectRatio))
+    return reader.read()
+
+
+class _LoadTask(QRunnable):
+    def __init__(self, loader, key, source, cache_file):
+        super().__init__()
+        self.loader = loader
+        self.key = key
+        self.source = source
+        self.cache_file = cache_file
+
+    def run(self):
+        image = QImage()
+        try:
+            if self.cache_file and self.cache_file.exists():
+                image = QImage(str(self.cache_file))
+            if image.isNull():
+                image = self._decode()
+                if not image.isNull() and self.cache_file:
+                    image.save(str(self.cache_file), 'PNG')
+        except Exception:
+            image = QImage()
+        try:
+            self.loader._ready.emit(self.key, image)
+        except RuntimeError:
+            pass  # the loader was deleted while the image was loading
+
+    def _decode(self):
+        size = self.loader.size
+        if isinstance(self.source, Path):
+            return read_scaled(QImageReader(str(self.source)), size)
+        import requests  # only needed for URLs, and slow to import
+        resp = requests.get(self.source, timeout=self.loader.timeout)
+        resp.raise_for_status()
+        buffer = QBuffer()
+        buffer.setData(QByteArray(resp.content))
+        buffer.open(QIODevice.OpenModeFlag.ReadOnly)
+        return read_scaled(QImageReader(buffer), size)
+
+
+class ThumbnailLoader(QObject):
+    """
+    Loads image thumbnails in a background thread pool.
+
+    Sources are http(s) URLs or paths; relative paths (and site paths such as
+    ``/asset/image/...``) are resolved against ``root``. Images are decoded
+    directly at the thumbnail size with QImageReader.setScaledSize, kept in a
+    bounded in-memory LRU and written to an on-disk cache, so each image is
+    downloaded/decoded once. ``get`` never blocks: it returns None and the
+    ``loaded`` signal is emitted with the source once its thumbnail is ready.
+    """
+    loaded = pyqtSignal(str)
+    _ready = pyqtSignal(str, QImage)
+
+    def __init__(self, size=64, root=None, cache_dir=None, max_items=512, timeout=10, parent=None):
+        super().__init__(parent)
+        self.size = size if isinstance(size, QSize) else QSize(size, size)
+        self.root = Path(root) if root else Path(__file__).parent.parent
+        if cache_dir is None:
+            cache_dir = Path(QStandardPaths.writableLocation(QStandardPaths.StandardLocation.CacheLocation)) / 'thumbnails'
+        self.cache_dir = Path(cache_dir)
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+        except OSError:
+            self.cache_dir = None  # memory cache only
+        self.max_items = max_items
+        self.timeout = timeout
+        self.pool = QThreadPool(self)
+        self._cache = OrderedDict()  # key -> QPixmap, or None when the load failed
+        self._pending = set()
+        self._ready.connect(self._on_ready)
+
+    def resolve(self, source):
+        """Return the URL or the local Path to read ``source`` from."""
+        if source.startswith(('http://', 'https://')):
+            return source
+        path = Path(source)
+        if not path.is_absolute() or not path.exists():
+            path = self.root / source.lstrip('/\\')
+        return path
+
+    def _key(self, source):
+        return f"{source}@{self.size.width()}x{self.size.height()}"
+
+    def _cache_file(self, source, resolved):
+        if self.cache_dir is None:
+            return None
+        # local files are re-read when they change
+        stamp = resolved.stat().st_mtime_ns if isinstance(resolved, Path) else ''
+        digest = hashlib.sha1(f"{self._key(source)}|{stamp}".encode()).hexdigest()
+        return self.cache_dir / f"{digest}.png"
+
+    def get(self, source):
+        key = self._key(source)
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            return self._cache[key]
+        if key not in self._pending:
+            resolved = self.resolve(source)
+            if isinstance(resolved, Path) and not resolved.is_file():
+                self._store(key, None)
+                return None
+            self._pending.add(key)
+            self.pool.start(_LoadTask(self, key, resolved, self._cache_file(source, resolved)))
+        return None
+
+    def is_loading(self, source):
+        return self._key(source) in self._pending
+
+    def _store(self, key, pixmap):
+        self._cache[key] = pixmap
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.max_items:
+            self._cache.popitem(last=False)
+
+    def _on_ready(self, key, image):
+        self._pending.discard(key)
+        self._store(key, None if image.isNull() else QPixmap.fromImage(image))
+        self.loaded.emit(key.rsplit('@', 1)[0])
+
+    def clear(self):
+        self._cache.clear()
@@ -0,0 +1,1331 @@
+"""
+Benchmarks for the database manager.
+
+Run from the bdd folder, without a display:
+    QT_QPA_PLATFORM=offscreen python benchmark.py lazy-model --rows 5000000
+    python benchmark.py columnar --rows 1000000
+    python benchmark.py csv-export --rows 1000000
+    python benchmark.py csv-import --rows 10000000
+    QT_QPA_PLATFORM=offscreen python benchmark.py result-cache --rows 1000000
+    QT_QPA_PLATFORM=offscreen python benchmark.py highlight --lines 20000
+    python benchmark.py script --rows 2000000
+    python benchmark.py index-advisor --recipes 200000
+    python benchmark.py connection-profile --rows 2000000
+    QT_QPA_PLATFORM=offscreen python benchmark.py workspace --rows 1000000
+    QT_QPA_PLATFORM=offscreen python benchmark.py saved-queries --queries 5000
+    python benchmark.py prepared-statements --runs 50000
+    python benchmark.py startup --budget 200
+    python benchmark.py history --runs 500000
+    python benchmark.py recipe-search --recipes 20000
+    python benchmark.py site-data --recipes 20000
+    python benchmark.py images --count 24
+    QT_QPA_PLATFORM=offscreen python benchmark.py image-grid --count 200
+    QT_QPA_PLATFORM=offscreen python benchmark.py check-combo --sizes 1000 10000 100000
+
+Each measured variant runs in its own process so that the peak resident memory
+(ru_maxrss) reported for it only belongs to it. The synthetic databases are
+kept in the temp folder and reused between runs.
+"""
+import argparse
+import json
+import os
+import resource
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BENCH_DIR = Path(tempfile.gettempdir()) / 'db_manager_bench'
+
+
+def peak_rss_mb():
+    # ru_maxrss is in KiB on Linux, in bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == 'darwin' else rss / 1024
+
+
+def run_variant(command, *args):
+    """Run ``benchmark.py <command> <args>`` in a child process and return its json result."""
+    out = subprocess.run([sys.executable, __file__, command, *map(str, args)],
+                         capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def print_table(results, columns):
+    print(" | ".join(f"{c:>14}" for c in columns))
+    for r in results:
+        print(" | ".join(f"{r[c]:>14.2f}" if isinstance(r[c], float) else f"{r[c]:>14}" for c in columns))
+
+
+def qt_app():
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from PyQt6.QtWidgets import QApplication
+    return QApplication.instance() or QApplication(sys.argv)
+
+
+# ---- Synthetic databases ----
+def recipe_tag_db(rows):
+    """recipe.db-like database whose recipeTag table holds ``rows`` rows."""
+    path = BENCH_DIR / f'recipeTag_{rows}.db'
+    if path.exists():
+        return path
+    BENCH_DIR.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix('.tmp')
+    tmp.unlink(missing_ok=True)
+    conn = sqlite3.connect(tmp)
+    conn.execute("""
+        CREATE TABLE recipeTag (
+            recipe_id INT NOT NULL,
+            tag_id INT NOT NULL,
+            PRIMARY KEY (recipe_id, tag_id)
+        )""")
+    tags = 300
+    conn.executemany("INSERT INTO recipeTag (recipe_id, tag_id) VALUES (?, ?)",
+                     (divmod(i, tags) for i in range(rows)))
+    conn.commit()
+    conn.close()
+    tmp.rename(path)
+    return path
+
+
+# ---- lazy-model: time to first paint and memory when displaying a table ----
+def lazy_model_run(db, mode):
+    app = qt_app()
+    from PyQt6.QtWidgets import QTableView
+    from databaseManager import SQLiteModel, SQLiteTableModel
+
+    base_rss = peak_rss_mb()
+    conn = sqlite3.connect(db)
+    start = time.perf_counter()
+    if mode == 'fetchall':
+        cursor = conn.execute("SELECT * FROM recipeTag")
+        model = SQLiteModel(cursor.fetchall(), [d[0] for d in cursor.description])
+    else:
+        model = SQLiteTableModel(conn, 'recipeTag')
+    view = QTableView()
+    view.resize(800, 600)
+    view.setModel(model)
+    view.show()
+    view.viewport().repaint()
+    app.processEvents()
+    first_paint = time.perf_counter() - start
+
+    start = time.perf_counter()
+    view.scrollToBottom()
+    view.viewport().repaint()
+    app.processEvents()
+    last_row = time.perf_counter() - start
+
+    print(json.dumps({'mode': mode, 'rows': model.rowCount(), 'first_paint_s': first_paint,
+                      'scroll_to_end_s': last_row, 'rss_mb': peak_rss_mb() - base_rss}))
+
+
+def lazy_model(rows):
+    db = recipe_tag_db(rows)
+    results = [run_variant('_lazy-model-run', db, mode) for mode in ('fetchall', 'lazy')]
+    print_table(results, ['mode', 'rows', 'first_paint_s', 'scroll_to_end_s', 'rss_mb'])
+
+
+# ---- columnar: memory of a large query result kept by the model ----
+def wide_result_db(rows):
+    """Database with a ``rows`` rows table mixing integers, reals, repeated and unique text and NULLs."""
+    path = BENCH_DIR / f'wide_{rows}.db'
+    if path.exists():
+        return path
+    BENCH_DIR.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix('.tmp')
+    tmp.unlink(missing_ok=True)
+    conn = sqlite3.connect(tmp)
+    conn.execute("""
+        CREATE TABLE result (
+            id INTEGER PRIMARY KEY, recipe_id INT, tag_id INT, rating INTEGER, price REAL,
+            name TEXT, category TEXT, created_at TIMESTAMP, description TEXT
+        )""")
+    categories = ['ingredient', 'season', 'food type', 'origin', 'meal type', 'cooking method']
+    conn.executemany("INSERT INTO result VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", (
+        (i, i // 7, i % 300, i % 11 if i % 5 else None, (i % 1000) / 10, f'recipe {i % 5000}',
+         categories[i % len(categories)], f'2024-12-{1 + i % 28:02d} {i % 24:02d}:{i % 60:02d}:17',
+         None if i % 3 else f'description of row {i}')
+        for i in range(rows)))
+    conn.commit()
+    conn.close()
+    tmp.rename(path)
+    return path
+
+
+def columnar_run(db, mode):
+    import tracemalloc
+    from ColumnarBuffer import ColumnarBuffer
+
+    def load():
+        cursor = sqlite3.connect(db).execute("SELECT * FROM result")
+        data = [] if mode == 'tuples' else ColumnarBuffer()
+        while rows := cursor.fetchmany(500):
+            data.extend(rows)
+        return data, len(cursor.description)
+
+    # timed without tracemalloc, which slows allocations down a lot
+    start = time.perf_counter()
+    data, n_cols = load()
+    load_time = time.perf_counter() - start
+    cell = (lambda r, c: data[r][c]) if mode == 'tuples' else data.value
+
+    # what the view does on paint: one cell at a time
+    start = time.perf_counter()
+    for r in range(0, len(data), 10):
+        for c in range(n_cols):
+            cell(r, c)
+    read = time.perf_counter() - start
+    rows = len(data)
+    del data, cell
+
+    tracemalloc.start()
+    data, _ = load()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print(json.dumps({'mode': mode, 'rows': rows, 'load_s': load_time, 'read_10pct_s': read,
+                      'memory_mb': size / (1024 * 1024)}))
+
+
+def columnar(rows):
+    db = wide_result_db(rows)
+    results = [run_variant('_columnar-run', db, mode) for mode in ('tuples', 'columnar')]
+    print_table(results, ['mode', 'rows', 'load_s', 'read_10pct_s', 'memory_mb'])
+
+
+# ---- csv-export: pandas vs streaming csv module, one table and all tables ----
+def multi_table_db(rows, tables=4):
+    """Database holding ``tables`` copies of the wide result table with ``rows`` rows each."""
+    path = BENCH_DIR / f'multi_{tables}x{rows}.db'
+    if path.exists():
+        return path
+    source = wide_result_db(rows)
+    tmp = path.with_suffix('.tmp')
+    tmp.unlink(missing_ok=True)
+    conn = sqlite3.connect(tmp)
+    conn.execute("ATTACH DATABASE ? AS source", (str(source),))
+    for i in range(tables):
+        conn.execute(f"CREATE TABLE result_{i} AS SELECT * FROM source.result")
+    conn.commit()
+    conn.close()
+    tmp.rename(path)
+    return path
+
+
+def csv_export_run(db, mode, out):
+    import dataTransfer
+
+    start = time.perf_counter()
+    if mode == 'pandas':
+        import pandas as pd
+        conn = sqlite3.connect(db)
+        df = pd.read_sql_query("SELECT * FROM result_0", conn)
+        df.to_csv(Path(out) / 'result_0.csv', index=False)
+        rows = len(df)
+    elif mode == 'stream':
+        rows = dataTransfer.export_table_csv(db, 'result_0', Path(out) / 'result_0.csv')
+    else:
+        workers = 1 if mode == 'all-sequential' else 4
+        rows = sum(dataTransfer.export_tables_csv(db, out, workers=workers).values())
+    elapsed = time.perf_counter() - start
+    size = sum(f.stat().st_size for f in Path(out).glob('*.csv'))
+    print(json.dumps({'mode': mode, 'rows': rows, 'seconds': elapsed, 'rows_per_s': int(rows / elapsed),
+                      'mb_per_s': size / elapsed / (1024 * 1024), 'rss_mb': peak_rss_mb()}))
+
+
+def csv_export(rows):
+    db = multi_table_db(rows)
+    results = []
+    for mode in ('pandas', 'stream', 'all-sequential', 'all-parallel'):
+        with tempfile.TemporaryDirectory() as out:
+            results.append(run_variant('_csv-export-run', db, mode, out))
+    print_table(results, ['mode', 'rows', 'seconds', 'rows_per_s', 'mb_per_s', 'rss_mb'])
+
+
+# ---- csv-import: pandas + to_sql vs chunked executemany import ----
+def wide_csv(rows):
+    path = BENCH_DIR / f'wide_{rows}.csv'
+    if not path.exists():
+        import dataTransfer
+        dataTransfer.export_table_csv(wide_result_db(rows), 'result', path.with_suffix('.tmp'))
+        path.with_suffix('.tmp').rename(path)
+    return path
+
+
+def csv_import_run(csv_path, mode, out):
+    db = Path(out) / 'import.db'
+    start = time.perf_counter()
+    if mode == 'pandas':
+        # former DBManager.import_csv
+        import pandas as pd
+        conn = sqlite3.connect(db)
+        df = pd.read_csv(csv_path)
+        cols = ", ".join(f"'{c}' TEXT" for c in df.columns)
+        conn.execute(f"CREATE TABLE result ({cols})")
+        df.to_sql('result', conn, if_exists='append', index=False)
+        conn.commit()
+        rows = len(df)
+    else:
+        import dataTransfer
+        rows, _ = dataTransfer.import_csv(db, csv_path, 'result')
+    elapsed = time.perf_counter() - start
+    print(json.dumps({'mode': mode, 'rows': rows, 'seconds': elapsed, 'rows_per_s': int(rows / elapsed),
+                      'rss_mb': peak_rss_mb(), 'db_mb': db.stat().st_size / (1024 * 1024)}))
+
+
+def csv_import(rows):
+    csv_path = wide_csv(rows)
+    results = []
+    for mode in ('pandas', 'chunked'):
+        with tempfile.TemporaryDirectory() as out:
+            results.append(run_variant('_csv-import-run', csv_path, mode, out))
+    print_table(results, ['mode', 'rows', 'seconds', 'rows_per_s', 'rss_mb', 'db_mb'])
+
+
+# ---- result-cache: revisiting a table / re-running a query ----
+def result_cache(rows, repeat=20):
+    app = qt_app()
+    from databaseManager import SQLiteModel, SQLiteTableModel, ResultCache
+
+    db = wide_result_db(rows)
+    conn = sqlite3.connect(db)
+    sql = "SELECT category, COUNT(*), AVG(price) FROM result GROUP BY category"
+    results = []
+    for mode in ('no cache', 'cache'):
+        cache = ResultCache() if mode == 'cache' else None
+
+        def visit():
+            # what clicking a table in the tree does: count, first page, first cells painted
+            model = SQLiteTableModel(conn, 'result', cache=cache)
+            model.set_filter(6, 'food')
+            for r in range(40):
+                model.data(model.index(r, 0))
+
+        def run_query():
+            cached = cache.get(conn, sql) if cache else None
+            if cached is None:
+                cursor = conn.execute(sql)
+                model = SQLiteModel(cursor.fetchall(), [d[0] for d in cursor.description])
+                if cache:
+                    cache.put(conn, sql, (), (model._headers, model._data))
+
+        for name, func in (('table revisit', visit), ('query re-run', run_query)):
+            func()  # first visit fills the cache
+            start = time.perf_counter()
+            for _ in range(repeat):
+                func()
+            results.append({'mode': mode, 'action': name, 'ms': (time.perf_counter() - start) / repeat * 1000})
+    print_table(results, ['mode', 'action', 'ms'])
+
+
+# ---- highlight: typing latency in a large script ----
+def sql_script(lines):
+    parts = [
+        "-- recipes of the {i}th batch",
+        "INSERT INTO recipe (id, name, description) VALUES ({i}, 'recipe {i}', 'it''s a /* not a comment */ text');",
+        "SELECT r.name, COUNT(*) AS n FROM recipe r JOIN recipeTag rt ON rt.recipe_id = r.id",
+        "  WHERE r.id > {i} AND r.name LIKE '%soup%' GROUP BY r.name ORDER BY n DESC LIMIT 10;",
+        "/* block comment",
+        "   on two lines */ CREATE TABLE IF NOT EXISTS t{i} (a INTEGER PRIMARY KEY, b TEXT NOT NULL, c REAL);",
+    ]
+    return "\n".join(parts[i % len(parts)].format(i=i) for i in range(lines))
+
+
+class PygmentsHighlighter:
+    """The former highlighter: a full Pygments lex of each block on every highlight."""
+
+    @staticmethod
+    def create(edit):
+        from pygments import lex
+        from pygments.lexers.sql import SqlLexer
+        from pygments.token import Token
+        from PyQt6.QtGui import QSyntaxHighlighter, QTextCharFormat, QColor, QFont
+
+        def _fmt(color_name, bold=False):
+            f = QTextCharFormat()
+            if bold: f.setFontWeight(QFont.Weight.Bold)
+            f.setForeground(QColor(color_name))
+            return f
+
+        class Highlighter(QSyntaxHighlighter):
+            def __init__(self, document):
+                super().__init__(document)
+                self.lexer = SqlLexer()
+                self.formats = {
+                    Token.Keyword: _fmt("lightBlue", bold=True),
+                    Token.Keyword.Constant: _fmt("lightGreen"),
+                    Token.Literal.String: _fmt("lightOrange"),
+                    Token.Comment: _fmt("gray"),
+                }
+
+            def highlightBlock(self, text):
+                index = 0
+                for token, content in lex(text, self.lexer):
+                    fmt = self.formats.get(token)
+                    if fmt:
+                        self.setFormat(index, len(content), fmt)
+                    index += len(content)
+
+        return Highlighter(edit.document())
+
+
+def highlight_run(lines, mode):
+    app = qt_app()
+    from PyQt6.QtGui import QTextCursor
+    from PyQt6.QtWidgets import QPlainTextEdit
+    from databaseManager import SqlHighlighter
+
+    edit = QPlainTextEdit()
+    edit.resize(800, 600)
+    edit.show()
+    highlighter = PygmentsHighlighter.create(edit) if mode == 'pygments' else SqlHighlighter(edit)
+    script = sql_script(lines)
+
+    # tokenizing alone, without Qt
+    start = time.perf_counter()
+    if mode == 'pygments':
+        from pygments import lex
+        for line in script.split("\n"):
+            for _ in lex(line, highlighter.lexer):
+                pass
+    else:
+        state = SqlHighlighter.NORMAL
+        for line in script.split("\n"):
+            _, state = highlighter.tokenize(line, state)
+    lex_time = time.perf_counter() - start
+
+    def paste():
+        start = time.perf_counter()
+        cursor = QTextCursor(edit.document())
+        cursor.select(QTextCursor.SelectionType.Document)
+        cursor.insertText(script)
+        app.processEvents()
+        return time.perf_counter() - start
+
+    first_paste, second_paste = paste(), paste()
+
+    # type a word in the middle of the buffer, one key at a time
+    cursor = QTextCursor(edit.document().findBlockByNumber(lines // 2))
+    cursor.movePosition(QTextCursor.MoveOperation.EndOfBlock)
+    edit.setTextCursor(cursor)
+    edit.ensureCursorVisible()
+    app.processEvents()
+    times = []
+    for key in " AND r.id < 100":
+        start = time.perf_counter()
+        edit.textCursor().insertText(key)
+        edit.viewport().repaint()
+        app.processEvents()
+        times.append(time.perf_counter() - start)
+
+    print(json.dumps({'mode': mode, 'lines': lines, 'lex_s': lex_time, 'paste_s': first_paste,
+                      'repaste_s': second_paste, 'key_ms': sum(times) / len(times) * 1000,
+                      'max_key_ms': max(times) * 1000}))
+
+
+def highlight(lines):
+    results = [run_variant('_highlight-run', lines, mode) for mode in ('pygments', 'cached')]
+    print_table(results, ['mode', 'lines', 'lex_s', 'paste_s', 'repaste_s', 'key_ms', 'max_key_ms'])
+
+
+# ---- script: executescript vs streaming ScriptRunner on a large dump ----
+def wide_dump(rows, statement_rows):
+    """SQL dump of the wide result table, ``statement_rows`` rows per INSERT statement."""
+    path = BENCH_DIR / f'wide_{rows}_{statement_rows}.sql'
+    if not path.exists():
+        import dataTransfer
+        conn = sqlite3.connect(wide_result_db(rows))
+        with open(path.with_suffix('.tmp'), 'w', encoding='utf-8') as out:
+            dataTransfer.write_sql_dump(conn, out, batch_rows=statement_rows)
+        conn.close()
+        path.with_suffix('.tmp').rename(path)
+    return path
+
+
+def script_run(dump, mode, out):
+    import dataTransfer
+
+    db = Path(out) / 'script.db'
+    start = time.perf_counter()
+    if mode == 'executescript':
+        # former DBManager.execute_script
+        conn = sqlite3.connect(db)
+        conn.executescript(open(dump, encoding='utf-8').read())
+        conn.commit()
+        statements = None
+    else:
+        statements = dataTransfer.ScriptRunner(db, dump).run()['statements']
+    elapsed = time.perf_counter() - start
+    print(json.dumps({'mode': mode, 'statements': statements or '-', 'seconds': elapsed,
+                      'statements_per_s': int(statements / elapsed) if statements else '-', 'rss_mb': peak_rss_mb()}))
+
+
+def script(rows):
+    results = []
+    # executescript commits each statement of a dump without BEGIN: one row per INSERT is kept small
+    for dump_rows, statement_rows in ((rows // 20, 1), (rows, 500)):
+        dump = wide_dump(dump_rows, statement_rows)
+        for mode in ('executescript', 'runner'):
+            with tempfile.TemporaryDirectory() as out:
+                result = run_variant('_script-run', dump, mode, out)
+            result['dump_mb'] = dump.stat().st_size / (1024 * 1024)
+            result['rows'] = dump_rows
+            result['rows_per_insert'] = statement_rows
+            results.append(result)
+    print_table(results, ['mode', 'rows', 'rows_per_insert', 'dump_mb', 'statements', 'seconds', 'statements_per_s', 'rss_mb'])
+
+
+# ---- index-advisor: saved queries before/after the proposed indexes ----
+def recipe_db(recipes, tags=2000, categories=50):
+    """recipe.db schema (no secondary index) with ``recipes`` recipes, 3 images and 5 tags each."""
+    path = BENCH_DIR / f'recipe_{recipes}.db'
+    if path.exists():
+        return path
+    BENCH_DIR.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix('.tmp')
+    tmp.unlink(missing_ok=True)
+    conn = sqlite3.connect(tmp)
+    conn.executescript("""
+        CREATE TABLE recipe (id INTEGER PRIMARY KEY, name TEXT NOT NULL, created_at TEXT, updated_at TEXT);
+        CREATE TABLE image (id INTEGER PRIMARY KEY, recipe_id INTEGER NOT NULL REFERENCES recipe(id), path TEXT);
+        CREATE TABLE category (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE);
+        CREATE TABLE tag (id INTEGER PRIMARY KEY, name TEXT NOT NULL, category_id INTEGER REFERENCES category(id));
+        CREATE TABLE recipeTag (recipe_id INTEGER NOT NULL, tag_id INTEGER NOT NULL, PRIMARY KEY (recipe_id, tag_id));
+    """)
+    conn.executemany("INSERT INTO category VALUES (?, ?)", ((i, f"category {i}") for i in range(categories)))
+    conn.executemany("INSERT INTO tag VALUES (?, ?, ?)", ((i, f"tag {i}", i % categories) for i in range(tags)))
+    conn.executemany("INSERT INTO recipe VALUES (?, ?, '2024-01-01', '2024-01-01')",
+                     ((i, f"recipe {i}") for i in range(recipes)))
+    conn.executemany("INSERT INTO image (recipe_id, path) VALUES (?, ?)",
+                     ((i // 3, f"asset/image/recipe/{i}.jpg") for i in range(recipes * 3)))
+    conn.executemany("INSERT INTO recipeTag VALUES (?, ?)",
+                     ((i // 5, (i * 7919) % tags) for i in range(recipes * 5)))
+    conn.commit()
+    conn.close()
+    tmp.rename(path)
+    return path
+
+
+def index_advisor(recipes):
+    from IndexAdvisor import IndexAdvisor
+    from predefined_queries import PREDEFINED_QUERIES
+
+    queries = dict(PREDEFINED_QUERIES)
+    queries.update({
+        'tagXcategory': "SELECT t.name, c.name FROM tag t LEFT JOIN category c ON c.id = t.category_id",
+        'images of a recipe': f"SELECT path FROM image WHERE recipe_id = {recipes // 2}",
+        'recipes with a tag': "SELECT r.name FROM recipe r JOIN recipeTag rt ON rt.recipe_id = r.id "
+                              "JOIN tag t ON t.id = rt.tag_id WHERE t.name = 'tag 42'",
+    })
+    start = time.perf_counter()
+    report = IndexAdvisor(str(recipe_db(recipes)), queries).run()
+    seconds = time.perf_counter() - start
+    results = [{'query': q['name'], 'indexes': len(q['indexes']),
+                'before ms': q['before'] * 1000, 'after ms': q['after'] * 1000}
+               for q in report['queries'] if q['before'] is not None]
+    print_table(results, ['query', 'indexes', 'before ms', 'after ms'])
+    for ix in report['indexes']:
+        print(ix['sql'])
+    print(f"advisor run: {seconds:.2f} s")
+
+
+# ---- connection-profile: pragmas of the profiles, and reads while a writer commits ----
+def connection_profile(rows, repeat=5, seconds=5):
+    import shutil
+    import threading
+    from ConnectionPool import ConnectionPool, PROFILES, connect
+
+    db = wide_result_db(rows)
+    sql = "SELECT category, COUNT(*), AVG(price), MAX(name) FROM result WHERE rating > 3 GROUP BY category"
+    results = []
+    for name in ('bare connect', 'default', 'wal'):
+        copy = BENCH_DIR / f'profile_{name.replace(" ", "_")}.db'
+        shutil.copyfile(db, copy)
+        conn = sqlite3.connect(copy) if name == 'bare connect' else connect(copy, PROFILES[name])
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            conn.execute(sql).fetchall()
+            times.append(time.perf_counter() - start)
+        conn.close()
+
+        # a writer commits small transactions while a pooled reader runs short queries
+        pool = ConnectionPool(copy, PROFILES['default' if name == 'bare connect' else name])
+        writer = sqlite3.connect(copy, timeout=30) if name == 'bare connect' else connect(copy, PROFILES[name])
+        stop = threading.Event()
+        latencies, errors = [], [0]
+
+        def read():
+            with pool.acquire() as reader:
+                while not stop.is_set():
+                    start = time.perf_counter()
+                    try:
+                        reader.execute("SELECT COUNT(*), MAX(price) FROM result WHERE id > ?", (rows - 1000,)).fetchall()
+                    except sqlite3.OperationalError:
+                        errors[0] += 1
+                    latencies.append(time.perf_counter() - start)
+
+        thread = threading.Thread(target=read)
+        thread.start()
+        deadline, commits = time.perf_counter() + seconds, 0
+        while time.perf_counter() < deadline:
+            with writer:
+                writer.executemany("UPDATE result SET price = price + 1 WHERE id = ?",
+                                   ((rows - 1 - (commits * 100 + i) % 1000,) for i in range(100)))
+            commits += 1
+        stop.set()
+        thread.join()
+        writer.close()
+        pool.close()
+        latencies.sort()
+        results.append({'profile': name, 'query ms': min(times[1:]) * 1000, 'first ms': times[0] * 1000,
+                        'commits/s': commits / seconds, 'reads/s': len(latencies) / seconds,
+                        'read p99 ms': latencies[int(len(latencies) * 0.99)] * 1000, 'busy': errors[0]})
+        for suffix in ('', '-wal', '-shm'):
+            Path(f"{copy}{suffix}").unlink(missing_ok=True)
+    print_table(results, ['profile', 'first ms', 'query ms', 'commits/s', 'reads/s', 'read p99 ms', 'busy'])
+
+
+# ---- workspace: switching back to a database, and copying a table between two files ----
+def workspace(rows, repeat=5):
+    import shutil
+    app = qt_app()
+    from databaseManager import SQLiteTableModel, Workspace
+    from ConnectionPool import PROFILES
+    import dataTransfer
+
+    paths = []
+    for name in ('recipe', 'app_database', 'test'):
+        path = BENCH_DIR / f'workspace_{name}.db'
+        shutil.copyfile(wide_result_db(rows), path)
+        paths.append(str(path))
+
+    def show(entry):
+        # what displaying a database does: schema, filtered table count and first cells painted
+        entry.schema.refresh(entry.conn)
+        model = SQLiteTableModel(entry.conn, 'result', cache=entry.results)
+        model.set_filter(6, 'food')
+        for r in range(40):
+            model.data(model.index(r, 0))
+
+    results = []
+    for mode, size in (('close on switch', 1), ('workspace', 3)):
+        ws = Workspace(size)
+        for path in paths:
+            show(ws.open(path, PROFILES['default']))
+        start = time.perf_counter()
+        for _ in range(repeat):
+            for path in paths:
+                show(ws.open(path, PROFILES['default']))
+        results.append({'action': f'switch ({mode})', 'ms': (time.perf_counter() - start) / (repeat * len(paths)) * 1000})
+        ws.close_all()
+
+    target = BENCH_DIR / 'workspace_target.db'
+    csv_path = BENCH_DIR / 'workspace_result.csv'
+    for mode in ('csv round trip', 'attach + insert select'):
+        target.unlink(missing_ok=True)
+        start = time.perf_counter()
+        if mode == 'csv round trip':
+            dataTransfer.export_table_csv(paths[0], 'result', csv_path)
+            dataTransfer.import_csv(target, csv_path, 'result')
+            csv_path.unlink()
+        else:
+            dataTransfer.copy_table(paths[0], 'result', target)
+        results.append({'action': f'copy table ({mode})', 'ms': (time.perf_counter() - start) * 1000})
+    target.unlink(missing_ok=True)
+    for path in paths:
+        Path(path).unlink()
+    print_table(results, ['action', 'ms'])
+
+
+# ---- saved-queries: <db>.yaml rewritten as a whole vs the QueryStore sidecar ----
+def saved_queries(count, repeat=5):
+    import yaml
+    app = qt_app()
+    from PyQt6.QtGui import QAction
+    from PyQt6.QtWidgets import QMenu
+    from QueryStore import QueryStore
+    from QueryProfiler import sidecar_path
+
+    BENCH_DIR.mkdir(parents=True, exist_ok=True)
+    db = BENCH_DIR / 'saved_queries.db'
+    yaml_file = db.with_suffix('.yaml')
+    sidecar_path(db).unlink(missing_ok=True)
+    queries = {f"query {i:05d}": f"SELECT r.name, t.name\nFROM recipe r\nJOIN recipeTag rt ON rt.recipe_id = r.id\n"
+                                 f"JOIN tag t ON t.id = rt.tag_id\nWHERE t.id = {i}" for i in range(count)}
+    yaml_file.write_text(yaml.safe_dump(queries))
+
+    def yaml_open(menu):
+        # previous load_queries: whole file parsed, one submenu with two actions per query
+        menu.clear()
+        for name, sql in (yaml.safe_load(open(yaml_file, 'r')) or {}).items():
+            sub = menu.addMenu(name)
+            sub.addAction(QAction("Use", sub))
+            sub.addAction(QAction("Delete", sub))
+
+    def yaml_save():
+        saved = yaml.safe_load(open(yaml_file, 'r')) or {}
+        saved['query 00042'] = 'SELECT 42'
+        with open(yaml_file, 'w', encoding='utf-8-sig') as f:
+            yaml.safe_dump(saved, f)
+
+    start = time.perf_counter()
+    store = QueryStore(db)
+    results = [{'store': 'sidecar', 'action': f'first open (import of {count})',
+                'ms': (time.perf_counter() - start) * 1000}]
+    store.close()
+
+    def store_open(menu):
+        # QueryStore opened with the database, Customs menu filled when shown
+        opened = QueryStore(db)
+        menu.clear()
+        for name, sql in opened.search('', 50)[0]:
+            sub = menu.addMenu(name)
+            sub.addAction(QAction("Use", sub))
+            sub.addAction(QAction("Delete", sub))
+        opened.close()
+
+    store = QueryStore(db)
+    measures = [('yaml', 'open database + menu', lambda: yaml_open(QMenu())),
+                ('yaml', 'save one query', yaml_save),
+                ('sidecar', 'open database + menu', lambda: store_open(QMenu())),
+                ('sidecar', 'save one query', lambda: store.save('query 00042', 'SELECT 42')),
+                ('sidecar', 'search "0042"', lambda: store.search('0042')),
+                ('sidecar', 'name of a query', lambda: store.name_of(queries['query 04242'] if count > 4242 else 'SELECT 1'))]
+    for kind, action, func in measures:
+        func()
+        start = time.perf_counter()
+        for _ in range(repeat):
+            func()
+        results.append({'store': kind, 'action': action, 'ms': (time.perf_counter() - start) / repeat * 1000})
+    store.close()
+    print_table(results, ['store', 'action', 'ms'])
+
+
+# ---- prepared-statements: values formatted into the SQL vs bound, and size of the statement cache ----
+def prepared_statements(runs, recipes=100_000, queries=200):
+    from ConnectionPool import connect
+    from queryParameters import bind
+
+    db = recipe_db(recipes)
+    lookup = ("SELECT r.name, t.name FROM recipe r JOIN recipeTag rt ON rt.recipe_id = r.id "
+              "JOIN tag t ON t.id = rt.tag_id WHERE r.id = {id}")
+    # a working set of saved queries, each one run again with other values
+    saved = [f"SELECT r.name, t.name, {k} AS query FROM recipe r JOIN recipeTag rt ON rt.recipe_id = r.id "
+             f"JOIN tag t ON t.id = rt.tag_id WHERE r.id = :id" for k in range(queries)]
+    ids = [(i * 7919) % recipes for i in range(runs)]
+
+    def formatted(conn):
+        for i in ids:
+            conn.execute(lookup.format(id=i)).fetchall()
+
+    def bound(conn):
+        sql, _ = bind(lookup.replace('{id}', ':id'), {'id': 0})
+        for i in ids:
+            conn.execute(sql, {'id': i}).fetchall()
+
+    def working_set(conn):
+        for n, i in enumerate(ids):
+            conn.execute(saved[n % queries], {'id': i}).fetchall()
+
+    results = []
+    for name, func, cached in [('formatted values', formatted, 256),
+                               ('bound, no cache', bound, 0),
+                               ('bound', bound, 256),
+                               (f'{queries} queries', working_set, 128),
+                               (f'{queries} queries', working_set, 256)]:
+        conn = connect(db, cached_statements=cached)
+        func(conn)   # pages in the OS cache
+        start = time.perf_counter()
+        func(conn)
+        seconds = time.perf_counter() - start
+        conn.close()
+        results.append({'statements': name, 'cached': cached, 'us / run': seconds / runs * 1e6,
+                        'runs / s': float(runs / seconds)})
+    print_table(results, ['statements', 'cached', 'us / run', 'runs / s'])
+
+
+# ---- startup: import time and time to the first painted frame of each window, in a fresh interpreter ----
+def startup_run(gui, db='./recipe.db'):
+    start = time.perf_counter()
+    os.environ['QT_QPA_PLATFORM'] = 'offscreen'
+    os.chdir(Path(__file__).parent)
+    sys.path.insert(0, str(Path(__file__).parent))
+    from PyQt6.QtCore import QObject, QEvent
+    from PyQt6.QtWidgets import QApplication, QFileDialog
+    qt = time.perf_counter()
+    if gui == 'manager':
+        import databaseManager as module
+        factory = module.DBManager
+    else:
+        import newRecipe as module
+        factory = lambda: module.NewRecipe(folder_parent='bdd', folder_recipe='recipes', db_path=db)
+    imported = time.perf_counter()
+
+    app = QApplication(sys.argv)
+    # a file dialog would wait for the user: answered with no file
+    QFileDialog.getOpenFileName = staticmethod(lambda *args, **kwargs: ('', ''))
+    painted = []
+
+    class FirstPaint(QObject):
+        def eventFilter(self, obj, event):
+            if event.type() == QEvent.Type.Paint and not painted:
+                painted.append(time.perf_counter())
+                app.quit()
+            return False
+
+    watcher = FirstPaint()
+    app.installEventFilter(watcher)
+    window = factory()
+    window.show()
+    app.exec()
+    print(json.dumps({'qt ms': (qt - start) * 1000, 'import ms': (imported - qt) * 1000,
+                      'first frame ms': (painted[0] - start) * 1000}))
+    os._exit(0)   # without waiting for the database opened after the first frame
+
+
+def startup(repeat=5, budget=None):
+    results = []
+    for gui in ('manager', 'recipe'):
+        runs = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = run_variant('_startup-run', gui)
+            result['process ms'] = (time.perf_counter() - start) * 1000
+            runs.append(result)
+        median = {key: statistics.median(r[key] for r in runs) for key in runs[0]}
+        results.append({'window': gui, **median})
+    print_table(results, ['window', 'qt ms', 'import ms', 'first frame ms', 'process ms'])
+    if budget is not None:
+        slow = [r['window'] for r in results if r['first frame ms'] > budget]
+        if slow:
+            sys.exit(f"first frame over the {budget} ms budget: {', '.join(slow)}")
+
+
+# ---- history: flat log scanned with LIKE vs QueryHistory (distinct texts, FTS5, statistics per query) ----
+def history(runs, queries=20000, repeat=5):
+    import random
+    from QueryHistory import QueryHistory
+
+    BENCH_DIR.mkdir(parents=True, exist_ok=True)
+    path = BENCH_DIR / f'history_{runs}.db'
+    flat_path = BENCH_DIR / f'history_flat_{runs}.db'
+    rng = random.Random(0)
+    tables = ['recipe', 'tag', 'image', 'category', 'recipeTag']
+    texts = [f"SELECT {', '.join(rng.sample(['id', 'name', 'created_at', 'path', 'tag_id'], 3))} "
+             f"FROM {rng.choice(tables)} WHERE id > {i} ORDER BY name LIMIT {rng.randint(1, 500)}" for i in range(queries)]
+    start = time.perf_counter()
+    if not path.exists():
+        store = QueryHistory(path)
+        for i in range(runs):
+            store.add(texts[rng.randrange(queries)], f"/data/db{i % 5}.db", rng.random(), rng.randint(0, 1000),
+                      started_at='2024-01-01T00:00:00')
+        store.close()
+        # the previous alternative: one row per run with its whole text
+        flat = sqlite3.connect(flat_path)
+        flat.execute("CREATE TABLE history (id INTEGER PRIMARY KEY, sql TEXT, database TEXT, started_at TEXT, "
+                     "seconds REAL, rows INTEGER, error TEXT)")
+        src = sqlite3.connect(path)
+        flat.executemany("INSERT INTO history VALUES (?, ?, ?, ?, ?, ?, ?)", src.execute(
+            "SELECT h.id, q.sql, d.path, h.started_at, h.seconds, h.rows, h.error FROM history h "
+            "JOIN query_text q ON q.id = h.query_id JOIN history_database d ON d.id = h.database_id"))
+        flat.commit()
+        flat.close()
+        src.close()
+        print(f"built in {time.perf_counter() - start:.1f} s")
+
+    store = QueryHistory(path)
+    flat = sqlite3.connect(flat_path)
+    word = 'recipeTag'
+    measures = [
+        ('flat', 'search "recipeTag"', lambda: flat.execute(
+            "SELECT * FROM history WHERE sql LIKE ? ORDER BY id DESC LIMIT 200", (f'%{word}%',)).fetchall()),
+        ('QueryHistory', 'search "recipeTag"', lambda: store.search(word)),
+        ('flat', 'search "LIMIT 42"', lambda: flat.execute(
+            "SELECT * FROM history WHERE sql LIKE '%LIMIT 42%' ORDER BY id DESC LIMIT 200").fetchall()),
+        ('QueryHistory', 'search "LIMIT 42"', lambda: store.search('LIMIT 42')),
+        # a single query among the 20000
+        ('flat', f'search "id > {queries - 2}"', lambda: flat.execute(
+            "SELECT * FROM history WHERE sql LIKE ? ORDER BY id DESC LIMIT 200", (f'%id > {queries - 2}%',)).fetchall()),
+        ('QueryHistory', f'search "id > {queries - 2}"', lambda: store.search(f'id > {queries - 2}')),
+        ('flat', 'slowest queries', lambda: flat.execute(
+            "SELECT sql, COUNT(*), MAX(seconds), AVG(seconds) FROM history WHERE error IS NULL "
+            "GROUP BY sql ORDER BY MAX(seconds) DESC LIMIT 100").fetchall()),
+        ('QueryHistory', 'slowest queries', lambda: store.slowest()),
+        ('QueryHistory', 'log one run', lambda: store.add(texts[42], '/data/db0.db', 0.01, 10)),
+    ]
+    results = []
+    for kind, action, func in measures:
+        func()
+        start = time.perf_counter()
+        for _ in range(repeat):
+            func()
+        results.append({'log': kind, 'action': action, 'ms': (time.perf_counter() - start) / repeat * 1000})
+    results.append({'log': 'flat', 'action': 'file MB', 'ms': flat_path.stat().st_size / 1e6})
+    results.append({'log': 'QueryHistory', 'action': 'file MB', 'ms': path.stat().st_size / 1e6})
+    store.close()
+    flat.close()
+    print_table(results, ['log', 'action', 'ms'])
+
+
+# ---- recipe-search: LIKE on the recipe table + reading every JSON file vs the recipe_fts index ----
+def recipe_site(recipes):
+    """recipe table of ``recipes`` recipes whose ingredients and steps are in <site>/bdd/recipes/*.json."""
+    import random
+    site = BENCH_DIR / f'recipe_site_{recipes}'
+    path = site / 'bdd' / 'recipe.db'
+    if path.exists():
+        return site, path
+    rng = random.Random(0)
+    words = ("sucre farine beurre oeufs lait citron miel sel poivre huile oignon ail tomate riz pâtes crème "
+             "chocolat vanille pomme fraise meringue four cuire mélanger battre verser réserver couper "
+             "émincer fondre chauffer refroidir servir saladier casserole poêle minutes degrés").split()
+    folder = site / 'bdd' / 'recipes'
+    folder.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE recipe (id INTEGER PRIMARY KEY, name VARCHAR(255) NOT NULL, url VARCHAR(255) NOT NULL, "
+                 "rating INTEGER, description TEXT, created_at TIMESTAMP, updated_at TIMESTAMP, time INTEGER)")
+    rows = []
+    for i in range(recipes):
+        name = f"{' '.join(rng.sample(words, 2))} {i}"
+        content = {'nb_peoples': 4,
+                   'ingredients': [f"{rng.randint(1, 500)} g de {rng.choice(words)}" for _ in range(8)],
+                   'steps': [" ".join(rng.choices(words, k=15)) for _ in range(8)]}
+        with open(folder / f'{name}.json', 'w', encoding='utf-8-sig') as f:
+            json.dump(content, f, indent=4)
+        rows.append((i + 1, name, f"/bdd/recipes/{name}.json", rng.randint(0, 10), " ".join(rng.choices(words, k=12))))
+    conn.executemany("INSERT INTO recipe (id, name, url, rating, description) VALUES (?, ?, ?, ?, ?)", rows)
+    conn.commit()
+    conn.close()
+    return site, path
+
+
+def recipe_search(recipes, repeat=5):
+    import shutil
+    import recipeSearch
+
+    site, path = recipe_site(recipes)
+    db = BENCH_DIR / 'recipe_search.db'
+    shutil.copyfile(path, db)
+    conn = sqlite3.connect(db)
+    text = "meringue with sucre"
+
+    def scan():
+        # what was possible before: LIKE on the table, then every JSON file opened
+        words = text.lower().split()
+        found = []
+        for recipe_id, name, description, url in conn.execute("SELECT id, name, description, url FROM recipe"):
+            content = f"{name} {description}".lower()
+            ingredients, steps = recipeSearch.read_recipe_file(recipeSearch.recipe_file(url, site))
+            content += f" {ingredients} {steps}".lower()
+            if any(w in content for w in words):
+                found.append((sum(content.count(w) for w in words), recipe_id, name))
+        return sorted(found, reverse=True)[:50]
+
+    results = []
+    start = time.perf_counter()
+    recipeSearch.create_index(conn)
+    indexed, missing = recipeSearch.rebuild_index(conn, root=site)
+    results.append({'search': f'bulk index of {indexed} recipes', 'ms': (time.perf_counter() - start) * 1000})
+    measures = [('scan: LIKE + JSON files', scan),
+                ('recipe_fts, bm25 + snippets', lambda: recipeSearch.search_recipes(conn, text)),
+                ('recipe_fts, prefix "sucr"', lambda: recipeSearch.search_recipes(conn, 'sucr')),
+                ('index one new recipe', lambda: (recipeSearch.index_recipe(
+                    conn, 1, 'meringue', '', ['4 blancs', '250 g de sucre'], ['Battre']), conn.commit()))]
+    for name, func in measures:
+        func()
+        start = time.perf_counter()
+        for _ in range(repeat):
+            func()
+        results.append({'search': name, 'ms': (time.perf_counter() - start) / repeat * 1000})
+    conn.close()
+    print_table(results, ['search', 'ms'])
+
+
+# ---- site-data: full vs incremental build of the static site data ----
+def site_data(recipes, tags=500, categories=20):
+    import shutil
+    import siteData
+
+    site, path = recipe_site(recipes)
+    db = BENCH_DIR / 'site_data.db'
+    shutil.copyfile(path, db)
+    conn = sqlite3.connect(db)
+    conn.executescript("""
+        CREATE TABLE image (id INTEGER PRIMARY KEY, recipe_id INTEGER NOT NULL, url TEXT, alt_text TEXT);
+        CREATE TABLE category (id INTEGER PRIMARY KEY, name TEXT NOT NULL, multi_tag BOOLEAN, description TEXT);
+        CREATE TABLE tag (id INTEGER PRIMARY KEY, category_id INTEGER, name TEXT NOT NULL, description TEXT);
+        CREATE TABLE recipeTag (recipe_id INTEGER NOT NULL, tag_id INTEGER NOT NULL, PRIMARY KEY (recipe_id, tag_id));
+    """)
+    conn.execute("UPDATE recipe SET updated_at = '2024-01-01 00:00:00'")
+    conn.executemany("INSERT INTO category (id, name, multi_tag) VALUES (?, ?, 1)",
+                     ((i, f"category {i}") for i in range(1, categories + 1)))
+    conn.executemany("INSERT INTO tag (id, category_id, name) VALUES (?, ?, ?)",
+                     ((i, i % categories + 1, f"tag {i}") for i in range(1, tags + 1)))
+    conn.executemany("INSERT INTO image (recipe_id, url) VALUES (?, ?)",
+                     ((i, f"/asset/image/recipe/{i}.jpg") for i in range(1, recipes + 1)))
+    conn.executemany("INSERT OR IGNORE INTO recipeTag VALUES (?, ?)",
+                     ((i // 5 + 1, (i * 7919) % tags + 1) for i in range(recipes * 5)))
+    conn.commit()
+    out = BENCH_DIR / 'site_data'
+    shutil.rmtree(out, ignore_errors=True)
+    folder = site / 'bdd' / 'recipes'
+
+    def add_recipe():
+        recipe_id = conn.execute("SELECT max(id) + 1 FROM recipe").fetchone()[0]
+        name = f"new recipe {recipe_id}"
+        with open(folder / f'{name}.json', 'w', encoding='utf-8-sig') as f:
+            json.dump({'nb_peoples': 2, 'ingredients': [], 'steps': []}, f)
+        with conn:
+            conn.execute("INSERT INTO recipe (id, name, url, rating, updated_at) VALUES (?, ?, ?, 8, datetime())",
+                         (recipe_id, name, f"/bdd/recipes/{name}.json"))
+            conn.executemany("INSERT INTO recipeTag VALUES (?, ?)", ((recipe_id, t) for t in (1, 2, 3)))
+
+    def edit_file():
+        # the JSON file of a recipe changed, not its row
+        url = conn.execute("SELECT url FROM recipe WHERE id = ?", (recipes // 2,)).fetchone()[0]
+        os.utime(site / url.lstrip('/'))
+
+    results = []
+    for name, change, full in (('full build', None, True), ('nothing changed', None, False),
+                               ('one recipe added', add_recipe, False), ('one JSON file edited', edit_file, False)):
+        if change:
+            change()
+        start = time.perf_counter()
+        stats = siteData.build(db, out, root=site, full=full)
+        results.append({'build': name, 'written': stats['written'], 'kept': stats['kept'],
+                        'removed': stats['removed'], 'ms': (time.perf_counter() - start) * 1000})
+    conn.close()
+    print_table(results, ['build', 'written', 'kept', 'removed', 'ms'])
+    listing = [p for p in out.iterdir() if p.name.startswith('recipes-')]
+    sizes = {suffix: sum(p.stat().st_size for p in listing if p.suffix == suffix) / 1e6
+             for suffix in ('.json', '.gz', '.br')}
+    print(f"recipe.db {db.stat().st_size / 1e6:.2f} MB, listing {sizes['.json']:.2f} MB, "
+          f"gzip {sizes['.gz']:.2f} MB, brotli {sizes['.br']:.2f} MB" + ("" if siteData.brotli else " (not installed)"))
+
+
+# ---- images: copying the originals vs the responsive image pipeline ----
+def photos(count, width=4032, height=3024):
+    """``count`` phone-sized JPEG photos (gradients and shapes, so they compress like pictures)."""
+    import random
+    from PyQt6.QtCore import QPointF
+    from PyQt6.QtGui import QColor, QImage, QLinearGradient, QPainter
+
+    folder = BENCH_DIR / f'photos_{count}'
+    if folder.exists() and len(list(folder.iterdir())) == count:
+        return sorted(folder.iterdir())
+    folder.mkdir(parents=True, exist_ok=True)
+    rng = random.Random(0)
+    for i in range(count):
+        image = QImage(width, height, QImage.Format.Format_RGB32)
+        painter = QPainter(image)
+        gradient = QLinearGradient(QPointF(0, 0), QPointF(width, height))
+        gradient.setColorAt(0, QColor(rng.randrange(256), rng.randrange(256), rng.randrange(256)))
+        gradient.setColorAt(1, QColor(rng.randrange(256), rng.randrange(256), rng.randrange(256)))
+        painter.fillRect(image.rect(), gradient)
+        for _ in range(300):
+            painter.setBrush(QColor(rng.randrange(256), rng.randrange(256), rng.randrange(256), 120))
+            painter.drawEllipse(QPointF(rng.randrange(width), rng.randrange(height)), rng.randrange(20, 400),
+                                rng.randrange(20, 400))
+        painter.end()
+        image.save(str(folder / f'{i}.jpg'), 'JPEG', 92)
+    return sorted(folder.iterdir())
+
+
+def images(count):
+    import shutil
+    import imagePipeline
+
+    sources = photos(count)
+    root = BENCH_DIR / 'image_site'
+    conn = sqlite3.connect(':memory:')
+    conn.execute("CREATE TABLE image (id INTEGER PRIMARY KEY, recipe_id INT, url TEXT, alt_text TEXT)")
+    imagePipeline.ensure_image_columns(conn)
+
+    def copy():
+        folder = root / 'copy'
+        folder.mkdir(parents=True, exist_ok=True)
+        for n, source in enumerate(sources):
+            shutil.copy2(source, folder / f'{n}.jpg')
+        return [{'url': f'/copy/{n}.jpg', 'variants': []} for n in range(len(sources))]
+
+    def pipeline(workers):
+        def run():
+            records = imagePipeline.save_images(sources, root, f'pipeline_{workers}', conn=conn, workers=workers)
+            with conn:
+                conn.executemany("INSERT INTO image (url, width, height, source_hash, variants) VALUES (?, ?, ?, ?, ?)",
+                                 [(r['url'], r['width'], r['height'], r['source_hash'], json.dumps(r['variants']))
+                                  for r in records])
+            return records
+        return run
+
+    def size(url):
+        return (root / url.lstrip('/')).stat().st_size / 1e6
+
+    shutil.rmtree(root, ignore_errors=True)
+    workers = max(2, os.cpu_count() or 1)
+    results = []
+    for name, func in (('shutil.copy2 (before)', copy), ('pipeline, 1 process', pipeline(1)),
+                       (f'pipeline, {workers} processes', pipeline(workers)),
+                       ('pipeline, same sources again', pipeline(workers))):
+        if name.startswith(f'pipeline, {workers}'):
+            conn.execute("DELETE FROM image")   # not skipped by the hashes of the previous run
+        start = time.perf_counter()
+        records = func()
+        seconds = time.perf_counter() - start
+        largest = sum(size(r['url']) for r in records)
+        webp = sum(size(v['url']) for r in records for v in r['variants']
+                   if v['type'] == 'image/webp' and v['width'] == min(640, r['width']))
+        results.append({'save': name, 's per image': seconds / len(sources), 'largest MB': largest,
+                        '640px webp MB': webp})
+    conn.close()
+    print_table(results, ['save', 's per image', 'largest MB', '640px webp MB'])
+
+
+# ---- image-grid: a widget per image decoded at full size vs the virtualized grid ----
+def image_grid(count, resizes=20):
+    from PyQt6.QtCore import QSize, Qt
+    from PyQt6.QtGui import QPixmap
+
+    app = qt_app()
+    import newRecipe
+
+    sources = [str(p) for p in photos(24)]
+    sources = [sources[i % len(sources)] for i in range(count)]
+    size = QSize(100, 100)
+    results = []
+
+    # before: every refresh (resize, reorder, removal) decoded each file again on the GUI thread
+    start = time.perf_counter()
+    for source in sources:
+        QPixmap(source).scaled(size - QSize(4, 4), Qt.AspectRatioMode.KeepAspectRatio,
+                               Qt.TransformationMode.SmoothTransformation)
+    full = (time.perf_counter() - start) * 1000
+    results.append({'grid': 'widgets, full decode', 'action': f'show {count} images', 'gui ms': full})
+    results.append({'grid': 'widgets, full decode', 'action': f'{resizes} resizes (x{resizes})', 'gui ms': full * resizes})
+
+    widget = newRecipe.ImageSelectorWidget(size)
+    widget.thumbnails.cache_dir = None   # decoded, not read from the disk cache
+    widget.resize(450, 400)
+    widget.show()
+    start = time.perf_counter()
+    widget.model.add(sources)
+    app.processEvents()
+    results.append({'grid': 'virtualized', 'action': f'show {count} images', 'gui ms': (time.perf_counter() - start) * 1000})
+    start = time.perf_counter()
+    while widget.thumbnails._pending:
+        app.processEvents()
+        time.sleep(0.001)
+    results.append({'grid': 'virtualized', 'action': 'visible thumbnails ready (off-thread)',
+                    'gui ms': (time.perf_counter() - start) * 1000})
+    decoded = len(widget.thumbnails._cache)
+    start = time.perf_counter()
+    for i in range(resizes):
+        widget.resize(450 + (i % 2) * 120, 400)
+        app.processEvents()
+    results.append({'grid': 'virtualized', 'action': f'{resizes} resizes', 'gui ms': (time.perf_counter() - start) * 1000})
+    start = time.perf_counter()
+    for i in range(resizes):
+        widget.model.move(i, count - 1)
+        app.processEvents()
+    results.append({'grid': 'virtualized', 'action': f'{resizes} reorders', 'gui ms': (time.perf_counter() - start) * 1000})
+    print_table(results, ['grid', 'action', 'gui ms'])
+    print(f"thumbnails decoded: {len(widget.thumbnails._cache)} ({decoded} for the first screen) of {count} images")
+
+
+# ---- check-combo: a QCheckBox per item vs the model-backed CheckComboBox ----
+def check_combo(sizes, widget_limit=10_000):
+    import random
+    from PyQt6.QtCore import QPoint
+    from PyQt6.QtWidgets import QCheckBox, QVBoxLayout, QWidget
+
+    app = qt_app()
+    from CheckComboBox import CheckComboBox
+
+    rng = random.Random(0)
+    words = ("sucré salé épicé végétarien vegan dessert entrée plat boisson apéritif été hiver "
+             "printemps automne rapide facile four poêle cru froid chaud fête").split()
+    typed = "dessert"
+    results = []
+    for size in sizes:
+        items = [(f"{rng.choice(words)} {rng.choice(words)} {i}", i) for i in range(size)]
+        if size <= widget_limit:
+            # before: one widget per item, every keystroke shows or hides each of them
+            container = QWidget()
+            layout = QVBoxLayout(container)
+            container.show()
+            start = time.perf_counter()
+            buttons = []
+            for label, _ in items:
+                button = QCheckBox(label)
+                layout.addWidget(button)
+                buttons.append(button)
+            app.processEvents()
+            populate = time.perf_counter() - start
+            start = time.perf_counter()
+            for n in range(1, len(typed) + 1):
+                text = typed[:n]
+                for button in buttons:
+                    button.setVisible(text in button.text().lower())
+                app.processEvents()
+            filtering = (time.perf_counter() - start) / len(typed)
+            start = time.perf_counter()
+            for value in range(0, size, max(1, size // 100)):
+                [b.isChecked() for b in buttons]   # selectedValues() scanned every item
+            lookup = (time.perf_counter() - start) / 100
+            results.append({'combo': 'widgets', 'items': size, 'populate ms': populate * 1000,
+                            'keystroke ms': filtering * 1000, 'selection ms': lookup * 1000})
+            container.deleteLater()
+            app.processEvents()
+        combo = CheckComboBox()
+        combo.show()
+        combo.menu.popup(QPoint(0, 0))
+        start = time.perf_counter()
+        combo.addItems(items)
+        app.processEvents()
+        populate = time.perf_counter() - start
+        start = time.perf_counter()
+        for n in range(1, len(typed) + 1):
+            combo._filterItems(typed[:n])
+            app.processEvents()
+        filtering = (time.perf_counter() - start) / len(typed)
+        start = time.perf_counter()
+        for value in range(0, size, max(1, size // 100)):
+            combo.setSelectedValues([value])
+            combo.selectedValues()
+        lookup = (time.perf_counter() - start) / 100
+        results.append({'combo': 'model + trigrams', 'items': size, 'populate ms': populate * 1000,
+                        'keystroke ms': filtering * 1000, 'selection ms': lookup * 1000})
+        combo.menu.hide()
+        combo.deleteLater()
+        app.processEvents()
+    print_table(results, ['combo', 'items', 'populate ms', 'keystroke ms', 'selection ms'])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p = sub.add_parser('lazy-model', help="fetchall() vs paged SQLiteTableModel on a large recipeTag table")
+    p.add_argument('--rows', type=int, default=5_000_000)
+    p.set_defaults(func=lambda a: lazy_model(a.rows))
+
+    p = sub.add_parser('_lazy-model-run')
+    p.add_argument('db')
+    p.add_argument('mode', choices=['fetchall', 'lazy'])
+    p.set_defaults(func=lambda a: lazy_model_run(a.db, a.mode))
+
+    p = sub.add_parser('columnar', help="list of tuples vs ColumnarBuffer for a large query result")
+    p.add_argument('--rows', type=int, default=1_000_000)
+    p.set_defaults(func=lambda a: columnar(a.rows))
+
+    p = sub.add_parser('_columnar-run')
+    p.add_argument('db')
+    p.add_argument('mode', choices=['tuples', 'columnar'])
+    p.set_defaults(func=lambda a: columnar_run(a.db, a.mode))
+
+    p = sub.add_parser('csv-export', help="pandas vs streaming CSV export, and parallel export of all tables")
+    p.add_argument('--rows', type=int, default=1_000_000, help="rows per table (4 tables)")
+    p.set_defaults(func=lambda a: csv_export(a.rows))
+
+    p = sub.add_parser('_csv-export-run')
+    p.add_argument('db')
+    p.add_argument('mode', choices=['pandas', 'stream', 'all-sequential', 'all-parallel'])
+    p.add_argument('out')
+    p.set_defaults(func=lambda a: csv_export_run(a.db, a.mode, a.out))
+
+    p = sub.add_parser('csv-import', help="pandas + to_sql vs chunked typed import of a CSV file")
+    p.add_argument('--rows', type=int, default=1_000_000)
+    p.set_defaults(func=lambda a: csv_import(a.rows))
+
+    p = sub.add_parser('_csv-import-run')
+    p.add_argument('csv')
+    p.add_argument('mode', choices=['pandas', 'chunked'])
+    p.add_argument('out')
+    p.set_defaults(func=lambda a: csv_import_run(a.csv, a.mode, a.out))
+
+    p = sub.add_parser('result-cache', help="filtered table revisit and query re-run, with and without ResultCache")
+    p.add_argument('--rows', type=int, default=1_000_000)
+    p.set_defaults(func=lambda a: result_cache(a.rows))
+
+    p = sub.add_parser('highlight', help="Pygments vs cached stateful highlighter while typing in a large script")
+    p.add_argument('--lines', type=int, default=20_000)
+    p.set_defaults(func=lambda a: highlight(a.lines))
+
+    p = sub.add_parser('_highlight-run')
+    p.add_argument('lines', type=int)
+    p.add_argument('mode', choices=['pygments', 'cached'])
+    p.set_defaults(func=lambda a: highlight_run(a.lines, a.mode))
+
+    p = sub.add_parser('script', help="executescript vs streaming ScriptRunner on a large SQL dump")
+    p.add_argument('--rows', type=int, default=2_000_000)
+    p.set_defaults(func=lambda a: script(a.rows))
+
+    p = sub.add_parser('_script-run')
+    p.add_argument('dump')
+    p.add_argument('mode', choices=['executescript', 'runner'])
+    p.add_argument('out')
+    p.set_defaults(func=lambda a: script_run(a.dump, a.mode, a.out))
+
+    p = sub.add_parser('connection-profile', help="query time per profile, and pooled reads while a writer commits")
+    p.add_argument('--rows', type=int, default=2_000_000)
+    p.set_defaults(func=lambda a: connection_profile(a.rows))
+
+    p = sub.add_parser('workspace', help="switching between open databases, and ATTACH copy vs CSV round trip")
+    p.add_argument('--rows', type=int, default=1_000_000)
+    p.set_defaults(func=lambda a: workspace(a.rows))
+
+    p = sub.add_parser('saved-queries', help="saved queries in <db>.yaml vs the indexed QueryStore sidecar")
+    p.add_argument('--queries', type=int, default=5000)
+    p.set_defaults(func=lambda a: saved_queries(a.queries))
+
+    p = sub.add_parser('prepared-statements', help="formatted vs bound parameters, and statement cache size")
+    p.add_argument('--runs', type=int, default=50_000)
+    p.set_defaults(func=lambda a: prepared_statements(a.runs))
+
+    p = sub.add_parser('startup', help="import time and time to the first frame of the windows")
+    p.add_argument('--repeat', type=int, default=5)
+    p.add_argument('--budget', type=float, help="exit with an error when a first frame takes longer (ms)")
+    p.set_defaults(func=lambda a: startup(a.repeat, a.budget))
+    p = sub.add_parser('_startup-run')
+    p.add_argument('gui', choices=['manager', 'recipe'])
+    p.add_argument('--db', default='./recipe.db', help="database of the recipe window (it adds its columns and index)")
+    p.set_defaults(func=lambda a: startup_run(a.gui, a.db))
+
+    p = sub.add_parser('history', help="searching and ranking a large query history, flat log vs QueryHistory")
+    p.add_argument('--runs', type=int, default=500_000)
+    p.set_defaults(func=lambda a: history(a.runs))
+
+    p = sub.add_parser('recipe-search', help="LIKE + reading the JSON files vs the FTS5 recipe index")
+    p.add_argument('--recipes', type=int, default=20_000)
+    p.set_defaults(func=lambda a: recipe_search(a.recipes))
+
+    p = sub.add_parser('site-data', help="full vs incremental build of the sharded JSON data of the site")
+    p.add_argument('--recipes', type=int, default=20_000)
+    p.set_defaults(func=lambda a: site_data(a.recipes))
+
+    p = sub.add_parser('images', help="copying the photos vs the process pool of responsive JPEG/WebP variants")
+    p.add_argument('--count', type=int, default=24)
+    p.set_defaults(func=lambda a: images(a.count))
+
+    p = sub.add_parser('image-grid', help="a widget per image decoded on the GUI thread vs the virtualized grid")
+    p.add_argument('--count', type=int, default=200)
+    p.set_defaults(func=lambda a: image_grid(a.count))
+
+    p = sub.add_parser('check-combo', help="populate and filter times of CheckComboBox, widgets vs model")
+    p.add_argument('--sizes', type=int, nargs='+', default=[1_000, 10_000, 100_000])
+    p.set_defaults(func=lambda a: check_combo(a.sizes))
+
+    p = sub.add_parser('index-advisor', help="latency of the saved queries before/after the proposed indexes")
+    p.add_argument('--recipes', type=int, default=200_000)
+    p.set_defaults(func=lambda a: index_advisor(a.recipes))
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,684 @@
+"""
+Streaming import / export helpers for the database manager.
+
+They read and write by chunks so that memory stays constant whatever the size
+of the database, and take a ``progress`` callback so they can run in a
+background thread (see BackgroundTask).
+"""
+import csv
+import gzip
+import heapq
+import io
+import itertools
+import math
+import multiprocessing
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+
+def quote_ident(name):
+    """Quote an SQLite identifier (table, column...) for use in a query."""
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+SQL_SPACES = re.compile(r"('(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"|`[^`]*`|\[[^\]]*\])|(?:\s|--[^\n]*|/\*.*?\*/)+", re.S)
+
+
+def normalize_sql(sql):
+    """SQL without comments, with its whitespace collapsed (outside quotes) and without the final ';'."""
+    return SQL_SPACES.sub(lambda m: m.group(1) or ' ', sql).strip().rstrip(';').rstrip()
+
+
+def open_output(path, encoding='utf-8'):
+    """Open a text file for writing, compressed with gzip (.gz) or zstd (.zst) according to its suffix."""
+    path = str(path)
+    if path.endswith('.gz'):
+        return gzip.open(path, 'wt', encoding=encoding, newline='')
+    if path.endswith('.zst'):
+        try:
+            import zstandard
+        except ImportError:
+            raise RuntimeError("zstd compression needs the 'zstandard' package (pip install zstandard)")
+        raw = open(path, 'wb')
+        writer = zstandard.ZstdCompressor(level=6, threads=-1).stream_writer(raw, closefd=True)
+        return io.TextIOWrapper(writer, encoding=encoding, newline='')
+    return open(path, 'w', encoding=encoding, newline='', buffering=1 << 20)
+
+
+def open_input(path, encoding='utf-8-sig'):
+    """
+    Open a text file for reading, compressed with gzip (.gz) or zstd (.zst) according to its suffix.
+
+    Return the text file and the binary file under it, whose ``tell()`` gives
+    how far the file has been read (compressed size for compressed files).
+    """
+    path = str(path)
+    raw = open(path, 'rb')
+    if path.endswith('.gz'):
+        stream = gzip.GzipFile(fileobj=raw)
+    elif path.endswith('.zst'):
+        try:
+            import zstandard
+        except ImportError:
+            raw.close()
+            raise RuntimeError("zstd compression needs the 'zstandard' package (pip install zstandard)")
+        stream = zstandard.ZstdDecompressor().stream_reader(raw, closefd=True)
+    else:
+        stream = raw
+    return io.TextIOWrapper(stream, encoding=encoding, newline=''), raw
+
+
+def sql_literal(value):
+    """SQL literal of a value read from SQLite."""
+    if value is None:
+        return "NULL"
+    if isinstance(value, int):
+        return str(value)
+    if isinstance(value, float):
+        if math.isnan(value):
+            return "NULL"   # SQLite stores NaN as NULL
+        if math.isinf(value):
+            return "1e999" if value > 0 else "-1e999"
+        return repr(value)
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return f"X'{bytes(value).hex().upper()}'"
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+FTS5 = re.compile(r"\bUSING\s+fts5\b", re.I)
+FTS5_CONTENT = re.compile(r"\bcontent\s*=\s*('[^']*'|\"[^\"]*\"|[\w]+)", re.I)
+
+
+def shadow_tables(conn):
+    """Names of the shadow tables of the virtual tables: their CREATE VIRTUAL TABLE creates them."""
+    try:
+        return {name for (name,) in conn.execute(
+            "SELECT name FROM pragma_table_list WHERE schema = 'main' AND type = 'shadow'")}
+    except sqlite3.OperationalError:
+        # SQLite < 3.37: <virtual table>_<suffix>
+        tables = [name for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")]
+        virtual = [name for (name,) in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND sql LIKE 'CREATE VIRTUAL TABLE%'")]
+        return {name for name in tables if any(name.startswith(v + '_') for v in virtual)}
+
+
+def write_sql_dump(conn, out, batch_rows=500, progress=None):
+    """
+    Write the schema and the data of ``conn`` as SQL into the text file ``out``.
+
+    Tables are created first, then filled with multi-row
+    ``INSERT ... VALUES (...),(...);`` statements of ``batch_rows`` rows read
+    with fetchmany, and indexes, triggers and views come last so that reloading
+    the dump does not maintain indexes row by row.
+    Shadow tables of virtual tables are not created (their virtual table
+    does). An FTS5 index is not dumped: the text of an FTS5 table with its
+    own content is (into its ``_content`` table), its options are set again
+    and the index is rebuilt from it (``'rebuild'``), as for an external
+    content table.
+    ``progress(table, rows_written, table_number, table_count)`` is called after each batch.
+    """
+    objects = conn.execute(
+        "SELECT type, name, sql FROM sqlite_master "
+        "WHERE type IN ('table','index','trigger','view') AND sql NOT NULL "
+        "ORDER BY CASE type WHEN 'table' THEN 0 WHEN 'index' THEN 1 WHEN 'trigger' THEN 2 ELSE 3 END, rowid"
+    ).fetchall()
+    shadows = shadow_tables(conn)
+    fts = {}    # FTS5 table -> its content table, None: its own content, '': contentless
+    for typ, name, sql in objects:
+        if typ == 'table' and FTS5.search(sql):
+            m = FTS5_CONTENT.search(sql)
+            fts[name] = m.group(1).strip('\'"') if m else None
+    created = [name for typ, name, _ in objects
+               if typ == 'table' and not name.startswith('sqlite_') and name not in shadows]
+    # data: the tables, without the FTS5 index (only the text of the FTS5 tables with their own content)
+    tables = [name for name in created if name not in fts]
+    tables += [f"{name}_content" for name, content in fts.items() if content is None and f"{name}_content" in shadows]
+
+    # 1) Structure : tables
+    for typ, name, sql in objects:
+        if typ == 'table' and name in created:
+            out.write(f"-- {typ.upper()} {name}\n")
+            out.write(sql.strip() + ";\n\n")
+
+    # 2) Données : INSERT multi-lignes, par lots
+    for number, table in enumerate(tables, 1):
+        cursor = conn.execute(f"SELECT * FROM {quote_ident(table)}")
+        col_list = ", ".join(quote_ident(d[0]) for d in cursor.description)
+        head = f"INSERT INTO {quote_ident(table)} ({col_list}) VALUES\n"
+        written = 0
+        while rows := cursor.fetchmany(batch_rows):
+            if not written:
+                out.write(f"-- Dumping data for table {table}\n")
+            out.write(head)
+            out.write(",\n".join("(" + ", ".join(map(sql_literal, row)) + ")" for row in rows))
+            out.write(";\n")
+            written += len(rows)
+            if progress:
+                progress(table, written, number, len(tables))
+        if written:
+            out.write("\n")
+        elif progress:
+            progress(table, 0, number, len(tables))
+
+    # FTS5 options (rank, automerge...: its _config table) and index, rebuilt from its content
+    # ('' : contentless, the index can not be rebuilt)
+    for name, content in fts.items():
+        out.write(f"-- FTS5 index {name}\n")
+        command = f"INSERT INTO {quote_ident(name)} ({quote_ident(name)}, rank) VALUES"
+        if f"{name}_config" in shadows:
+            for key, value in conn.execute(f"SELECT k, v FROM {quote_ident(name + '_config')} WHERE k != 'version'"):
+                out.write(f"{command} ({sql_literal(key)}, {sql_literal(value)});\n")
+        if content != '':
+            out.write(f"INSERT INTO {quote_ident(name)} ({quote_ident(name)}) VALUES ('rebuild');\n")
+        out.write("\n")
+
+    # 3) Index, triggers et vues
+    for typ, name, sql in objects:
+        if typ != 'table':
+            out.write(f"-- {typ.upper()} {name}\n")
+            out.write(sql.strip() + ";\n\n")
+
+
+def export_sql_dump(db_path, path, batch_rows=500, progress=None, connect=sqlite3.connect):
+    """
+    Dump the database file ``db_path`` into ``path`` (optionally .gz / .zst) using its own connection,
+    opened by ``connect(db_path)``.
+    """
+    conn = connect(db_path)
+    try:
+        with open_output(path, encoding='utf-8-sig') as out:
+            write_sql_dump(conn, out, batch_rows, progress)
+    finally:
+        conn.close()
+
+
+def write_csv(cursor, out, batch_rows=5000, progress=None):
+    """Write the rows of ``cursor`` (with a header line) as CSV into ``out``; return the number of rows."""
+    writer = csv.writer(out)
+    writer.writerow([d[0] for d in cursor.description])
+    written = 0
+    while rows := cursor.fetchmany(batch_rows):
+        writer.writerows(rows)
+        written += len(rows)
+        if progress:
+            progress(written)
+    return written
+
+
+def export_table_csv(db_path, table, path, batch_rows=5000, progress=None, connect=sqlite3.connect):
+    """Export one table of ``db_path`` into the CSV file ``path``, in constant memory."""
+    conn = connect(db_path)
+    try:
+        cursor = conn.execute(f"SELECT * FROM {quote_ident(table)}")
+        with open_output(path) as out:
+            return write_csv(cursor, out, batch_rows, progress)
+    finally:
+        conn.close()
+
+
+@contextmanager
+def hold_write_lock(db_path):
+    """
+    Hold the write lock of ``db_path`` (BEGIN IMMEDIATE, readers are not
+    blocked) for the ``with`` block, so the read transactions opened meanwhile
+    all see the same last commit. A database that can not be written to (an
+    immutable or read-only file) has no writer to keep out.
+    """
+    conn = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+    try:
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+        except sqlite3.Error:
+            pass
+        yield
+    finally:
+        conn.close()   # rolls back
+
+
+def _csv_worker(db_path, folder, batch_rows, tasks, results, barrier, connect):
+    # runs in a child process of export_tables_csv
+    conn = connect(db_path)
+    try:
+        conn.execute("BEGIN")
+        conn.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()  # starts the read transaction
+        barrier.wait(timeout=60)
+    except Exception as e:
+        conn.close()
+        results.put((None, 0, f"could not open a read transaction: {e}"))
+        return
+    try:
+        while (table := tasks.get()) is not None:
+            try:
+                cursor = conn.execute(f"SELECT * FROM {quote_ident(table)}")
+                with open_output(Path(folder) / f"{table}.csv") as out:
+                    results.put((table, write_csv(cursor, out, batch_rows), ''))
+            except Exception as e:
+                results.put((table, 0, str(e)))
+    finally:
+        conn.close()
+
+
+def export_tables_csv(db_path, folder, tables=None, workers=4, batch_rows=5000, progress=None,
+                      connect=sqlite3.connect):
+    """
+    Export every table (or ``tables``) of ``db_path`` into ``folder/<table>.csv``, several at a time.
+
+    Tables are shared between ``workers`` processes (the csv module holds the
+    GIL, threads would not write faster), each reading with its own connection.
+    Their read transactions are all opened while this process holds the write
+    lock of the database (see hold_write_lock), so no commit can happen
+    between two of them and every file comes from the same snapshot (in
+    rollback journal mode their shared locks then keep writers out until the
+    end). With one worker, the tables are read in one transaction.
+    ``progress(table, rows)`` is called each time a table is written.
+    Connections are opened by ``connect(db_path)``, which must be picklable
+    (a module level function or a functools.partial of one).
+    Return a dict table -> number of rows.
+    """
+    folder = Path(folder)
+    folder.mkdir(parents=True, exist_ok=True)
+    if tables is None:
+        conn = connect(db_path)
+        try:
+            tables = [r[0] for r in conn.execute(
+                "SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%' ORDER BY name")]
+        finally:
+            conn.close()
+    workers = max(1, min(workers, len(tables)))
+
+    counts, errors = {}, []
+    if workers == 1:
+        conn = connect(db_path)
+        try:
+            conn.execute("BEGIN")
+            for table in tables:
+                try:
+                    cursor = conn.execute(f"SELECT * FROM {quote_ident(table)}")
+                    with open_output(folder / f"{table}.csv") as out:
+                        counts[table] = write_csv(cursor, out, batch_rows)
+                    if progress:
+                        progress(table, counts[table])
+                except Exception as e:
+                    errors.append(f"{table}: {e}")
+        finally:
+            conn.close()
+    else:
+        # spawn: forking a process that runs Qt threads is not safe
+        ctx = multiprocessing.get_context('spawn')
+        tasks, results, barrier = ctx.Queue(), ctx.Queue(), ctx.Barrier(workers + 1)
+        for table in tables:
+            tasks.put(table)
+        for _ in range(workers):
+            tasks.put(None)
+        processes = [ctx.Process(target=_csv_worker,
+                                 args=(str(db_path), str(folder), batch_rows, tasks, results, barrier, connect))
+                     for _ in range(workers)]
+        with hold_write_lock(db_path):
+            for process in processes:
+                process.start()
+            try:
+                barrier.wait(timeout=60)   # every worker is in its read transaction
+            except threading.BrokenBarrierError:
+                pass   # a worker could not open its connection: it reports it
+        failed_workers = 0
+        while len(counts) + len(errors) - failed_workers < len(tables) and failed_workers < workers:
+            table, rows, error = results.get()
+            if table is None:
+                failed_workers += 1
+                errors.append(error)
+            elif error:
+                errors.append(f"{table}: {error}")
+            else:
+                counts[table] = rows
+                if progress:
+                    progress(table, rows)
+        for process in processes:
+            process.join()
+    if errors:
+        raise RuntimeError("\n".join(errors))
+    return counts
+
+
+def unique_names(header):
+    """Column names of a CSV header, with empty names replaced and duplicates numbered."""
+    names, seen = [], set()
+    for i, name in enumerate(header, 1):
+        name = name.strip() or f"column{i}"
+        base, n = name, 1
+        while name.lower() in seen:
+            n += 1
+            name = f"{base}_{n}"
+        seen.add(name.lower())
+        names.append(name)
+    return names
+
+
+def infer_column_types(rows, n_cols):
+    """SQLite type (INTEGER, REAL or TEXT) of each column from a sample of CSV rows; empty cells are NULL."""
+    types = []
+    for i in range(n_cols):
+        typ = 'INTEGER'
+        for row in rows:
+            value = row[i] if i < len(row) else ''
+            if value == '':
+                continue
+            if typ == 'INTEGER':
+                try:
+                    int(value)
+                    continue
+                except ValueError:
+                    typ = 'REAL'
+            try:
+                float(value)
+            except ValueError:
+                typ = 'TEXT'
+                break
+        types.append(typ)
+    return types
+
+
+def import_csv(db_path, path, table, sample_rows=1000, batch_rows=10000, progress=None):
+    """
+    Load the CSV file ``path`` into ``table`` (replaced if it exists), by chunks.
+
+    Column types are inferred from the first ``sample_rows`` rows (values that
+    do not match the type of their column are kept as text), rows are
+    inserted with executemany in one transaction with ``synchronous=OFF`` and
+    ``journal_mode=MEMORY`` for the duration of the load, and the indexes and
+    triggers the table had before are created again after the data (so the
+    triggers do not fire for the imported rows), except those using a column
+    the CSV no longer has (see restore_objects). The file is never fully in
+    memory. ``progress(rows, fraction_of_file)`` is called after each batch.
+    Return the number of rows imported and the names of the indexes and
+    triggers left out.
+    """
+    size = max(Path(path).stat().st_size, 1)
+    raw = open(path, 'rb')
+    text = io.TextIOWrapper(raw, encoding='utf-8-sig', newline='')
+    conn = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+    try:
+        sample = text.read(64 * 1024)
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=',;\t|')
+        except csv.Error:
+            dialect = csv.excel
+        text.seek(0)
+        reader = csv.reader(text, dialect)
+        header = next(reader, None)
+        if not header:
+            raise ValueError(f"{path} is empty")
+        first = [row for _, row in zip(range(sample_rows), reader) if row]
+        header = unique_names(header)
+        types = infer_column_types(first, len(header))
+        n_cols = len(header)
+
+        def rows_of(chunk):
+            # short rows are padded, extra fields are ignored
+            return [row if len(row) == n_cols else (row + [''] * n_cols)[:n_cols] for row in chunk if row]
+
+        name = quote_ident(table)
+        # DROP TABLE drops its indexes and triggers too: created again after the data (indexes first)
+        objects = conn.execute(
+            "SELECT type, name, sql FROM sqlite_master WHERE type IN ('index', 'trigger') AND tbl_name=? "
+            "AND sql NOT NULL ORDER BY type = 'trigger'", (table,)).fetchall()
+        old_sync = conn.execute("PRAGMA synchronous").fetchone()[0]
+        old_journal = conn.execute("PRAGMA journal_mode").fetchone()[0]
+        conn.execute("PRAGMA synchronous=OFF")
+        conn.execute("PRAGMA journal_mode=MEMORY")   # stays WAL if the database is in WAL mode
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute(f"DROP TABLE IF EXISTS {name}")
+                cols = ", ".join(f"{quote_ident(c)} {t}" for c, t in zip(header, types))
+                conn.execute(f"CREATE TABLE {name} ({cols})")
+                # values are converted by the affinity of the column, empty cells become NULL
+                values = ", ".join(["NULLIF(?, '')"] * n_cols)
+                insert = f"INSERT INTO {name} VALUES ({values})"
+                first = rows_of(first)
+                conn.executemany(insert, first)
+                written = len(first)
+                while chunk := list(itertools.islice(reader, batch_rows)):
+                    rows = rows_of(chunk)
+                    conn.executemany(insert, rows)
+                    written += len(rows)
+                    if progress:
+                        progress(written, raw.tell() / size)
+                skipped = restore_objects(conn, name, header, objects)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        finally:
+            conn.execute(f"PRAGMA journal_mode={old_journal}")
+            conn.execute(f"PRAGMA synchronous={old_sync}")
+        return written, skipped
+    finally:
+        conn.close()
+        text.close()
+
+
+def restore_objects(conn, table, columns, objects):
+    """
+    Create again the indexes and triggers ``objects`` [(type, name, sql)] of
+    ``table`` (quoted), now made of ``columns``, each in a savepoint; return
+    the names of those that fail. The columns a trigger uses are only
+    resolved when a statement firing it is compiled, so each trigger is tried
+    with EXPLAIN INSERT / UPDATE / DELETE (nothing runs).
+    """
+    assignments = ", ".join(f"{quote_ident(c)} = {quote_ident(c)}" for c in columns)
+    skipped = []
+    for number, (kind, object_name, sql) in enumerate(objects):
+        conn.execute("SAVEPOINT restore_object")
+        try:
+            conn.execute(sql)
+            if kind == 'trigger':
+                # a text of its own: a statement prepared before the trigger existed would not see it
+                for check in (f"INSERT INTO {table} DEFAULT VALUES", f"UPDATE {table} SET {assignments}",
+                              f"DELETE FROM {table}"):
+                    conn.execute(f"EXPLAIN {check} /* {number} */").fetchall()
+            conn.execute("RELEASE restore_object")
+        except sqlite3.Error:
+            conn.execute("ROLLBACK TO restore_object")
+            conn.execute("RELEASE restore_object")
+            skipped.append(object_name)
+    return skipped
+
+
+CREATE_NAME = re.compile(r'\s*CREATE\s+(TABLE|(?:UNIQUE\s+)?INDEX)\s+(?:IF\s+NOT\s+EXISTS\s+)?'
+                         r'("(?:[^"]|"")+"|\[[^\]]+\]|`[^`]+`|[\w$]+)', re.I)
+
+
+def copy_table(db_path, table, target_path, connect=sqlite3.connect):
+    """
+    Copy ``table`` of ``db_path`` into the database file ``target_path`` inside SQLite.
+
+    The target is attached to the connection and filled with a single
+    INSERT ... SELECT, in one transaction. The table and its indexes are
+    created there from their CREATE statements when it does not exist;
+    otherwise the rows are appended. Return the number of rows copied.
+    """
+    conn = connect(db_path)
+    conn.isolation_level = None
+    try:
+        conn.execute("ATTACH DATABASE ? AS copy_target", (str(target_path),))
+        columns = ", ".join(quote_ident(r[0]) for r in conn.execute(
+            "SELECT name FROM pragma_table_info(?, 'main')", (table,)))
+        if not columns:
+            raise sqlite3.OperationalError(f"no such table: {table}")
+        conn.execute("BEGIN")
+        try:
+            if not conn.execute("SELECT 1 FROM copy_target.sqlite_master WHERE type = 'table' AND name = ?",
+                                (table,)).fetchone():
+                objects = conn.execute(
+                    "SELECT sql FROM main.sqlite_master WHERE tbl_name = ? AND type IN ('table', 'index') "
+                    "AND sql NOT NULL ORDER BY type = 'index'", (table,)).fetchall()
+                for (sql,) in objects:
+                    conn.execute(CREATE_NAME.sub(lambda m: f"CREATE {m.group(1)} copy_target.{m.group(2)}", sql, 1))
+            rows = conn.execute(f"INSERT INTO copy_target.{quote_ident(table)} ({columns}) "
+                                f"SELECT {columns} FROM main.{quote_ident(table)}").rowcount
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return rows
+    finally:
+        conn.close()
+
+
+LEADING_COMMENTS = re.compile(r"(?:\s|--[^\n]*(?:\n|\Z)|/\*.*?\*/)*", re.S)
+
+
+def iter_statements(lines):
+    """
+    Yield ``(line number, statement)`` for each SQL statement of an iterable of lines.
+
+    Lines are accumulated until ``sqlite3.complete_statement`` says a statement
+    ends, which is only checked on lines holding a ';', so a statement spread
+    over many lines (multi-row INSERT of a dump) is not scanned again for each
+    line. Comment lines between statements are skipped.
+    """
+    buffer, first = [], 0
+    for number, line in enumerate(lines, 1):
+        if not buffer:
+            stripped = line.strip()
+            if not stripped or stripped.startswith('--'):
+                continue
+            first = number
+        buffer.append(line)
+        if ';' not in line:
+            continue
+        text = ''.join(buffer)
+        if not sqlite3.complete_statement(text):
+            continue
+        # several statements can end on the same line
+        start, end = 0, text.find(';')
+        while end != -1:
+            if sqlite3.complete_statement(text[start:end + 1]):
+                begin = LEADING_COMMENTS.match(text, start).end()
+                yield first + text.count('\n', 0, begin), text[begin:end + 1].strip()
+                start = end + 1
+            end = text.find(';', end + 1)
+        rest = text[start:]
+        if not LEADING_COMMENTS.fullmatch(rest):   # a comment after the last statement is not one
+            buffer = [rest]
+            first = number
+        else:
+            buffer = []
+    text = ''.join(buffer)
+    if not LEADING_COMMENTS.fullmatch(text):
+        yield first, text.strip()  # incomplete statement: running it reports the error
+
+
+class ScriptError(sqlite3.Error):
+    """Error of one statement of a script run by ScriptRunner."""
+
+    def __init__(self, message, line, statement):
+        super().__init__(message)
+        self.message = message
+        self.line = line
+        self.statement = statement
+
+    def __str__(self):
+        statement = self.statement if len(self.statement) <= 300 else self.statement[:300] + " ..."
+        return f"line {self.line}: {self.message}\n{statement}"
+
+
+class ScriptRunner:
+    """
+    Runs an SQL script (optionally .gz / .zst) on its own connection, statement by statement.
+
+    The file is read lazily and split with ``iter_statements``, so its size does
+    not matter. Statements are grouped in transactions of ``batch_size``
+    statements; statements that cannot run inside a transaction (BEGIN,
+    COMMIT, VACUUM, ATTACH, PRAGMA...) close the current batch first, and the
+    transactions opened by the script itself are left to it. On an error the
+    statements before it are kept, as with ``executescript``, except those of
+    an open transaction of the script, which is rolled back. ``cancel`` may be
+    called from another thread.
+
+    ``stats`` holds the number of statements run, the elapsed time and the
+    ``slowest`` statements as (seconds, line, statement) tuples.
+    """
+    BATCH_SIZE = 1000
+    SLOWEST = 20
+    OUTSIDE_TRANSACTION = ('BEGIN', 'COMMIT', 'END', 'ROLLBACK', 'SAVEPOINT', 'RELEASE',
+                           'VACUUM', 'ATTACH', 'DETACH', 'PRAGMA')
+
+    def __init__(self, db_path, path, batch_size=BATCH_SIZE):
+        self.db_path = db_path
+        self.path = path
+        self.batch_size = batch_size
+        self.stats = {'statements': 0, 'seconds': 0.0, 'slowest': []}
+        self.cancelled = False
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def cancel(self):
+        with self._lock:
+            self.cancelled = True
+            if self._conn is not None:
+                self._conn.interrupt()
+
+    def run(self, progress=None):
+        """Run the script; ``progress(statements, fraction_of_file, statements_per_second)`` is called a few times a second."""
+        size = max(Path(self.path).stat().st_size, 1)
+        text, raw = open_input(self.path)
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        with self._lock:
+            self._conn = conn
+        stats, slowest = self.stats, self.stats['slowest']
+        start = last_report = time.perf_counter()
+        own = False       # a batch transaction opened by the runner is in progress
+        in_batch = 0
+        try:
+            for line, statement in iter_statements(text):
+                if self.cancelled:
+                    raise ScriptError("Script cancelled", line, statement)
+                keyword = statement.split(None, 1)[0].upper().rstrip(';')
+                if keyword in self.OUTSIDE_TRANSACTION:
+                    if own:
+                        conn.execute("COMMIT")
+                        own = False
+                elif not conn.in_transaction:
+                    conn.execute("BEGIN")
+                    own, in_batch = True, 0
+                t = time.perf_counter()
+                try:
+                    conn.execute(statement)
+                except sqlite3.Error as e:
+                    raise ScriptError("Script cancelled" if self.cancelled else str(e), line, statement) from e
+                elapsed = time.perf_counter() - t
+                stats['statements'] += 1
+                entry = (elapsed, line, statement[:200])
+                if len(slowest) < self.SLOWEST:
+                    heapq.heappush(slowest, entry)
+                elif elapsed > slowest[0][0]:
+                    heapq.heapreplace(slowest, entry)
+                if own:
+                    in_batch += 1
+                    if in_batch >= self.batch_size:
+                        conn.execute("COMMIT")
+                        own = False
+                now = time.perf_counter()
+                if progress and now - last_report > 0.2:
+                    last_report = now
+                    progress(stats['statements'], raw.tell() / size, stats['statements'] / (now - start))
+            if conn.in_transaction:
+                conn.execute("COMMIT")
+        except BaseException:
+            if conn.in_transaction:
+                # keep the statements run before the error, not an unfinished transaction of the script
+                conn.execute("COMMIT" if own else "ROLLBACK")
+            raise
+        finally:
+            stats['seconds'] = time.perf_counter() - start
+            stats['slowest'] = sorted(slowest, reverse=True)
+            with self._lock:
+                self._conn = None
+            conn.close()
+            text.close()
+        return stats
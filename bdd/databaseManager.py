@@ -1,69 +1,262 @@
 import sys
 import os
+import html
 import shutil
+import re
 import sqlite3
-import requests
 import yaml
-import pandas as pd
 import tempfile
-import pydot
+import textwrap
+import threading
+import bisect
+import time
 from pathlib import Path
 from io import BytesIO
+from functools import partial
+from collections import OrderedDict, deque
 from PyQt6.QtWidgets import (
     QApplication, QMainWindow, QFileDialog, QTreeWidget, QTreeWidgetItem,
     QTableView, QSplitter, QWidget, QVBoxLayout, QHBoxLayout, QPlainTextEdit,
     QPushButton, QLabel, QMenuBar, QStatusBar, QMessageBox, QSizePolicy, QStyle,
     QInputDialog, QDialog, QDialogButtonBox, QFormLayout, QLineEdit, QCheckBox, QMenu,
-    QGraphicsView, QGraphicsScene, QGraphicsRectItem, QGraphicsTextItem, QStyledItemDelegate
+    QGraphicsView, QGraphicsScene, QGraphicsRectItem, QGraphicsTextItem, QStyledItemDelegate, QSpinBox,
+    QHeaderView, QWidgetAction, QComboBox, QTextBrowser
 )
-from PyQt6.QtCore import Qt, QAbstractTableModel, QModelIndex, QVariant, QUrl, QPointF
-from PyQt6.QtGui import QPixmap, QAction, QSyntaxHighlighter, QTextCharFormat, QFont, QColor, QIcon, QDesktopServices, QBrush, QPen
-from pygments import lex
-from pygments.lexers.sql import SqlLexer
-from pygments.token import Token
+from PyQt6.QtCore import Qt, QAbstractTableModel, QModelIndex, QVariant, QUrl, QPointF, QThread, QTimer, pyqtSignal
+from PyQt6.QtGui import QPixmap, QAction, QActionGroup, QSyntaxHighlighter, QTextCharFormat, QFont, QColor, QIcon, QDesktopServices, QBrush, QPen
+from ThumbnailLoader import ThumbnailLoader, is_image_path
+from BackgroundTask import BackgroundTask
+from ColumnarBuffer import ColumnarBuffer
+from QueryProfiler import QueryProfiler, ProfileStore
+from QueryStore import QueryStore
+from QueryHistory import QueryHistory
+from ConnectionPool import ConnectionPool, connect, profiles, profile_for, attach as attach_database
+from predefined_queries import PREDEFINED_QUERIES
+from queryParameters import parameters, bind, number
+import dataTransfer
+import recipeSearch
+from dataTransfer import quote_ident, normalize_sql
+
+SQL_KEYWORDS = frozenset("""
+    ABORT ACTION ADD AFTER ALL ALTER ALWAYS ANALYZE AND AS ASC ATTACH AUTOINCREMENT BEFORE BEGIN BETWEEN BY
+    CASCADE CASE CAST CHECK COLLATE COLUMN COMMIT CONFLICT CONSTRAINT CREATE CROSS CURRENT DATABASE DEFAULT
+    DEFERRABLE DEFERRED DELETE DESC DETACH DISTINCT DO DROP EACH ELSE END ESCAPE EXCEPT EXCLUDE EXCLUSIVE
+    EXISTS EXPLAIN FAIL FILTER FIRST FOLLOWING FOR FOREIGN FROM FULL GENERATED GLOB GROUP GROUPS HAVING IF
+    IGNORE IMMEDIATE IN INDEX INDEXED INITIALLY INNER INSERT INSTEAD INTERSECT INTO IS ISNULL JOIN KEY LAST
+    LEFT LIKE LIMIT MATCH MATERIALIZED NATURAL NO NOT NOTHING NOTNULL NULLS OF OFFSET ON OR ORDER OTHERS
+    OUTER OVER PARTITION PLAN PRAGMA PRECEDING PRIMARY QUERY RAISE RANGE RECURSIVE REFERENCES REGEXP REINDEX
+    RELEASE RENAME REPLACE RESTRICT RETURNING RIGHT ROLLBACK ROW ROWS SAVEPOINT SELECT SET STRICT TABLE TEMP
+    TEMPORARY THEN TIES TO TRANSACTION TRIGGER UNBOUNDED UNION UNIQUE UPDATE USING VACUUM VALUES VIEW
+    VIRTUAL WHEN WHERE WINDOW WITH WITHOUT ROWID
+""".split())
+SQL_CONSTANTS = frozenset("NULL TRUE FALSE CURRENT_DATE CURRENT_TIME CURRENT_TIMESTAMP".split())
+SQL_TYPES = frozenset("""
+    INT INTEGER TINYINT SMALLINT MEDIUMINT BIGINT REAL DOUBLE FLOAT NUMERIC DECIMAL BOOLEAN DATE DATETIME
+    TIMESTAMP TEXT CHAR VARCHAR NCHAR NVARCHAR CLOB BLOB ANY
+""".split())
+
+class SqlHighlighter(QSyntaxHighlighter):
+    """
+    SQL highlighter for the query editor.
+
+    Each line is tokenized with one precompiled regex and keyword tables. The
+    state of the end of the line (inside a /* comment */, a 'string' or a
+    "quoted identifier") is kept with setCurrentBlockState, so Qt only
+    highlights again the edited lines, and the following ones while their
+    state changes. The formats of a line are cached by (state, text): lines
+    seen before (pasting a script again, a comment opened then closed) are
+    not tokenized again.
+    """
+    NORMAL, COMMENT, STRING, IDENTIFIER = 0, 1, 2, 3
+    CACHE_SIZE = 50000
+    TOKENS = re.compile(r"""
+          (?P<comment>--.*)
+        | (?P<block>/\*.*?(?P<block_end>\*/)?(?(block_end)|$))
+        | (?P<string>'(?:[^']|'')*(?P<string_end>')?)
+        | (?P<ident>"(?:[^"]|"")*(?P<ident_end>")?|`[^`]*`?|\[[^\]]*\]?)
+        | (?P<number>\b\d+(?:\.\d*)?(?:[eE][-+]?\d+)?\b)
+        | (?P<word>[A-Za-z_][A-Za-z0-9_$]*)
+    """, re.X)
+    # continuation of a token opened on a previous line
+    CONTINUE = {
+        COMMENT: re.compile(r".*?\*/"),
+        STRING: re.compile(r"(?:[^']|'')*'"),
+        IDENTIFIER: re.compile(r'(?:[^"]|"")*"'),
+    }
 
-class PygmentsHighlighter(QSyntaxHighlighter):
     def __init__(self, parent):
         super().__init__(parent.document())
-        self.lexer = SqlLexer()
-
-        # mapping des types Pygments → formats Qt
-        self.formats = {}
         def _fmt(color_name, bold=False):
             f = QTextCharFormat()
             if bold: f.setFontWeight(QFont.Weight.Bold)
             f.setForeground(QColor(color_name))
             return f
 
-
-        self.formats[Token.Keyword] = _fmt("lightBlue", bold=True)
-
-        # under categories
-        self.formats[Token.Keyword.Constant] = _fmt("lightGreen")
-        self.formats[Token.Keyword.Declaration] = _fmt("lightBlue", bold=True)
-        self.formats[Token.Keyword.Reserved] = _fmt("lightBlue", bold=True)
-        self.formats[Token.Keyword.Type] = _fmt("lightPurple")
-
-        # String literals
-        self.formats[Token.Literal.String] = _fmt("lightOrange")
-
-        # Comments
-        self.formats[Token.Comment] = _fmt("gray")
-
+        self.formats = {
+            'keyword': _fmt("lightBlue", bold=True),
+            'constant': _fmt("lightGreen"),
+            'type': _fmt("plum"),
+            'string': _fmt("orange"),
+            'comment': _fmt("gray"),
+        }
+        self._words = {}                 # word -> format name or None
+        self._cache = OrderedDict()      # (state, text) -> (runs, end state)
+
+    def _word_format(self, word):
+        kind = self._words.get(word, '')
+        if kind == '':
+            upper = word.upper()
+            kind = ('keyword' if upper in SQL_KEYWORDS else 'constant' if upper in SQL_CONSTANTS
+                    else 'type' if upper in SQL_TYPES else None)
+            self._words[word] = kind
+        return kind
+
+    def tokenize(self, text, state=NORMAL):
+        """Return the (start, length, format name) runs of a line and the state at its end."""
+        runs = []
+        pos = 0
+        if state != self.NORMAL:
+            # quoted identifiers are not highlighted
+            kind = {self.COMMENT: 'comment', self.STRING: 'string'}.get(state)
+            m = self.CONTINUE[state].match(text)
+            end = len(text) if m is None else m.end()
+            if kind:
+                runs.append((0, end, kind))
+            if m is None:
+                return runs, state
+            pos = end
+        state = self.NORMAL
+        word_format = self._word_format
+        for m in self.TOKENS.finditer(text, pos):
+            group = m.lastgroup
+            if group == 'word':
+                kind = word_format(m.group())
+                if kind:
+                    runs.append((m.start(), m.end() - m.start(), kind))
+                continue
+            if group == 'number':
+                continue
+            start, length = m.start(), m.end() - m.start()
+            if group == 'comment':
+                runs.append((start, length, 'comment'))
+            elif group == 'block':
+                runs.append((start, length, 'comment'))
+                if m.group('block_end') is None:
+                    state = self.COMMENT
+            elif group == 'string':
+                runs.append((start, length, 'string'))
+                if m.group('string_end') is None:
+                    state = self.STRING
+            elif m.group().startswith('"') and m.group('ident_end') is None:
+                state = self.IDENTIFIER
+        return runs, state
 
     def highlightBlock(self, text: str):
-        index = 0
-        for token, content in lex(text, self.lexer):
-            fmt = self.formats.get(token)
-            if fmt:
-                self.setFormat(index, len(content), fmt)
-            index += len(content)
+        state = max(self.previousBlockState(), self.NORMAL)
+        key = (state, text)
+        entry = self._cache.get(key)
+        if entry is None:
+            entry = self._cache[key] = self.tokenize(text, state)
+            if len(self._cache) > self.CACHE_SIZE:
+                self._cache.popitem(last=False)
+        else:
+            self._cache.move_to_end(key)
+        runs, end_state = entry
+        formats = self.formats
+        for start, length, kind in runs:
+            self.setFormat(start, length, formats[kind])
+        self.setCurrentBlockState(end_state)
 
 class SQLiteModel(QAbstractTableModel):
-    def __init__(self, data, headers, parent=None):
+    """Table model over query results.
+
+    When built from a cursor (see ``from_cursor``) only the first batch is read;
+    the next ones are pulled with ``fetchmany`` as the view scrolls down
+    (canFetchMore / fetchMore), so a large result never has to be fetched at once.
+    """
+    BATCH_SIZE = 500
+
+    def __init__(self, data, headers, parent=None, cursor=None, batch_size=BATCH_SIZE):
         super().__init__(parent)
-        self._data = data
+        # a ColumnarBuffer (e.g. a cached result) is shared, not copied
+        self._data = data if isinstance(data, ColumnarBuffer) else ColumnarBuffer(data)
         self._headers = headers
+        self._cursor = cursor
+        self._stream = None
+        self.batch_size = batch_size
+        self._thumbnails = None
+        self._waiting_thumbnails = {}  # image source -> cells to repaint
+
+    def set_thumbnail_loader(self, loader):
+        """Show the images of the cells holding an image URL or path, loaded by ``loader``."""
+        if self._thumbnails is not None:
+            self._thumbnails.loaded.disconnect(self._on_thumbnail_loaded)
+        self._thumbnails = loader
+        if loader is not None:
+            loader.loaded.connect(self._on_thumbnail_loaded)
+
+    def _on_thumbnail_loaded(self, source):
+        for row, col in self._waiting_thumbnails.pop(source, ()):
+            index = self.index(row, col)
+            self.dataChanged.emit(index, index, [Qt.ItemDataRole.DecorationRole])
+
+    @classmethod
+    def from_cursor(cls, cursor, batch_size=BATCH_SIZE, parent=None):
+        headers = [d[0] for d in cursor.description]
+        model = cls([], headers, parent, cursor=cursor, batch_size=batch_size)
+        model.fetchMore()
+        return model
+
+    def stream_from(self, worker):
+        """Receive the columns and rows of a QueryWorker as they are read (connect before it starts)."""
+        self._stream = worker
+        worker.columns.connect(self.set_headers)
+        worker.batch.connect(self.append_rows)
+        worker.done.connect(self._end_stream)
+
+    def set_headers(self, headers):
+        self.beginResetModel()
+        self._headers = headers
+        self.endResetModel()
+
+    def _end_stream(self, *_):
+        self._stream = None
+
+    def release(self):
+        # stop reading from the cursor (before the connection changes or closes)
+        if self._cursor is not None:
+            self._cursor.close()
+            self._cursor = None
+        if self._stream is not None:
+            # a worker waiting for the view still holds a read statement: it would block the writers
+            worker, self._stream = self._stream, None
+            worker.cancel()
+            worker.wait()
+
+    def append_rows(self, rows):
+        if not rows:
+            return
+        first = len(self._data)
+        self.beginInsertRows(QModelIndex(), first, first + len(rows) - 1)
+        self._data.extend(rows)
+        self.endInsertRows()
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and (self._cursor is not None or self._stream is not None)
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid():
+            return
+        if self._stream is not None:
+            # the worker reads ahead of the view, let it go further
+            self._stream.fetch_more(len(self._data) + self.batch_size)
+            return
+        if self._cursor is None:
+            return
+        rows = self._cursor.fetchmany(self.batch_size)
+        if len(rows) < self.batch_size:
+            self._cursor = None
+        self.append_rows(rows)
 
     def rowCount(self, parent=QModelIndex()):
         return len(self._data)
@@ -71,21 +264,27 @@ class SQLiteModel(QAbstractTableModel):
     def columnCount(self, parent=QModelIndex()):
         return len(self._headers)
 
+    def _value(self, row, col):
+        return self._data.value(row, col)
+
     def data(self, index, role=Qt.ItemDataRole.DisplayRole):
         if not index.isValid():
             return QVariant()
-        value = self._data[index.row()][index.column()]
-        if role == Qt.ItemDataRole.DecorationRole and isinstance(value, str) and value.startswith(('http://', 'https://')):
-            if value.lower().endswith(('.png', '.jpg', '.jpeg', '.gif', '.bmp')):
-                try:
-                    resp = requests.get(value)
-                    pix = QPixmap()
-                    pix.loadFromData(resp.content)
-                    return pix.scaled(64, 64, Qt.AspectRatioMode.KeepAspectRatio)
-                except Exception:
-                    return QVariant()
+        if role not in (Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.DecorationRole):
+            return QVariant()
+        value = self._value(index.row(), index.column())
+        if role == Qt.ItemDataRole.DecorationRole:
+            if self._thumbnails is None or not is_image_path(value):
+                return QVariant()
+            pix = self._thumbnails.get(value)
+            if pix is None:
+                if self._thumbnails.is_loading(value):
+                    # repainted by _on_thumbnail_loaded once the image is ready
+                    self._waiting_thumbnails.setdefault(value, set()).add((index.row(), index.column()))
+                return QVariant()
+            return pix
         if role == Qt.ItemDataRole.DisplayRole:
-            return str(value)
+            return value if type(value) is str else str(value)
         return QVariant()
 
     def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
@@ -96,6 +295,657 @@ class SQLiteModel(QAbstractTableModel):
                 return section + 1
         return QVariant()
 
+FILTER_OPERATORS = ('<=', '>=', '!=', '<>', '=', '<', '>')
+
+def filter_clause(column, text):
+    """
+    Translate the text typed in a column filter into an SQL condition.
+
+    ``= v``, ``!= v``, ``< v``... compare with v (as a number when it is one),
+    ``NULL`` / ``!NULL`` test for NULL, text containing ``%`` or ``_`` is a LIKE
+    pattern and any other text must be contained in the value.
+    """
+    col = quote_ident(column)
+    text = text.strip()
+    if text.upper() == 'NULL':
+        return f"{col} IS NULL", ()
+    if text.upper() == '!NULL':
+        return f"{col} IS NOT NULL", ()
+    for op in FILTER_OPERATORS:
+        if text.startswith(op):
+            value = number(text[len(op):].strip())
+            return f"{col} {'!=' if op == '<>' else op} ?", (value,)
+    if '%' in text or '_' in text:
+        return f"{col} LIKE ?", (text,)
+    return f"{col} LIKE ?", (f"%{text}%",)
+
+class SQLiteTableModel(SQLiteModel):
+    """Random-access model over a whole rowid table.
+
+    rowCount() is the real row count, but only the pages around the rows the
+    view asks for are kept in memory (LRU of ``MAX_PAGES`` pages). A page is read
+    with a keyset seek (``WHERE (col, rowid) > (?, ?) ORDER BY col, rowid LIMIT n``)
+    starting from the closest page whose bounds are already known, or from the
+    start/end of the table, so jumping to any row never loads the rows before it.
+
+    Sorting (``sort``, called on header clicks) and column filters (``set_filter``)
+    are pushed down to SQLite as ORDER BY / WHERE, so they can use the indexes
+    of the table and only the displayed pages are read.
+    """
+    PAGE_SIZE = 256
+    MAX_PAGES = 16
+    PREFETCH = 64   # rows from a page edge at which the neighbour page is loaded
+
+    def __init__(self, conn, table, page_size=PAGE_SIZE, parent=None, cache=None):
+        self.conn = conn
+        self.table = table
+        self.page_size = page_size
+        self.cache = cache          # ResultCache shared by the models of the connection
+        cursor = conn.execute(f"SELECT * FROM {quote_ident(table)} LIMIT 0")
+        super().__init__([], [d[0] for d in cursor.description], parent)
+        self.sort_column = None     # None: rowid order
+        self.descending = False
+        self.filters = {}           # column index -> filter text
+        self._reset()
+
+    @staticmethod
+    def has_rowid(conn, table):
+        # views and WITHOUT ROWID tables have no rowid to seek on
+        try:
+            conn.execute(f"SELECT rowid FROM {quote_ident(table)} LIMIT 0")
+            return True
+        except sqlite3.OperationalError:
+            return False
+
+    def _where(self):
+        clauses, params = [], ()
+        for column, text in sorted(self.filters.items()):
+            clause, values = filter_clause(self._headers[column], text)
+            clauses.append(clause)
+            params += values
+        return clauses, params
+
+    def _reset(self):
+        clauses, params = self._where()
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        self._count = self._fetchall(f"SELECT COUNT(*) FROM {quote_ident(self.table)}{where}", params)[0][0]
+        self._pages = OrderedDict()  # page -> rows, in LRU order
+        self._bounds = {}            # page -> (first key, last key), kept after eviction
+
+    def _fetchall(self, sql, params):
+        if self.cache is None:
+            return self.conn.execute(sql, params).fetchall()
+        return self.cache.fetchall(self.conn, sql, params)
+
+    def sort(self, column, order=Qt.SortOrder.AscendingOrder):
+        sort_column = column if 0 <= column < len(self._headers) else None
+        descending = sort_column is not None and order == Qt.SortOrder.DescendingOrder
+        if (sort_column, descending) == (self.sort_column, self.descending):
+            return
+        self.beginResetModel()
+        self.sort_column, self.descending = sort_column, descending
+        self._reset()
+        self.endResetModel()
+
+    def set_filter(self, column, text):
+        if not text.strip():
+            if column not in self.filters:
+                return
+            del self.filters[column]
+        elif self.filters.get(column) == text:
+            return
+        else:
+            self.filters[column] = text
+        self.beginResetModel()
+        try:
+            self._reset()
+        finally:
+            self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self._count
+
+    def _value(self, row, col):
+        return self._row(row)[col]
+
+    def _row(self, row):
+        page, offset = divmod(row, self.page_size)
+        if offset >= self.page_size - self.PREFETCH and (page + 1) * self.page_size < self._count:
+            self._page(page + 1)
+        elif offset < self.PREFETCH and page > 0:
+            self._page(page - 1)
+        rows = self._page(page)
+        if offset >= len(rows):  # the table shrank since the count
+            return (None,) * len(self._headers)
+        return rows[offset]
+
+    def _seek(self, key, backward, inclusive=False):
+        """Condition selecting the rows after ``key`` in display order (before it when ``backward``)."""
+        rowid, value = key[0], key[-1]
+        desc = self.descending != backward
+        cmp = ('<' if desc else '>') + ('=' if inclusive else '')
+        if self.sort_column is None:
+            return f"rowid {cmp} ?", (rowid,)
+        col = quote_ident(self._headers[self.sort_column])
+        # NULLs sort first: they are before any value in ascending order, after it in descending order
+        if value is None:
+            if desc:
+                return f"({col} IS NULL AND rowid {cmp} ?)", (rowid,)
+            return f"(({col} IS NULL AND rowid {cmp} ?) OR {col} IS NOT NULL)", (rowid,)
+        null = f" OR {col} IS NULL" if desc else ""
+        return f"({col} {cmp[0]} ? OR ({col} = ? AND rowid {cmp} ?){null})", (value, value, rowid)
+
+    def _select(self, seek, backward, limit, offset=0):
+        clauses, params = self._where()
+        if seek is not None:
+            clauses.append(seek[0])
+            params += seek[1]
+        where = f"WHERE {' AND '.join(clauses)} " if clauses else ""
+        direction = "DESC" if self.descending != backward else "ASC"
+        if self.sort_column is None:
+            keys, order = "rowid", f"rowid {direction}"
+        else:
+            col = quote_ident(self._headers[self.sort_column])
+            keys, order = f"rowid, {col}", f"{col} {direction}, rowid {direction}"
+        sql = f"SELECT {keys}, * FROM {quote_ident(self.table)} {where}ORDER BY {order} LIMIT ? OFFSET ?"
+        rows = self._fetchall(sql, params + (limit, offset))
+        return rows[::-1] if backward else rows
+
+    def _page(self, page):
+        if page in self._pages:
+            self._pages.move_to_end(page)
+            return self._pages[page]
+
+        size = self.page_size
+        n_rows = min(size, self._count - page * size)
+        if page in self._bounds:
+            rows = self._select(self._seek(self._bounds[page][0], False, inclusive=True), False, size)
+        elif page - 1 in self._bounds:
+            rows = self._select(self._seek(self._bounds[page - 1][1], False), False, size)
+        elif page + 1 in self._bounds:
+            rows = self._select(self._seek(self._bounds[page + 1][0], True), True, n_rows)
+        else:
+            # seek from the closest known edge: a known page, the start or the end of the table
+            below = max((p for p in self._bounds if p < page), default=None)
+            above = min((p for p in self._bounds if p > page), default=None)
+            skip_start = page * size if below is None else (page - below - 1) * size
+            skip_end = self._count - page * size - n_rows if above is None else (above - page - 1) * size
+            if skip_start <= skip_end:
+                seek = None if below is None else self._seek(self._bounds[below][1], False)
+                rows = self._select(seek, False, size, skip_start)
+            else:
+                seek = None if above is None else self._seek(self._bounds[above][0], True)
+                rows = self._select(seek, True, n_rows, skip_end)
+
+        n_keys = 1 if self.sort_column is None else 2
+        if rows:
+            self._bounds[page] = (rows[0][:n_keys], rows[-1][:n_keys])
+        self._pages[page] = [r[n_keys:] for r in rows]
+        while len(self._pages) > self.MAX_PAGES:
+            self._pages.popitem(last=False)
+        return self._pages[page]
+
+class SchemaCache:
+    """
+    Schema of a database: every table, view, index and trigger with its columns,
+    indexes and foreign keys, read in a single query joining sqlite_master with
+    the pragma_table_info / pragma_index_list / pragma_foreign_key_list functions.
+
+    ``refresh`` only re-reads it when PRAGMA schema_version has changed (any DDL,
+    from this connection or another one) and tells which objects changed.
+    """
+    QUERY = """
+        SELECT m.type, m.name, m.sql, 'object', NULL, NULL, NULL, NULL, NULL, NULL
+        FROM sqlite_master m
+        UNION ALL
+        SELECT m.type, m.name, m.sql, 'column', p.cid, p.name, p.type, p."notnull", p.dflt_value, p.pk
+        FROM sqlite_master m JOIN pragma_table_info(m.name) p
+        WHERE m.type IN ('table', 'view')
+        UNION ALL
+        SELECT m.type, m.name, m.sql, 'index', i.seq, i.name, i."unique", i.origin, i.partial, NULL
+        FROM sqlite_master m JOIN pragma_index_list(m.name) i
+        WHERE m.type = 'table'
+        UNION ALL
+        SELECT m.type, m.name, m.sql, 'foreign_key', f.id, f."table", f."from", f."to", f.on_update, f.on_delete
+        FROM sqlite_master m JOIN pragma_foreign_key_list(m.name) f
+        WHERE m.type = 'table'
+    """
+
+    def __init__(self):
+        self.version = None
+        self.objects = {}  # name -> {'type', 'sql', 'columns', 'indexes', 'foreign_keys'}
+
+    def clear(self):
+        self.version = None
+        self.objects = {}
+
+    def refresh(self, conn):
+        """Re-read the schema if it changed; return the (added, removed, changed) object names."""
+        version = conn.execute("PRAGMA schema_version").fetchone()[0]
+        if version == self.version:
+            return set(), set(), set()
+        try:
+            rows = conn.execute(self.QUERY).fetchall()
+        except sqlite3.OperationalError:
+            # e.g. a view on a dropped table makes pragma_table_info fail: read object by object
+            rows = []
+            names = [r[0] for r in conn.execute("SELECT name FROM sqlite_master")]
+            for name in names:
+                query = self.QUERY.replace("FROM sqlite_master m", "FROM (SELECT * FROM sqlite_master WHERE name = ?) m")
+                try:
+                    rows += conn.execute(query, (name,) * 4).fetchall()
+                except sqlite3.OperationalError:
+                    rows += conn.execute("SELECT type, name, sql, 'object', NULL, NULL, NULL, NULL, NULL, NULL "
+                                         "FROM sqlite_master WHERE name = ?", (name,)).fetchall()
+
+        objects = {}
+        for typ, name, sql, kind, *info in rows:
+            obj = objects.setdefault(name, {'type': typ, 'sql': sql, 'columns': [], 'indexes': [], 'foreign_keys': []})
+            if kind == 'column':
+                obj['columns'].append(tuple(info))                # cid, name, type, notnull, default, pk
+            elif kind == 'index':
+                obj['indexes'].append(tuple(info[:5]))            # seq, name, unique, origin, partial
+            elif kind == 'foreign_key':
+                obj['foreign_keys'].append(tuple(info))           # id, table, from, to, on_update, on_delete
+        for obj in objects.values():
+            for key in ('columns', 'indexes', 'foreign_keys'):
+                obj[key].sort()
+
+        old = self.objects
+        added = objects.keys() - old.keys()
+        removed = old.keys() - objects.keys()
+        changed = {n for n in objects.keys() & old.keys() if objects[n] != old[n]}
+        self.version, self.objects = version, objects
+        return added, removed, changed
+
+    def names(self, typ='table'):
+        return sorted(n for n, o in self.objects.items() if o['type'] == typ and not n.startswith('sqlite_'))
+
+    def columns(self, name):
+        obj = self.objects.get(name)
+        return obj['columns'] if obj else []
+
+    def identifiers(self):
+        """Names of the tables, views and columns (the values accepted for {identifier} parameters)."""
+        names = set(self.names('table')) | set(self.names('view'))
+        return names | {c[1] for n in names for c in self.columns(n)}
+
+class ResultCache:
+    """
+    Results of read queries on one connection, keyed by normalized SQL and parameters.
+
+    Entries are evicted least recently used first when their estimated size
+    goes over ``max_bytes``. The whole cache is dropped as soon as the
+    database changed: PRAGMA data_version (commits of other connections or
+    processes), total_changes (writes of this connection) or schema_version
+    (DDL) of the main or an attached database, checked on each lookup, so a
+    cached result is never stale.
+    """
+    MAX_BYTES = 64 * 1024 * 1024
+
+    def __init__(self, max_bytes=MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.version = None
+        self._entries = OrderedDict()  # (sql, params) -> (value, size)
+
+    def clear(self):
+        self._entries.clear()
+        self.size = 0
+        self.version = None
+
+    # date and time functions give "now" without a time value (or with 'now'): any call is volatile
+    VOLATILE = re.compile(r"\b(random|randomblob|changes|total_changes|last_insert_rowid|now|returning"
+                          r"|current_(timestamp|date|time)"
+                          r"|(date|time|datetime|julianday|unixepoch|strftime|timediff)\s*\()", re.I)
+
+    @classmethod
+    def cacheable(cls, sql):
+        """Whether ``sql`` only reads, with a result that only depends on the data."""
+        words = normalize_sql(sql).split(None, 1)
+        return bool(words) and words[0].upper() in ('SELECT', 'WITH', 'VALUES') and not cls.VOLATILE.search(sql)
+
+    @staticmethod
+    def data_version(conn):
+        version = conn.execute("SELECT data_version, schema_version FROM pragma_data_version, pragma_schema_version"
+                               ).fetchone() + (conn.total_changes,)
+        # results of cross-database queries also depend on the attached databases
+        for (schema,) in conn.execute("SELECT name FROM pragma_database_list WHERE name NOT IN ('main', 'temp')"
+                                      ).fetchall():
+            # (schema.pragma_xxx table-valued functions would read the main database)
+            version += (conn.execute(f"PRAGMA {quote_ident(schema)}.data_version").fetchone()[0],
+                        conn.execute(f"PRAGMA {quote_ident(schema)}.schema_version").fetchone()[0])
+        return version
+
+    def _validate(self, conn):
+        version = self.data_version(conn)
+        if version != self.version:
+            self.clear()
+            self.version = version
+        return version
+
+    @staticmethod
+    def size_of(value):
+        if hasattr(value, 'nbytes'):
+            return value.nbytes()
+        if isinstance(value, tuple):
+            return sys.getsizeof(value) + sum(ResultCache.size_of(v) for v in value)
+        if isinstance(value, list):
+            # rows: estimated from the first ones
+            sample = value[:32]
+            per_row = sum(map(ResultCache.size_of, sample)) / len(sample) if sample else 0
+            return sys.getsizeof(value) + int(per_row * len(value))
+        return sys.getsizeof(value)
+
+    @staticmethod
+    def key(sql, params):
+        # named parameters come as a dict
+        return normalize_sql(sql), tuple(sorted(params.items()) if isinstance(params, dict) else params)
+
+    def get(self, conn, sql, params=()):
+        """Cached value of ``sql`` / ``params``, or None."""
+        self._validate(conn)
+        key = self.key(sql, params)
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        self._entries.move_to_end(key)
+        return entry[0]
+
+    def put(self, conn, sql, params, value, version=None):
+        """
+        Store ``value`` for ``sql`` / ``params``. ``version`` is the data_version
+        the value was read at, when it was read by another connection: it is
+        not stored if the database changed since.
+        """
+        current = self._validate(conn)
+        if version is not None and version != current:
+            return
+        size = self.size_of(value)
+        if size > self.max_bytes // 4:
+            return  # too large, would evict everything else
+        key = self.key(sql, params)
+        if key in self._entries:
+            self.size -= self._entries.pop(key)[1]
+        self._entries[key] = (value, size)
+        self.size += size
+        while self.size > self.max_bytes:
+            self.size -= self._entries.popitem(last=False)[1][1]
+
+    def fetchall(self, conn, sql, params=()):
+        """``conn.execute(sql, params).fetchall()``, from the cache when possible."""
+        rows = self.get(conn, sql, params)
+        if rows is None:
+            rows = conn.execute(sql, params).fetchall()
+            self.put(conn, sql, params, rows)
+        return rows
+
+class WorkspaceEntry:
+    """One open database of a Workspace: its connection, read pool, schema, cached results and attached files."""
+
+    def __init__(self, path, profile):
+        self.path = path
+        self.profile = profile
+        self.conn = connect(path, profile)
+        self.pool = ConnectionPool(path, profile)
+        self.schema = SchemaCache()
+        self.results = ResultCache()
+        self.attached = {}   # alias -> path
+        self._queries = None
+
+    def queries(self):
+        """QueryStore of the database, opened on first use."""
+        if self._queries is None:
+            self._queries = QueryStore(self.path)
+        return self._queries
+
+    def attach(self, alias, path):
+        attach_database(self.conn, alias, path, read_only=self.profile['immutable'])
+        self.pool.attach(alias, path)
+        self.attached[alias] = path
+        self.results.clear()
+
+    def detach(self, alias):
+        self.conn.execute(f"DETACH DATABASE {quote_ident(alias)}")
+        self.pool.detach(alias)
+        del self.attached[alias]
+        self.results.clear()
+
+    def close(self):
+        if self._queries is not None:
+            self._queries.close()
+        self.pool.close()
+        self.conn.close()
+
+class Workspace:
+    """
+    The ``size`` most recently used databases, kept open.
+
+    Going back to one of them reuses its connection (and SQLite page cache),
+    its SchemaCache, its ResultCache (table pages and query results) and its
+    attached databases; the least recently used one is closed when another
+    database is opened.
+    """
+    SIZE = 4
+
+    def __init__(self, size=SIZE):
+        self.size = max(1, size)
+        self.entries = OrderedDict()  # path -> WorkspaceEntry
+
+    def __contains__(self, path):
+        return path in self.entries
+
+    def open(self, path, profile):
+        entry = self.entries.get(path)
+        if entry is not None and entry.profile != profile:
+            self.close(path)
+            entry = None
+        if entry is None:
+            entry = WorkspaceEntry(path, profile)
+            self.entries[path] = entry
+        self.entries.move_to_end(path)
+        while len(self.entries) > self.size:
+            self.entries.popitem(last=False)[1].close()
+        return entry
+
+    def close(self, path):
+        entry = self.entries.pop(path, None)
+        if entry is not None:
+            entry.close()
+
+    def close_all(self):
+        while self.entries:
+            self.entries.popitem()[1].close()
+
+class QueryWorker(QThread):
+    """
+    Runs one SQL statement on its own connection in a background thread.
+
+    With a ``pool``, statements that only read run on one of its read-only
+    connections (a statement that turns out to write is run again on a
+    connection of its own), so they do not wait for a writer.
+
+    Result rows are sent by batches through ``batch``; the worker only reads
+    ``READ_AHEAD`` rows further than the view asked for (``fetch_more``) and
+    then waits, so a huge SELECT does not end up fully in memory; ``paused``
+    is emitted the first time it waits (the query is then done for the user,
+    the next rows are read on scroll). ``cancel``
+    interrupts the statement with Connection.interrupt(), and ``timeout``
+    (seconds, None for no limit) is enforced by a progress handler.
+    """
+    BATCH_SIZE = 500
+    READ_AHEAD = 5000
+    PROGRESS_STEPS = 10000  # VM instructions between two progress handler calls
+    READS = re.compile(r"(?:\s|--[^\n]*\n?|/\*.*?\*/)*(?:SELECT|WITH|VALUES|EXPLAIN)\b", re.I | re.S)
+
+    columns = pyqtSignal(list)
+    batch = pyqtSignal(list)
+    paused = pyqtSignal(int, float)     # rows read, elapsed seconds
+    done = pyqtSignal(int, float, str)  # rows read or changed, elapsed seconds, error ('' on success)
+
+    def __init__(self, db_path, sql, params=(), timeout=None, parent=None, pool=None):
+        super().__init__(parent)
+        self.db_path = db_path
+        self.pool = pool
+        self.sql = sql
+        self.params = params
+        self.timeout = timeout
+        self.is_select = False
+        self.row_count = 0
+        self._conn = None
+        self._start = None
+        self._deadline = None
+        self._wanted = self.READ_AHEAD
+        self._cancelled = False
+        self._timed_out = False
+        self._paused = False
+        self.reported = False   # set by the window when it took the pause as the end of the query
+        self._cond = threading.Condition()
+
+    def elapsed(self):
+        return time.perf_counter() - self._start if self._start else 0.0
+
+    def fetch_more(self, rows):
+        with self._cond:
+            self._wanted = max(self._wanted, rows + self.READ_AHEAD)
+            self._cond.notify()
+
+    def cancel(self):
+        with self._cond:
+            self._cancelled = True
+            self._cond.notify()
+            if self._conn is not None:
+                self._conn.interrupt()
+
+    def _on_progress(self):
+        if self._deadline is not None and time.perf_counter() > self._deadline:
+            self._timed_out = True
+            return 1
+        return 1 if self._cancelled else 0
+
+    def _wait_for_view(self):
+        with self._cond:
+            waited = time.perf_counter()
+            if self.row_count >= self._wanted and not self._cancelled and not self._paused:
+                self._paused = True
+                self.paused.emit(self.row_count, waited - self._start)
+            while self.row_count >= self._wanted and not self._cancelled:
+                self._cond.wait()
+            # time spent waiting for the view does not count in the timeout
+            if self._deadline is not None:
+                self._deadline += time.perf_counter() - waited
+            return not self._cancelled
+
+    def _open(self, conn):
+        with self._cond:
+            self._conn = conn
+        conn.set_progress_handler(self._on_progress, self.PROGRESS_STEPS)
+        return conn
+
+    def run(self):
+        self._start = time.perf_counter()
+        if self.timeout:
+            self._deadline = self._start + self.timeout
+        error = ''
+        conn = pooled = cursor = None
+        try:
+            if self.pool is not None and self.READS.match(self.sql):
+                conn = pooled = self._open(self.pool.get())
+                try:
+                    cursor = conn.execute(self.sql, self.params)
+                except sqlite3.OperationalError as e:
+                    if 'readonly' not in str(e) or self._cancelled:
+                        raise
+                    self.pool.put(pooled)
+                    conn = pooled = None
+            if conn is None:
+                if self.pool is not None:
+                    conn = self._open(connect(self.db_path, self.pool.profile, attached=self.pool.attached))
+                else:
+                    conn = self._open(sqlite3.connect(self.db_path))
+                cursor = conn.execute(self.sql, self.params)
+            if cursor.description:
+                self.is_select = True
+                self.columns.emit([d[0] for d in cursor.description])
+                while self._wait_for_view():
+                    rows = cursor.fetchmany(self.BATCH_SIZE)
+                    self.row_count += len(rows)
+                    if rows:
+                        self.batch.emit(rows)
+                    if len(rows) < self.BATCH_SIZE:
+                        break
+            else:
+                conn.commit()
+                self.row_count = max(cursor.rowcount, 0)
+        except sqlite3.Error as e:
+            if self._timed_out:
+                error = f"Query timed out after {self.timeout} s"
+            elif self._cancelled:
+                error = "Query cancelled"
+            else:
+                error = str(e)
+        finally:
+            with self._cond:
+                self._conn = None
+            if cursor is not None:
+                cursor.close()
+            if pooled is not None:
+                self.pool.put(pooled)
+            elif conn is not None:
+                conn.close()
+        if self._cancelled and not error:
+            error = "Query cancelled"
+        self.done.emit(self.row_count, self.elapsed(), error)
+
+class FilterHeader(QHeaderView):
+    """Horizontal header with a filter line edit under each section."""
+    filterChanged = pyqtSignal(int, str)
+
+    def __init__(self, view):
+        super().__init__(Qt.Orientation.Horizontal, view)
+        self._editors = []
+        self._padding = 4
+        self.setSectionsClickable(True)
+        self.setSortIndicatorShown(True)
+        self.sectionResized.connect(self.adjust_positions)
+        view.horizontalScrollBar().valueChanged.connect(self.adjust_positions)
+
+    def set_filter_boxes(self, count):
+        while self._editors:
+            self._editors.pop().deleteLater()
+        for i in range(count):
+            editor = QLineEdit(self)
+            editor.setPlaceholderText("Filter")
+            editor.setClearButtonEnabled(True)
+            editor.setToolTip("Contains text, or: = v, != v, < v, > v, NULL, !NULL, LIKE pattern with %")
+            editor.editingFinished.connect(lambda i=i, e=editor: self.filterChanged.emit(i, e.text()))
+            editor.show()
+            self._editors.append(editor)
+        self.updateGeometries()
+
+    def set_filter_text(self, column, text):
+        if 0 <= column < len(self._editors):
+            self._editors[column].setText(text)
+
+    def _editors_height(self):
+        return self._editors[0].sizeHint().height() + self._padding if self._editors else 0
+
+    def sizeHint(self):
+        size = super().sizeHint()
+        size.setHeight(size.height() + self._editors_height())
+        return size
+
+    def updateGeometries(self):
+        self.setViewportMargins(0, 0, 0, self._editors_height())
+        super().updateGeometries()
+        self.adjust_positions()
+
+    def adjust_positions(self):
+        top = super().sizeHint().height() + self._padding // 2
+        for i, editor in enumerate(self._editors):
+            editor.move(self.sectionViewportPosition(i) + 1, top)
+            editor.resize(self.sectionSize(i) - 2, editor.sizeHint().height())
+
 class CenterDelegate(QStyledItemDelegate):
     def initStyleOption(self, option, index):
         super().initStyleOption(option, index)
@@ -175,7 +1025,6 @@ class UI():
         parent.addLayout(self.tree_layout)
 
     def _update_size_tree(self):
-        self.tree.expandAll()  # ensures all items are open
         self.splitter.setStretchFactor(0, 0) # Desactivate automatic stretch on the tree
         self.splitter.setStretchFactor(1, 1) # allow the right part to take all the space
 
@@ -194,6 +1043,10 @@ class UI():
         # Table view
         self.table_view = QTableView()
         self.table_view.setItemDelegate(CenterDelegate(self.table_view))
+        # header clicks and filters are pushed down to SQLite by SQLiteTableModel
+        self.table_header = FilterHeader(self.table_view)
+        self.table_header.filterChanged.connect(self.main_window.on_table_filter_changed)
+        self.table_view.setHorizontalHeader(self.table_header)
         parent.addWidget(self.table_view)
 
     def _query_area(self, parent):
@@ -202,17 +1055,35 @@ class UI():
 
         self.query_edit = QPlainTextEdit()
         self.query_edit.setPlaceholderText("Enter SQL query here...")
-        self.highlighter = PygmentsHighlighter(self.query_edit)
+        self.highlighter = SqlHighlighter(self.query_edit)
 
         self.query_button_layout = QHBoxLayout()
 
         self.query_button_execute = QPushButton("Execute")
         self.query_button_execute.clicked.connect(self.main_window.execute_query)
 
+        self.query_button_profile = QPushButton("Profile")
+        self.query_button_profile.setToolTip("Query plan, VM steps, statements run (triggers included) and timing")
+        self.query_button_profile.clicked.connect(self.main_window.profile_query)
+
+        self.query_button_cancel = QPushButton("Cancel")
+        self.query_button_cancel.setEnabled(False)
+        self.query_button_cancel.clicked.connect(self.main_window.cancel_query)
+
+        # 0 = no time limit
+        self.query_timeout = QSpinBox()
+        self.query_timeout.setRange(0, 24 * 3600)
+        self.query_timeout.setPrefix("Timeout: ")
+        self.query_timeout.setSuffix(" s")
+        self.query_timeout.setSpecialValueText("No timeout")
+
         self.query_button_save = QPushButton("Save Query")
         self.query_button_save.clicked.connect(lambda: self.main_window.save_query(self.query_edit.toPlainText()))
 
         self.query_button_layout.addWidget(self.query_button_execute)
+        self.query_button_layout.addWidget(self.query_button_profile)
+        self.query_button_layout.addWidget(self.query_button_cancel)
+        self.query_button_layout.addWidget(self.query_timeout)
         self.query_button_layout.addWidget(self.query_button_save)
 
         self.query_layout.addWidget(self.query_edit)
@@ -239,6 +1110,12 @@ class UI():
         file_menu.addAction(close_action)
         self.main_window.actions['close_db'] = close_action
 
+        attach_action = QAction("Attach Database...", self.main_window)
+        attach_action.setEnabled(False)
+        attach_action.triggered.connect(self.main_window.attach_db)
+        file_menu.addAction(attach_action)
+        self.main_window.actions['attach_db'] = attach_action
+
         file_menu.addSeparator()
 
         save_as_action = QAction("Save Database As...", self.main_window)
@@ -261,6 +1138,12 @@ class UI():
         file_menu.addAction(export_csv_action)
         self.main_window.actions['export_csv'] = export_csv_action
 
+        export_all_csv_action = QAction("Export All Tables to CSV...", self.main_window)
+        export_all_csv_action.setEnabled(False)
+        export_all_csv_action.triggered.connect(self.main_window.export_all_csv)
+        file_menu.addAction(export_all_csv_action)
+        self.main_window.actions['export_all_csv'] = export_all_csv_action
+
         file_menu.addSeparator()
 
         export_dump_action = QAction("Export SQL Dump...", self.main_window)
@@ -271,7 +1154,11 @@ class UI():
 
         file_menu.addSeparator()
 
+        # filled each time they open
         self.recent_menu = file_menu.addMenu("Recent Files")
+        self.recent_menu.aboutToShow.connect(self.main_window._load_recent_menu)
+        self.profile_menu = file_menu.addMenu("Connection Profile")
+        self.profile_menu.aboutToShow.connect(self.main_window._load_profile_menu)
 
         file_menu.addSeparator()
 
@@ -325,48 +1212,94 @@ class UI():
 
         query_menu.addSeparator()
 
-        history_menu = query_menu.addMenu("History")
-        clear_history = QAction("Clear History", self.main_window)
-        clear_history.triggered.connect(self.main_window.clear_query_history)
-        history_menu.addAction(clear_history)
-        self.history_menu = history_menu
+        # the submenus below and the Tools and Help menus are built the first time they open
+        predefined_menu = query_menu.addMenu("Predefined")
+        self._fill_once(predefined_menu, self._predefined_menu)
+
+        query_menu.addSeparator()
+
+        self.history_menu = query_menu.addMenu("History")
+        self._fill_once(self.history_menu, self._history_menu)
 
         query_menu.addSeparator()
 
         self.sub_query_menu = query_menu.addMenu("Customs")
+        self.customs_search = self.customs_search_action = None
+        self._fill_once(self.sub_query_menu, self._customs_search)
+        # filled each time it opens, with the saved queries matching the search only
+        self.sub_query_menu.aboutToShow.connect(self.main_window.fill_customs_menu)
 
 
         # --- Tools Menu ---
-        tools_menu = m.addMenu("Tools")
+        self._fill_once(m.addMenu("Tools"), self._tools_menu)
 
-        run_script = QAction("Execute SQL Script...", self.main_window)
-        run_script.triggered.connect(self.main_window.execute_script)
-        tools_menu.addAction(run_script)
 
-        er_diagram = QAction("Generate ER Diagram...", self.main_window)
-        er_diagram.triggered.connect(self.main_window.generate_er_diagram)
-        tools_menu.addAction(er_diagram)
+        # --- Help Menu ---
+        self._fill_once(m.addMenu("Help"), self._help_menu)
 
+    def _fill_once(self, menu, fill):
+        """Call ``fill(menu)`` the first time ``menu`` opens (as Recent Files, but only once)."""
+        def first():
+            menu.aboutToShow.disconnect(first)
+            fill(menu)
+        menu.aboutToShow.connect(first)
 
-        # --- Help Menu ---
-        help_menu = m.addMenu("Help")
+    def _predefined_menu(self, menu):
+        for name, query in PREDEFINED_QUERIES.items():
+            act = QAction(name, self.main_window)
+            act.triggered.connect(lambda _, q=query: self.main_window.on_menu_query_clicked(textwrap.dedent(q).strip()))
+            menu.addAction(act)
+
+    def _history_menu(self, menu):
+        search_history = QAction("Search History...", self.main_window)
+        search_history.triggered.connect(lambda: self.main_window.show_history())
+        menu.addAction(search_history)
+        slowest_queries = QAction("Slowest Queries...", self.main_window)
+        slowest_queries.triggered.connect(lambda: self.main_window.show_history(slowest=True))
+        menu.addAction(slowest_queries)
+        menu.addSeparator()
+        clear_history = QAction("Clear History", self.main_window)
+        clear_history.triggered.connect(self.main_window.clear_query_history)
+        menu.addAction(clear_history)
+
+    def _customs_search(self, menu):
+        self.customs_search = QLineEdit()
+        self.customs_search.setPlaceholderText("Search saved queries (#tag)...")
+        self.customs_search.setClearButtonEnabled(True)
+        self.customs_search_action = QWidgetAction(menu)
+        self.customs_search_action.setDefaultWidget(self.customs_search)
+        menu.addAction(self.customs_search_action)
+        self.customs_search.textChanged.connect(self.main_window.fill_customs_menu)
+
+    def _tools_menu(self, menu):
+        run_script = QAction("Execute SQL Script...", self.main_window)
+        run_script.triggered.connect(lambda: self.main_window.execute_script())
+        menu.addAction(run_script)
 
+        er_diagram = QAction("Generate ER Diagram...", self.main_window)
+        er_diagram.triggered.connect(self.main_window.generate_er_diagram)
+        menu.addAction(er_diagram)
+        index_advisor = QAction("Index Advisor...", self.main_window)
+        index_advisor.triggered.connect(self.main_window.index_advisor)
+        menu.addAction(index_advisor)
+        search_recipes = QAction("Search Recipes...", self.main_window)
+        search_recipes.triggered.connect(self.main_window.search_recipes)
+        menu.addAction(search_recipes)
+
+    def _help_menu(self, menu):
         docs = QAction("Documentation", self.main_window)
         docs.triggered.connect(lambda: QDesktopServices.openUrl(QUrl("https://your.docs.url/")))
-        help_menu.addAction(docs)
+        menu.addAction(docs)
 
         report = QAction("Report Issue...", self.main_window)
         report.triggered.connect(lambda: QDesktopServices.openUrl(QUrl("https://your.issue.tracker/")))
-        help_menu.addAction(report)
+        menu.addAction(report)
 
-        help_menu.addSeparator()
+        menu.addSeparator()
 
         about = QAction("About", self.main_window)
         about.triggered.connect(self.main_window.show_about)
-        help_menu.addAction(about)
-
-
-
+        menu.addAction(about)
 
     def add_query_menu(self, query_name, query):
         # Create submenu under self.ui.sub_query_menu
@@ -380,48 +1313,82 @@ class UI():
         delete.triggered.connect(lambda checked, qn=query_name: self.main_window.delete_query(qn))
         sub_menu.addAction(delete)
 
-    def delete_query_menu(self, query_name):
-        # Find the submenu by title and remove it
-        menus = self.sub_query_menu.actions()
-        for action in menus:
-            if action.menu() and action.text() == query_name:
-                # Remove this submenu action
+    def clear_query_menus(self):
+        # every entry of the Customs menu but the search field
+        for action in self.sub_query_menu.actions():
+            if action is not self.customs_search_action:
                 self.sub_query_menu.removeAction(action)
-                # Optionally delete it (if needed)
-                action.menu().deleteLater()
+                if action.menu():
+                    action.menu().deleteLater()
                 action.deleteLater()
-                break
 
 
 class DBManager(QMainWindow):
     CONFIG = Path('./') / '.db_manager_config.yaml'
+    HISTORY = Path('./') / '.db_manager_history.db'
 
     def __init__(self, width=1200, height=800, title='Database Manager', **kwargs):
         super().__init__()
 
         # Initialize variables
         self.conn = None
+        self.pool = None       # read-only connections of the background queries
+        self.profile = None    # pragmas of the connections, see ConnectionPool.PROFILES
+        self.entry = None      # WorkspaceEntry of the displayed database
         self.db_path = ''
         self.db_name = ''
         self.actions = {}
+        self.query_worker = None
+        self.tasks = []   # running BackgroundTasks
+        self.schema = SchemaCache()
+        self.results = ResultCache()
+        self.script_runner = None
+        self.profiler = None
+        self.advisor = None
+        self.recent_queries = deque(maxlen=100)   # SQL run from the query editor, for the index advisor
+        self.parameter_values = {}   # parameter name -> last value typed in the parameters form
+        self.history = None   # QueryHistory, opened on first use
+        self._tree_items = {}   # object name -> tree item
+        self._tree_roots = {}   # object type -> tree item
+        self._attached_root = None
+        self.thumbnails = ThumbnailLoader(size=64, root=Path(__file__).parent.parent, parent=self)
 
         # charge config (recent files, history)
         self.config = yaml.safe_load(self.CONFIG.read_text()) if self.CONFIG.exists() else {}
+        self.workspace = Workspace(self.config.get('workspace_size', Workspace.SIZE))
 
         # Build the structure
         self.ui = UI(self, title, width, height)
 
         self._status()
-        self._load_recent_menu()
+        self.ui.query_timeout.setValue(self.config.get('query_timeout', 0))
 
-        # Open the data base
-        self.open_database()
+        # Open the data base, once the window is shown
+        QTimer.singleShot(0, self.open_database)
 
         # for allow to copy cells
         tv = self.ui.table_view
         tv.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
         tv.customContextMenuRequested.connect(self.on_table_context_menu)
 
+    def closeEvent(self, event):
+        self.stop_query()
+        if self.script_runner is not None:
+            self.script_runner.cancel()
+        if self.profiler is not None:
+            self.profiler.cancel()
+        if self.advisor is not None:
+            self.advisor.cancel()
+        for task in list(self.tasks):
+            task.wait()
+        self.workspace.close_all()
+        if self.history is not None:
+            self.history.close()
+        if self.config.get('query_timeout', 0) != self.ui.query_timeout.value():
+            self.config['query_timeout'] = self.ui.query_timeout.value()
+            self.CONFIG.write_text(yaml.safe_dump(self.config))
+        super().closeEvent(event)
+
     def on_table_context_menu(self, pos):
         idx = self.ui.table_view.indexAt(pos)
         if not idx.isValid():
@@ -437,6 +1404,13 @@ class DBManager(QMainWindow):
         self.status = QStatusBar()
         self.setStatusBar(self.status)
 
+        # live rows / elapsed time of the running query
+        self.query_status = QLabel()
+        self.status.addPermanentWidget(self.query_status)
+        self.query_timer = QTimer(self)
+        self.query_timer.setInterval(100)
+        self.query_timer.timeout.connect(self._update_query_status)
+
     def open_database(self):
         path, _ = QFileDialog.getOpenFileName(self, "Select SQLite Database", "", "SQLite Files (*.db *.sqlite)")
         if path:
@@ -448,7 +1422,6 @@ class DBManager(QMainWindow):
                 self.load_structure()
                 self.db_path = path
                 self.db_name = Path(path).name
-                self.load_queries()
             except Exception as e:
                 QMessageBox.critical(self, "Error", f"Failed to open database: {e}")
                 self.db_path = ''
@@ -458,70 +1431,176 @@ class DBManager(QMainWindow):
             self.db_name = ''
 
 
-    def load_structure(self):
+    def load_structure(self, rebuild=False):
+        # only the objects whose schema changed are (re)built in the tree
         if not self.conn:
             return
-        self.ui.tree.clear()
-
-        roots = {}
-
-        cursor = self.conn.cursor()
-        cursor.execute("SELECT name, type, sql FROM sqlite_master WHERE name NOT LIKE 'sqlite_%' AND sql NOT NULL ORDER BY type")
-        for name, typ, sql in cursor.fetchall():
-            if typ not in roots:
-                roots[typ] = QTreeWidgetItem(self.ui.tree, [typ.capitalize() + "s"])
-                font = roots[typ].font(0)
-                font.setPointSize(font.pointSize() + 1)
-                font.setBold(True)
-                roots[typ].setFont(0, font)
-
-            parent = QTreeWidgetItem(
-                roots[typ],
-                [name]
-            )
-
-            # columns
-            pr = self.conn.cursor()
-            pr.execute(f"PRAGMA table_info('{name}')")
-            for cid, col_name, col_type, notnull, dflt, pk in pr.fetchall():
-                QTreeWidgetItem(parent, [f"{col_name} ({col_type})"])
-
+        added, removed, changed = self.schema.refresh(self.conn)
+        if rebuild:
+            # empty tree of a database kept open in the workspace: built from its cached schema
+            added, removed, changed = set(self.schema.objects), set(), set()
+        if not (added or removed or changed):
+            return
+        tree = self.ui.tree
+        tree.setUpdatesEnabled(False)
+        try:
+            for name in removed | changed:
+                item = self._tree_items.pop(name, None)
+                if item is not None:
+                    root = item.parent()
+                    root.removeChild(item)
+                    if root.childCount() == 0:
+                        tree.takeTopLevelItem(tree.indexOfTopLevelItem(root))
+                        self._tree_roots = {t: r for t, r in self._tree_roots.items() if r is not root}
+
+            for name in sorted(added | changed):
+                obj = self.schema.objects[name]
+                if name.startswith('sqlite_') or not obj['sql']:
+                    continue
+                root = self._tree_root(obj['type'])
+                item = QTreeWidgetItem([name])
+                # keep the objects sorted by name
+                names = [root.child(i).text(0) for i in range(root.childCount())]
+                root.insertChild(bisect.bisect(names, name), item)
+                for cid, col_name, col_type, notnull, dflt, pk in obj['columns']:
+                    QTreeWidgetItem(item, [f"{col_name} ({col_type})"])
+                item.setExpanded(True)
+                self._tree_items[name] = item
+        finally:
+            tree.setUpdatesEnabled(True)
         self.ui._update_size_tree()
 
+    def _tree_root(self, typ):
+        if typ not in self._tree_roots:
+            root = QTreeWidgetItem([typ.capitalize() + "s"])
+            font = root.font(0)
+            font.setPointSize(font.pointSize() + 1)
+            font.setBold(True)
+            root.setFont(0, font)
+            # roots sorted by type, as sqlite_master was ordered before
+            types = sorted(self._tree_roots)
+            self.ui.tree.insertTopLevelItem(bisect.bisect(types, typ), root)
+            root.setExpanded(True)
+            self._tree_roots[typ] = root
+        return self._tree_roots[typ]
+
+    def clear_structure(self):
+        self._clear_tree()
+        self.schema.clear()
+        self.results.clear()
+
+    def _clear_tree(self):
+        self.ui.tree.clear()
+        self._tree_items = {}
+        self._tree_roots = {}
+        self._attached_root = None
+
+    def _load_attached_tree(self):
+        """"Attached Databases" root: one item per alias with its tables."""
+        if self._attached_root is not None:
+            self.ui.tree.takeTopLevelItem(self.ui.tree.indexOfTopLevelItem(self._attached_root))
+            self._attached_root = None
+        if not self.entry or not self.entry.attached:
+            return
+        root = QTreeWidgetItem(["Attached Databases"])
+        font = root.font(0)
+        font.setPointSize(font.pointSize() + 1)
+        font.setBold(True)
+        root.setFont(0, font)
+        for alias, path in self.entry.attached.items():
+            item = QTreeWidgetItem(root, [f"{alias} ({Path(path).name})"])
+            item.setData(0, Qt.ItemDataRole.UserRole, alias)
+            item.setToolTip(0, str(path))
+            for (table,) in self.conn.execute(
+                    f"SELECT name FROM {quote_ident(alias)}.sqlite_master "
+                    f"WHERE type = 'table' AND name NOT LIKE 'sqlite_%' ORDER BY name"):
+                QTreeWidgetItem(item, [table])
+            item.setExpanded(True)
+        self.ui.tree.addTopLevelItem(root)
+        root.setExpanded(True)
+        self._attached_root = root
+
     def on_tree_item_clicked(self, item, col):
         parent = item.parent()
         if parent and parent.text(0) == "Tables":
             table = item.text(0)
             self.display_table(table)
+        elif parent and parent.parent() is not None and parent.parent() is self._attached_root:
+            alias = parent.data(0, Qt.ItemDataRole.UserRole)
+            self.ui.query_edit.setPlainText(f"SELECT * FROM {quote_ident(alias)}.{quote_ident(item.text(0))}")
+            self.execute_query()
 
     def display_table(self, table):
-        query = f"SELECT * FROM {table}"
-        cursor = self.conn.cursor()
         try:
-            cursor.execute(query)
-            data = cursor.fetchall()
-            headers = [d[0] for d in cursor.description]
-            model = SQLiteModel(data, headers)
-            self.ui.table_view.setModel(model)
-            self.status.showMessage(f"Displayed table {table} with {len(data)} rows")
+            if SQLiteTableModel.has_rowid(self.conn, table):
+                model = SQLiteTableModel(self.conn, table, cache=self.results)
+            else:
+                model = SQLiteModel.from_cursor(self.conn.execute(f"SELECT * FROM {quote_ident(table)}"))
+            self.set_model(model)
+            self.status.showMessage(f"Displayed table {table} with {self._rows_message(model)}")
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Failed to display table: {e}")
 
-    def load_queries(self):
-        if not self.db_path or not self.db_name:
+    def set_model(self, model):
+        # the previous model may still hold an open cursor on the connection
+        old = self.ui.table_view.model()
+        if isinstance(old, SQLiteModel):
+            old.release()
+            old.set_thumbnail_loader(None)
+        if model is not None:
+            model.set_thumbnail_loader(self.thumbnails)
+        is_table = isinstance(model, SQLiteTableModel)
+        self.ui.table_view.setSortingEnabled(False)
+        self.ui.table_view.setModel(model)
+        self.ui.table_header.set_filter_boxes(model.columnCount() if is_table else 0)
+        if is_table:
+            # no sort indicator: rowid order until a header is clicked
+            self.ui.table_header.setSortIndicator(-1, Qt.SortOrder.AscendingOrder)
+            self.ui.table_view.setSortingEnabled(True)
+
+    def on_table_filter_changed(self, column, text):
+        model = self.ui.table_view.model()
+        if not isinstance(model, SQLiteTableModel):
             return
-
-        path = Path(self.db_path).with_suffix('.yaml')
-        if not path.exists():
+        try:
+            model.set_filter(column, text)
+            self.status.showMessage(f"Displayed table {model.table} with {self._rows_message(model)}")
+        except sqlite3.Error as e:
+            QMessageBox.critical(self, "Error", f"Invalid filter: {e}")
+
+    def _rows_message(self, model):
+        if model.canFetchMore():
+            return f"first {model.rowCount()} rows (more are loaded on scroll)"
+        return f"{model.rowCount()} rows"
+
+    CUSTOMS_LIMIT = 50   # saved queries listed in the Customs menu
+
+    def query_store(self):
+        """QueryStore of the displayed database (None, with a message, when it can not be opened)."""
+        if self.entry is None:
+            return None
+        try:
+            return self.entry.queries()
+        except (sqlite3.Error, OSError, yaml.YAMLError) as e:
+            self.status.showMessage(f"Saved queries unavailable: {e}")
+            return None
+
+    def fill_customs_menu(self):
+        self.ui.clear_query_menus()
+        store = self.query_store()
+        if store is None:
+            self.ui.sub_query_menu.addAction("No database").setEnabled(False)
             return
-
-        queries = yaml.safe_load(open(Path(self.db_path).with_suffix('.yaml'), 'r')) or {}
-
-        for query_name, query in queries.items():
+        queries, total = store.search(self.ui.customs_search.text(), self.CUSTOMS_LIMIT)
+        for query_name, query in queries:
             self.ui.add_query_menu(query_name, query)
-
-
-
+        if total > len(queries):
+            self.ui.sub_query_menu.addAction(f"{total - len(queries)} more, refine the search...").setEnabled(False)
+        elif not queries:
+            self.ui.sub_query_menu.addAction("No saved query").setEnabled(False)
+        if total:
+            self.ui.sub_query_menu.addSeparator()
+            self.ui.sub_query_menu.addAction("Delete All Saved Queries...").triggered.connect(self.clear_saved_queries)
 
     def on_menu_query_clicked(self, query):
         self.ui.query_edit.setPlainText(query)
@@ -534,15 +1613,16 @@ class DBManager(QMainWindow):
             QMessageBox.warning(self, "Empty Query", "Query cannot be empty.")
             return
 
-        yaml_file = Path(self.db_path).with_suffix('.yaml')
-        queries = {}
-        if yaml_file.exists():
-            queries = yaml.safe_load(open(yaml_file, 'r')) or {}
+        store = self.query_store()
+        if store is None:
+            return
 
         query_name, ok = QInputDialog.getText(self, "Save Query", "Enter a name for the query:")
         query_name = query_name.strip()
+        if not ok or not query_name:
+            return
 
-        if query_name in queries:
+        if store.get(query_name) is not None:
             reply = QMessageBox.question(
                 self,
                 "Overwrite Query",
@@ -551,15 +1631,60 @@ class DBManager(QMainWindow):
             )
             if reply == QMessageBox.StandardButton.No:
                 return
-            elif reply == QMessageBox.StandardButton.Yes:
-                self.ui.delete_query_menu(query_name)  # Remove the old query from the menu
-
-        if ok and query_name:
-            queries[query_name] = query
-            with open(yaml_file, 'w', encoding='utf-8-sig') as f:
-                yaml.safe_dump(queries, f)
-            QMessageBox.information(self, "Query Saved", f"Query '{query_name}' saved successfully.")
-            self.ui.add_query_menu(query_name, query)
+
+        tags, ok = QInputDialog.getText(self, "Save Query", "Tags (comma separated, optional):",
+                                        text=", ".join(store.tags(query_name)))
+        if not ok:
+            return
+        store.save(query_name, query, [t.strip() for t in tags.split(',')])
+        QMessageBox.information(self, "Query Saved", f"Query '{query_name}' saved successfully.")
+
+    def ask_parameters(self, sql):
+        """
+        Form asking the values of the parameters of ``sql``; return (sql, params)
+        ready to execute, or None when cancelled or invalid. Table and column
+        names ({identifier}) are chosen among the ones of the schema.
+        """
+        wanted = parameters(sql)
+        if not wanted:
+            return sql, ()
+        self.load_structure()   # schema up to date, tree included
+        known = self.schema.identifiers()
+
+        dlg = QDialog(self)
+        dlg.setWindowTitle("Query Parameters")
+        form = QFormLayout(dlg)
+        fields = {}
+        for name, kind in wanted:
+            last = self.parameter_values.get(name, '')
+            if kind == 'identifier':
+                field = QComboBox(dlg)
+                field.setEditable(True)
+                field.addItems(self.schema.names('table') + self.schema.names('view'))
+                field.addItems(sorted(known - set(self.schema.names('table')) - set(self.schema.names('view'))))
+                field.setCurrentText(last)
+                fields[name] = field.currentText
+                label = f"{{{name}}} (table or column)"
+            else:
+                field = QLineEdit(last, dlg)
+                field.setPlaceholderText("text, number or NULL")
+                fields[name] = field.text
+                label = f"?{name}" if name.isdigit() else f":{name}"
+            form.addRow(label, field)
+        btns = QDialogButtonBox(QDialogButtonBox.StandardButton.Ok | QDialogButtonBox.StandardButton.Cancel)
+        btns.accepted.connect(dlg.accept)
+        btns.rejected.connect(dlg.reject)
+        form.addRow(btns)
+        if dlg.exec() != QDialog.DialogCode.Accepted:
+            return None
+
+        values = {name: text() for name, text in fields.items()}
+        self.parameter_values.update(values)
+        try:
+            return bind(sql, values, known)
+        except ValueError as e:
+            QMessageBox.critical(self, "Error", f"Invalid parameters: {e}")
+            return None
 
     def execute_query(self):
         if not self.conn:
@@ -568,21 +1693,218 @@ class DBManager(QMainWindow):
         sql = self.ui.query_edit.toPlainText().strip()
         if not sql:
             return
-        cursor = self.conn.cursor()
-        try:
-            cursor.execute(sql)
-            if sql.lower().startswith('select'):
-                data = cursor.fetchall()
-                headers = [d[0] for d in cursor.description]
-                model = SQLiteModel(data, headers)
-                self.ui.table_view.setModel(model)
-                self.status.showMessage(f"Query returned {len(data)} rows")
+        bound = self.ask_parameters(sql)
+        if bound is None:
+            return
+        sql, params = bound
+        self.stop_query()
+        if sql in self.recent_queries:
+            self.recent_queries.remove(sql)
+        self.recent_queries.append(sql)
+        cached = self.results.get(self.conn, sql, params)
+        if cached is not None:
+            headers, data = cached
+            self.set_model(SQLiteModel(data, headers))
+            self.query_status.setText(f"{len(data)} rows · cached")
+            self.status.showMessage(f"Query returned {len(data)} rows (cached)")
+            self.log_history(sql, 0.0, len(data))
+            return
+        # an open cursor of the displayed model would lock the database for the worker
+        old = self.ui.table_view.model()
+        if isinstance(old, SQLiteModel):
+            old.release()
+
+        worker = QueryWorker(self.db_path, sql, params, timeout=self.ui.query_timeout.value() or None, parent=self,
+                             pool=self.pool)
+        model = SQLiteModel([], [])
+        model.stream_from(worker)
+        # only replace the displayed table when the statement returns rows
+        worker.columns.connect(lambda _: self.set_model(model))
+        version = self.results.data_version(self.conn)
+        worker.paused.connect(lambda rows, elapsed: self._on_query_paused(worker, rows, elapsed))
+        worker.done.connect(lambda rows, elapsed, error: self._on_query_done(worker, rows, elapsed, error, model, version))
+        self.query_worker = worker
+        self.ui.query_button_execute.setEnabled(False)
+        self.ui.query_button_cancel.setEnabled(True)
+        self.query_timer.start()
+        worker.start()
+
+    def _update_query_status(self):
+        worker = self.query_worker
+        if worker is not None:
+            self.query_status.setText(f"{worker.row_count} rows · {worker.elapsed():.1f} s")
+
+    def _on_query_paused(self, worker, rows, elapsed):
+        """The first rows are shown and the worker waits for the view to scroll: the query is done for the UI."""
+        if worker is not self.query_worker:
+            return
+        worker.reported = True
+        self.query_worker = None
+        self.query_timer.stop()
+        self.query_status.setText(f"{rows}+ rows · {elapsed:.2f} s")
+        self.ui.query_button_execute.setEnabled(True)
+        self._update_cancel_button()
+        self.log_history(worker.sql, elapsed, rows)
+        self.status.showMessage(f"Query returned {rows}+ rows in {elapsed:.2f} s (more are read on scroll)")
+
+    def _on_query_done(self, worker, rows, elapsed, error, model=None, version=None):
+        if worker.reported:
+            # read to the end on scroll (or released with its model): only the result is left to keep
+            if (not error and model is not None and worker.db_path == self.db_path and self.conn is not None
+                    and ResultCache.cacheable(worker.sql)):
+                self.results.put(self.conn, worker.sql, worker.params, (model._headers, model._data), version)
+            return
+        if worker is not self.query_worker:
+            return
+        self.query_worker = None
+        self.query_timer.stop()
+        self.query_status.setText(f"{rows} rows · {elapsed:.2f} s")
+        self.ui.query_button_execute.setEnabled(True)
+        self._update_cancel_button()
+        self.log_history(worker.sql, elapsed, rows, error)
+        if error:
+            self.status.showMessage(error)
+            if not error.startswith(("Query cancelled", "Query timed out")):
+                QMessageBox.critical(self, "Error", f"Query failed: {error}")
+        elif worker.is_select:
+            if model is not None and ResultCache.cacheable(worker.sql):
+                # the whole result was read: kept unless the database changed meanwhile
+                self.results.put(self.conn, worker.sql, worker.params, (model._headers, model._data), version)
+            self.status.showMessage(f"Query returned {rows} rows in {elapsed:.2f} s")
+        else:
+            self.load_structure()
+            self.status.showMessage(f"Executed: {worker.sql.split()[0].upper()} ({rows} rows affected)")
+
+    def _update_cancel_button(self):
+        running = (self.query_worker, self.script_runner, self.profiler, self.advisor)
+        self.ui.query_button_cancel.setEnabled(any(r is not None for r in running))
+
+    def profile_query(self):
+        if not self.conn:
+            QMessageBox.warning(self, "No Database", "Please open a database first.")
+            return
+        sql = self.ui.query_edit.toPlainText().strip()
+        if not sql or self.profiler is not None:
+            return
+        bound = self.ask_parameters(sql)
+        if bound is None:
+            return
+        name = self._saved_query_name(sql)
+        sql, params = bound
+        profiler = QueryProfiler(self.db_path, sql, timeout=self.ui.query_timeout.value() or None, params=params,
+                                 connect=self._entry_connect())
+        self.profiler = profiler
+        self.ui.query_button_profile.setEnabled(False)
+        self.ui.query_button_cancel.setEnabled(True)
+
+        def done(profile, error):
+            self.profiler = None
+            self.ui.query_button_profile.setEnabled(True)
+            self._update_cancel_button()
+            if error:
+                self.status.showMessage(error)
+                if not profiler.cancelled:
+                    QMessageBox.critical(self, "Error", f"Profiling failed: {error}")
+                return
+            store = ProfileStore(self.db_path)
+            try:
+                previous = store.runs(sql)
+                store.add(profile, name)
+            finally:
+                store.close()
+            self.status.showMessage(f"Profiled: {profile['rows']} rows in {profile['seconds']:.3f} s, "
+                                    f"{profile['vm_steps']} VM steps")
+            self.show_profile(profile, previous)
+
+        self.run_task(profiler.run, done)
+
+    def _saved_query_name(self, sql):
+        store = self.query_store()
+        return store.name_of(sql) if store is not None else None
+
+    def show_profile(self, profile, previous):
+        """Dialog with a profile and the previous runs of the same query."""
+        dlg = QDialog(self)
+        dlg.setWindowTitle("Query Profile")
+        dlg.resize(800, 600)
+        layout = QVBoxLayout(dlg)
+
+        layout.addWidget(QLabel(
+            f"{profile['rows']} rows in {profile['seconds'] * 1000:.2f} ms · {profile['vm_steps']} VM steps · "
+            f"{len(profile['statements'])} statements run\n"
+            f"(run in a transaction rolled back: the database was not modified)"
+        ))
+
+        # EXPLAIN QUERY PLAN: each row gives the id of its parent
+        plan = QTreeWidget(dlg)
+        plan.setHeaderLabels(["Query plan"])
+        items = {}
+        for node, parent, detail in profile['plan']:
+            parent_item = items.get(parent)
+            item = QTreeWidgetItem(parent_item if parent_item is not None else plan, [detail])
+            items[node] = item
+        plan.expandAll()
+        layout.addWidget(plan)
+
+        statements = QPlainTextEdit(dlg)
+        statements.setReadOnly(True)
+        lines = []
+        for i, sql in enumerate(profile['statements']):
+            # the statement is traced again each time it runs a trigger program
+            if i and sql == profile['statements'][0]:
+                lines.append(f"  ↳ trigger program ({', '.join(profile['triggers']) or '?'})")
             else:
-                self.conn.commit()
-                self.load_structure()
-                self.status.showMessage(f"Executed: {sql.split()[0].upper()}")
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Query failed: {e}")
+                lines.append(sql)
+        statements.setPlainText("\n".join(lines))
+        layout.addWidget(QLabel("Statements executed by SQLite:"))
+        layout.addWidget(statements)
+
+        if previous:
+            history = QTreeWidget(dlg)
+            history.setHeaderLabels(["Run", "Name", "Time (ms)", "Rows", "VM steps", "Plan"])
+            history.setRootIsDecorated(False)
+            for run in previous:
+                QTreeWidgetItem(history, [
+                    run['started_at'], run['name'] or "", f"{run['seconds'] * 1000:.2f}", str(run['rows']),
+                    str(run['vm_steps']), "same" if run['plan'] == profile['plan'] else "changed"])
+            layout.addWidget(QLabel("Previous runs of this query:"))
+            layout.addWidget(history)
+
+        btns = QDialogButtonBox(QDialogButtonBox.StandardButton.Close)
+        btns.rejected.connect(dlg.reject)
+        layout.addWidget(btns)
+        dlg.exec()
+
+    def run_task(self, func, on_done):
+        """Run ``func(progress)`` in a BackgroundTask; ``on_done(result, error)`` is called in the GUI thread."""
+        task = BackgroundTask(func, self)
+        task.progress.connect(self.status.showMessage)
+        task.done.connect(on_done)
+        task.finished.connect(lambda: self.tasks.remove(task))
+        self.tasks.append(task)
+        task.start()
+        return task
+
+    def cancel_query(self):
+        if self.query_worker is not None:
+            self.query_worker.cancel()
+        if self.script_runner is not None:
+            self.script_runner.cancel()
+        if self.profiler is not None:
+            self.profiler.cancel()
+        if self.advisor is not None:
+            self.advisor.cancel()
+
+    def stop_query(self):
+        # cancel the running query and wait for its connection to be closed
+        worker = self.query_worker
+        if worker is not None:
+            self.query_worker = None
+            worker.cancel()
+            worker.wait()
+            self.query_timer.stop()
+            self.ui.query_button_execute.setEnabled(True)
+            self._update_cancel_button()
 
     def delete_query(self, query_name):
         reply = QMessageBox.question(
@@ -592,26 +1914,16 @@ class DBManager(QMainWindow):
             QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
         )
         if reply == QMessageBox.StandardButton.Yes:
-            yaml_file = Path(self.db_path).with_suffix('.yaml')
-            if yaml_file.exists():
-                queries = yaml.safe_load(open(yaml_file, 'r')) or {}
-                if query_name in queries:
-                    del queries[query_name]
-                    with open(yaml_file, 'w', encoding='utf-8-sig') as f:
-                        yaml.safe_dump(queries, f)
-                    QMessageBox.information(self, "Query Deleted", f"Query '{query_name}' deleted successfully.")
-                    # Refresh the queries menu after deletion
-                    self.ui.delete_query_menu(query_name)
+            store = self.query_store()
+            if store is not None and store.delete(query_name):
+                QMessageBox.information(self, "Query Deleted", f"Query '{query_name}' deleted successfully.")
 
     def new_database(self):
         path, _ = QFileDialog.getSaveFileName(self, "Create New Database", "", "SQLite Files (*.db)")
         if not path:
             return
-        # crée immédiatement le fichier + son YAML associé
+        # crée immédiatement le fichier (les requêtes sauvegardées iront dans son fichier .manager.db)
         open(path, 'a').close()
-        yaml_fn = Path(path).with_suffix('.yaml')
-        if not yaml_fn.exists():
-            yaml_fn.write_text(yaml.safe_dump({}))
         self._connect_db(path)
 
     def open_database(self):
@@ -619,35 +1931,56 @@ class DBManager(QMainWindow):
         if not path: return
         self._connect_db(path)
 
+    def _use_entry(self, entry):
+        """Display the database of a WorkspaceEntry (None: no database)."""
+        self.entry = entry
+        if entry is None:
+            self.conn = self.pool = self.profile = None
+            self.schema, self.results = SchemaCache(), ResultCache()
+            self.db_path = self.db_name = ''
+        else:
+            self.conn, self.pool, self.profile = entry.conn, entry.pool, entry.profile
+            self.schema, self.results = entry.schema, entry.results
+            self.db_path, self.db_name = entry.path, Path(entry.path).name
+
     def _connect_db(self, path):
-        # fermeture éventuelle
-        if self.conn:
-            self.conn.close()
-        # ouverture
-        self.conn = sqlite3.connect(path)
-        self.db_path = path
-        self.db_name = Path(path).name
-        self.status.showMessage(f"Opened {self.db_name}")
+        # la base affichée reste ouverte dans le workspace
+        self.stop_query()
+        self.set_model(None)
+        # ouverture, ou reprise de la connexion si la base est encore ouverte
+        name, profile = profile_for(self.config, path)
+        warm = path in self.workspace
+        try:
+            entry = self.workspace.open(path, profile)
+        except sqlite3.Error as e:
+            if path == self.db_path or self.db_path not in self.workspace:
+                self._use_entry(None)
+                self.clear_structure()
+            QMessageBox.critical(self, "Error", f"Failed to open {path} with the '{name}' profile:\n{e}")
+            return
+        self._use_entry(entry)
+        self.status.showMessage(f"Opened {self.db_name} ({name} profile{', kept open' if warm else ''})")
         # active les actions
-        for k in ('close_db','save_as','import_csv','export_csv','export_dump'):
+        for k in ('close_db','attach_db','save_as','import_csv','export_csv','export_all_csv','export_dump'):
             self.actions[k].setEnabled(True)
         self.actions['export_dump'].setEnabled(True)
+        # an immutable file is never written, not even by the importer
+        self.actions['import_csv'].setEnabled(not self.profile['immutable'])
         self._add_to_recent(path)
-        self.load_structure()
-        self.load_queries()
+        self._clear_tree()
+        self.load_structure(rebuild=True)
+        self._load_attached_tree()
 
     def close_database(self):
-        if self.conn:
-            self.conn.close()
-        self.conn = None
-        self.db_path = ''
-        self.db_name = ''
+        self.stop_query()
+        self.set_model(None)
+        self.workspace.close(self.db_path)
+        self._use_entry(None)
         # VIDE l'arbre et la table
-        self.ui.tree.clear()
-        self.ui.table_view.setModel(None)
+        self.clear_structure()
         self.status.showMessage("Database closed")
         # désactive actions
-        for k in ('close_db','save_as','import_csv','export_csv','export_dump'):
+        for k in ('close_db','attach_db','save_as','import_csv','export_csv','export_all_csv','export_dump'):
             self.actions[k].setEnabled(False)
 
     def save_database_as(self):
@@ -664,33 +1997,73 @@ class DBManager(QMainWindow):
         csvf, _ = QFileDialog.getOpenFileName(self, "Import CSV", "", "CSV Files (*.csv)")
         if not csvf: return
         tbl, ok = QInputDialog.getText(self, "Table Name", "Enter table name to create/import:")
-        if not ok or not tbl.strip(): return
-        df = pd.read_csv(csvf)
-        # suppression si existe
-        self.conn.execute(f"DROP TABLE IF EXISTS {tbl}")
-        # création dynamique
-        cols = ", ".join(f"'{c}' TEXT" for c in df.columns)
-        self.conn.execute(f"CREATE TABLE {tbl} ({cols})")
-        # insertion
-        df.to_sql(tbl, self.conn, if_exists='append', index=False)
-        self.conn.commit()
-        self.load_structure()
-        self.status.showMessage(f"Imported {len(df)} rows into {tbl}")
+        tbl = tbl.strip()
+        if not ok or not tbl: return
+        # an open cursor of the displayed model would lock the database for the import
+        model = self.ui.table_view.model()
+        if isinstance(model, SQLiteTableModel) and model.table == tbl:
+            self.set_model(None)
+        elif isinstance(model, SQLiteModel):
+            model.release()
+
+        def load(progress):
+            return dataTransfer.import_csv(self.db_path, csvf, tbl, progress=lambda rows, fraction: progress(
+                f"Importing {tbl}: {rows} rows ({fraction:.0%})"))
+
+        def done(result, error):
+            self.load_structure()
+            if error:
+                QMessageBox.critical(self, "Error", f"Failed to import {csvf}:\n{error}")
+                return
+            rows, skipped = result
+            self.status.showMessage(f"Imported {rows} rows into {tbl}")
+            if skipped:
+                QMessageBox.warning(self, "Import CSV", f"Not created again (their columns are not in the CSV):\n"
+                                                       + "\n".join(skipped))
+
+        self.run_task(load, done)
 
     def export_csv(self):
         tbl, ok = QInputDialog.getText(self, "Export CSV", "Enter table name to export:")
-        if not ok or not tbl.strip():
+        tbl = tbl.strip()
+        if not ok or not tbl:
             return
-        try:
-            df = pd.read_sql_query(f"SELECT * FROM {tbl}", self.conn)
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Table '{tbl}' does not exist.\n{e}")
+        self.schema.refresh(self.conn)
+        if tbl not in self.schema.objects:
+            QMessageBox.critical(self, "Error", f"Table '{tbl}' does not exist.")
             return
         path, _ = QFileDialog.getSaveFileName(self, "Save CSV", f"{tbl}.csv", "CSV Files (*.csv)")
         if not path:
             return
-        df.to_csv(path, index=False)
-        self.status.showMessage(f"Exported {tbl} to {path}")
+
+        def export(progress):
+            return dataTransfer.export_table_csv(self.db_path, tbl, path, progress=lambda rows: progress(
+                f"Exporting {tbl} to CSV: {rows} rows"), connect=self._read_connect())
+
+        def done(rows, error):
+            if error:
+                QMessageBox.critical(self, "Error", f"Failed to export {tbl}:\n{error}")
+            else:
+                self.status.showMessage(f"Exported {rows} rows of {tbl} to {path}")
+
+        self.run_task(export, done)
+
+    def export_all_csv(self):
+        folder = QFileDialog.getExistingDirectory(self, "Export All Tables to CSV")
+        if not folder:
+            return
+
+        def export(progress):
+            return dataTransfer.export_tables_csv(self.db_path, folder, progress=lambda table, rows: progress(
+                f"Exporting tables to CSV: {table}, {rows} rows"), connect=self._read_connect())
+
+        def done(counts, error):
+            if error:
+                QMessageBox.critical(self, "Error", f"Failed to export tables:\n{error}")
+            else:
+                self.status.showMessage(f"Exported {len(counts)} tables ({sum(counts.values())} rows) to {folder}")
+
+        self.run_task(export, done)
 
     # ---- Recent files ----
     def _add_to_recent(self, path):
@@ -699,15 +2072,103 @@ class DBManager(QMainWindow):
         recent.insert(0, path)
         self.config['recent'] = recent[:10]
         self.CONFIG.write_text(yaml.safe_dump(self.config))
-        self._load_recent_menu()
 
     def _load_recent_menu(self):
         self.ui.recent_menu.clear()
         for p in self.config.get('recent', []):
-            act = QAction(Path(p).name, self)
+            # databases kept open in the workspace reopen instantly
+            act = QAction(Path(p).name + ("  (open)" if p in self.workspace else ""), self)
             act.triggered.connect(lambda _, pp=p: self._connect_db(pp))
             self.ui.recent_menu.addAction(act)
 
+    # ---- Connection profiles ----
+    def _read_connect(self):
+        """Picklable factory of read-only connections with the current profile, for the exports."""
+        return partial(connect, profile=self.profile, read_only=True)
+
+    def _entry_connect(self):
+        """Factory of connections like the one of the displayed database: its profile and attached databases."""
+        return partial(connect, profile=self.profile, attached=dict(self.entry.attached))
+
+    def _load_profile_menu(self):
+        self.ui.profile_menu.clear()
+        current, _ = profile_for(self.config, self.db_path)
+        group = QActionGroup(self.ui.profile_menu)
+        for name, profile in profiles(self.config).items():
+            act = QAction(name, self, checkable=True)
+            act.setChecked(name == current)
+            act.setToolTip(", ".join(f"{k}={v}" for k, v in profile.items() if v is not None))
+            act.triggered.connect(lambda _, n=name: self.set_connection_profile(n))
+            group.addAction(act)
+            self.ui.profile_menu.addAction(act)
+        self.ui.profile_menu.setToolTipsVisible(True)
+
+    def set_connection_profile(self, name):
+        """Use the profile ``name`` for the open database (default profile when none is open) and reconnect."""
+        if self.db_path:
+            self.config.setdefault('database_profiles', {})[self.db_path] = name
+        else:
+            self.config['connection_profile'] = name
+        self.CONFIG.write_text(yaml.safe_dump(self.config))
+        if self.db_path:
+            self._connect_db(self.db_path)
+
+    # ---- Attached databases ----
+    def attach_db(self):
+        """ATTACH another database file under an alias, for cross-database queries and copies."""
+        if not self.conn:
+            QMessageBox.warning(self, "No Database", "Please open a database first.")
+            return
+        path, _ = QFileDialog.getOpenFileName(self, "Attach SQLite Database", "",
+                                              "SQLite Files (*.db *.sqlite);;All Files (*)")
+        if not path:
+            return
+        alias, ok = QInputDialog.getText(self, "Attach Database", "Alias:", text=re.sub(r'\W', '_', Path(path).stem))
+        alias = alias.strip()
+        if not ok or not alias:
+            return
+        if alias.lower() in ('main', 'temp') or alias in self.entry.attached:
+            QMessageBox.warning(self, "Attach Database", f"The alias '{alias}' is already used.")
+            return
+        try:
+            self.entry.attach(alias, path)
+        except sqlite3.Error as e:
+            QMessageBox.critical(self, "Error", f"Failed to attach {path}:\n{e}")
+            return
+        self._load_attached_tree()
+        self.status.showMessage(f"Attached {Path(path).name} as {alias}")
+
+    def detach_db(self, alias):
+        # an open cursor of the displayed result would keep the attached database busy
+        model = self.ui.table_view.model()
+        if isinstance(model, SQLiteModel):
+            model.release()
+        try:
+            self.entry.detach(alias)
+        except sqlite3.Error as e:
+            QMessageBox.critical(self, "Error", f"Failed to detach {alias}:\n{e}")
+            return
+        self._load_attached_tree()
+        self.status.showMessage(f"Detached {alias}")
+
+    def copy_table_to(self, table, alias):
+        """Copy a table into an attached database with INSERT ... SELECT, on a background connection."""
+        entry, target = self.entry, self.entry.attached[alias]
+
+        def copy(progress):
+            progress(f"Copying {table} to {alias}...")
+            return dataTransfer.copy_table(entry.path, table, target, connect=partial(connect, profile=entry.profile))
+
+        def done(rows, error):
+            if error:
+                QMessageBox.critical(self, "Error", f"Failed to copy {table} to {alias}:\n{error}")
+                return
+            if entry is self.entry:
+                self._load_attached_tree()
+            self.status.showMessage(f"Copied {rows} rows of {table} to {alias}")
+
+        self.run_task(copy, done)
+
     # ---- View ----
     def toggle_panel(self, panel, show):
         if panel == 'tree':
@@ -744,6 +2205,13 @@ class DBManager(QMainWindow):
             tbl = item.text(0)
             menu.addAction("Show Data", lambda: self.display_table(tbl))
             menu.addAction("Describe Table", lambda: self.describe_table(tbl))
+            for alias in self.entry.attached:
+                menu.addAction(f"Copy to {alias}", lambda a=alias: self.copy_table_to(tbl, a))
+
+        # Clic-droit sur une base attachée
+        elif parent is not None and parent is self._attached_root:
+            alias = item.data(0, Qt.ItemDataRole.UserRole)
+            menu.addAction("Detach", lambda: self.detach_db(alias))
 
         # Clic-droit sur une colonne
         elif parent and parent.parent() and parent.parent().text(0) == "Tables":
@@ -759,7 +2227,8 @@ class DBManager(QMainWindow):
 
     def describe_table(self, table):
         # Affiche la structure d'une table
-        cols = self.conn.execute(f"PRAGMA table_info('{table}')").fetchall()
+        self.schema.refresh(self.conn)
+        cols = self.schema.columns(table)
         txt = "\n".join(f"{c[1]} ({c[2]}){' PK' if c[5] else ''}" for c in cols)
         QMessageBox.information(self, f"Structure of {table}", txt)
 
@@ -768,13 +2237,18 @@ class DBManager(QMainWindow):
         val, ok = QInputDialog.getText(self, "Filter", f"WHERE {column} =")
         if not ok:
             return
-        query = f"SELECT * FROM {table} WHERE \"{column}\" = ?"
-        cursor = self.conn.cursor()
-        cursor.execute(query, (val,))
-        data = cursor.fetchall()
-        hdr = [d[0] for d in cursor.description]
-        self.ui.table_view.setModel(SQLiteModel(data, hdr))
-        self.status.showMessage(f"{len(data)} rows WHERE {column}='{val}'")
+        if SQLiteTableModel.has_rowid(self.conn, table):
+            # same as typing "= val" in the column filter of the table
+            self.display_table(table)
+            model = self.ui.table_view.model()
+            col = model._headers.index(column)
+            self.ui.table_header.set_filter_text(col, f"= {val}")
+            self.on_table_filter_changed(col, f"= {val}")
+            return
+        query = f"SELECT * FROM {quote_ident(table)} WHERE {quote_ident(column)} = ?"
+        model = SQLiteModel.from_cursor(self.conn.execute(query, (val,)))
+        self.set_model(model)
+        self.status.showMessage(f"{self._rows_message(model)} WHERE {column}='{val}'")
 
     def zoom_in(self):
         f = self.ui.query_edit.font()
@@ -794,26 +2268,179 @@ class DBManager(QMainWindow):
 
     # ---- Query history ----
     def clear_query_history(self):
+        history = self.query_history()
+        if history is None:
+            return
+        reply = QMessageBox.question(self, "History", f"Forget the {history.count()} logged runs of every database?",
+                                     QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
+        if reply == QMessageBox.StandardButton.Yes:
+            history.clear()
+            self.status.showMessage("Query history cleared")
+
+    def clear_saved_queries(self):
+        store = self.query_store()
+        if store is None:
+            return
+        reply = QMessageBox.question(self, "Saved Queries", f"Delete the {store.count()} saved queries of {self.db_name}?",
+                                     QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
+        if reply != QMessageBox.StandardButton.Yes:
+            return
+        store.clear()
+        # the legacy file would be imported again
         yaml_file = Path(self.db_path).with_suffix('.yaml')
         if yaml_file.exists():
             yaml_file.unlink()
-        # efface menu customs
-        for act in list(self.ui.sub_query_menu.actions()):
-            self.ui.sub_query_menu.removeAction(act)
-        QMessageBox.information(self, "History", "Query history cleared.")
+        self.status.showMessage("Saved queries deleted")
+
+    # ---- History ----
+    def query_history(self):
+        """QueryHistory of the manager (None, with a message, when it can not be opened)."""
+        if self.history is None:
+            try:
+                self.history = QueryHistory(self.HISTORY, self.config.get('history_size', QueryHistory.SIZE))
+            except sqlite3.Error as e:
+                self.status.showMessage(f"Query history unavailable: {e}")
+        return self.history
+
+    def log_history(self, sql, seconds, rows=None, error=None):
+        history = self.query_history()
+        if history is None:
+            return
+        try:
+            history.add(sql, self.db_path, seconds, rows, error or None)
+        except sqlite3.Error as e:
+            # e.g. locked by another manager: the query itself went fine
+            self.status.showMessage(f"Query not logged in the history: {e}")
+
+    def rerun_history(self, sql, database):
+        """Run a logged query or script again, on the database it ran on when it still exists."""
+        if database and database != self.db_path and Path(database).exists():
+            self._connect_db(database)
+        if sql.startswith('.read '):
+            self.execute_script(sql[len('.read '):])
+            return
+        self.ui.query_edit.setPlainText(sql)
+        self.execute_query()
+
+    def show_history(self, slowest=False):
+        """Searchable list of the last runs, or of the queries by slowest run, with Re-run / Edit."""
+        history = self.query_history()
+        if history is None:
+            return
+        dlg = QDialog(self)
+        dlg.setWindowTitle("Slowest Queries" if slowest else "Query History")
+        dlg.resize(1000, 600)
+        layout = QVBoxLayout(dlg)
+        search = QLineEdit(dlg)
+        search.setPlaceholderText("Search the SQL (every word, 3 letters or more for an indexed search)...")
+        search.setClearButtonEnabled(True)
+        layout.addWidget(search)
+        runs = QTreeWidget(dlg)
+        runs.setRootIsDecorated(False)
+        runs.setUniformRowHeights(True)
+        if slowest:
+            runs.setHeaderLabels(["Slowest (s)", "Average (s)", "Runs", "Database", "SQL"])
+        else:
+            runs.setHeaderLabels(["Started", "Seconds", "Rows", "Database", "Error", "SQL"])
+        layout.addWidget(runs)
+
+        def fill():
+            runs.clear()
+            items = []
+            if slowest:
+                for sql, count, longest, average, database in history.slowest(search.text()):
+                    item = QTreeWidgetItem([f"{longest:.3f}", f"{average:.3f}", str(count),
+                                            Path(database).name if database else "", " ".join(sql.split())])
+                    item.setData(0, Qt.ItemDataRole.UserRole, (sql, database))
+                    items.append(item)
+            else:
+                for sql, database, started_at, seconds, rows, error in history.search(search.text()):
+                    item = QTreeWidgetItem([started_at, f"{seconds:.3f}", "" if rows is None else str(rows),
+                                            Path(database).name if database else "", error or "",
+                                            " ".join(sql.split())])
+                    item.setData(0, Qt.ItemDataRole.UserRole, (sql, database))
+                    items.append(item)
+            runs.addTopLevelItems(items)
+            for col in range(runs.columnCount() - 1):
+                runs.resizeColumnToContents(col)
+
+        def selected():
+            item = runs.currentItem()
+            return item.data(0, Qt.ItemDataRole.UserRole) if item is not None else None
+
+        def rerun():
+            entry = selected()
+            if entry is not None:
+                dlg.accept()
+                self.rerun_history(*entry)
+
+        def edit():
+            entry = selected()
+            if entry is not None and not entry[0].startswith('.read '):
+                dlg.accept()
+                self.ui.query_edit.setPlainText(entry[0])
+
+        search.textChanged.connect(fill)
+        runs.itemDoubleClicked.connect(rerun)
+        btns = QDialogButtonBox(QDialogButtonBox.StandardButton.Close)
+        btns.addButton("Re-run", QDialogButtonBox.ButtonRole.ActionRole).clicked.connect(rerun)
+        btns.addButton("Copy to Editor", QDialogButtonBox.ButtonRole.ActionRole).clicked.connect(edit)
+        btns.rejected.connect(dlg.reject)
+        layout.addWidget(btns)
+        fill()
+        dlg.exec()
 
     # ---- Tools ----
-    def execute_script(self):
-        path, _ = QFileDialog.getOpenFileName(self, "SQL Script", "", "SQL Files (*.sql)")
+    def execute_script(self, path=None):
+        if not self.conn:
+            QMessageBox.warning(self, "No Database", "Please open a database first.")
+            return
+        if self.script_runner is not None:
+            QMessageBox.warning(self, "Script", "A script is already running.")
+            return
+        if self.profile['immutable']:
+            QMessageBox.warning(self, "Script", "The database is opened with an immutable (read-only) profile.")
+            return
+        if path is None:
+            path, _ = QFileDialog.getOpenFileName(self, "SQL Script", "",
+                                                  "SQL Files (*.sql *.sql.gz *.sql.zst *.txt);;All Files (*)")
         if not path: return
-        sql = open(path).read()
-        try:
-            self.conn.executescript(sql)
-            self.conn.commit()
+        # an open cursor of the displayed model would lock the database for the script
+        model = self.ui.table_view.model()
+        if isinstance(model, SQLiteModel):
+            model.release()
+        runner = dataTransfer.ScriptRunner(self.db_path, path)
+        self.script_runner = runner
+        self.ui.query_button_cancel.setEnabled(True)
+        name = Path(path).name
+
+        def run(progress):
+            return runner.run(lambda n, fraction, rate: progress(
+                f"Running {name}: {n} statements ({fraction:.0%}, {rate:.0f} statements/s)"))
+
+        def done(stats, error):
+            self.script_runner = None
+            self._update_cancel_button()
             self.load_structure()
-            QMessageBox.information(self, "Script", "Script executed successfully.")
-        except Exception as e:
-            QMessageBox.critical(self, "Error", str(e))
+            stats = runner.stats
+            summary = (f"{stats['statements']} statements in {stats['seconds']:.2f} s "
+                       f"({stats['statements'] / max(stats['seconds'], 1e-9):.0f} statements/s)")
+            self.log_history(f".read {path}", stats['seconds'], stats['statements'],
+                             "Script cancelled" if runner.cancelled else error)
+            if runner.cancelled:
+                self.status.showMessage(f"Script cancelled after {summary}")
+                return
+            if error:
+                self.status.showMessage(f"Script stopped after {summary}")
+                QMessageBox.critical(self, "Error", f"Script failed after {summary}:\n{error}")
+                return
+            self.status.showMessage(f"Script executed: {summary}")
+            slowest = "\n".join(f"{t * 1000:.1f} ms  line {line}: {' '.join(sql.split())[:80]}"
+                                for t, line, sql in stats['slowest'][:5])
+            QMessageBox.information(self, "Script", f"Script executed successfully.\n{summary}\n\n"
+                                                    f"Slowest statements:\n{slowest}")
+
+        self.run_task(run, done)
 
     def generate_er_diagram(self):
         """Génère un diagramme ER Mermaid, l'affiche et propose de l'exporter en .md."""
@@ -821,14 +2448,9 @@ class DBManager(QMainWindow):
             QMessageBox.warning(self, "No Database", "Please open a database first.")
             return
 
-        cur = self.conn.cursor()
         # 1) Tables utilisateur
-        cur.execute(
-            "SELECT name FROM sqlite_master "
-            "WHERE type='table' AND name NOT LIKE 'sqlite_%' "
-            "ORDER BY name"
-        )
-        tables = [row[0] for row in cur.fetchall()]
+        self.schema.refresh(self.conn)
+        tables = self.schema.names('table')
         if not tables:
             QMessageBox.information(self, "ER Diagram", "Aucune table trouvée.")
             return
@@ -837,11 +2459,7 @@ class DBManager(QMainWindow):
         #    tuple: (src_table, dst_table, src_col, dst_col)
         fks = []
         for src in tables:
-            cur.execute(f"PRAGMA foreign_key_list('{src}')")
-            for fk in cur.fetchall():
-                dst = fk[2]      # table référencée
-                col_src = fk[3]  # colonne dans src
-                col_dst = fk[4]  # colonne dans dst
+            for fk_id, dst, col_src, col_dst, *_ in self.schema.objects[src]['foreign_keys']:
                 fks.append((src, dst, col_src, col_dst))
 
         # 3) Construit le bloc Mermaid ER
@@ -849,8 +2467,7 @@ class DBManager(QMainWindow):
         # entités
         for t in tables:
             lines.append(f"    {t} {{")
-            cur.execute(f"PRAGMA table_info('{t}')")
-            for cid, name, ctype, notnull, dflt, pk in cur.fetchall():
+            for cid, name, ctype, notnull, dflt, pk in self.schema.columns(t):
                 pk_mark = " PK" if pk else ""
                 lines.append(f"        {ctype} {name}{pk_mark}")
             lines.append("    }")
@@ -906,6 +2523,194 @@ class DBManager(QMainWindow):
         dlg.resize(600, 500)
         dlg.exec()
 
+    def _advisor_queries(self):
+        """Saved, predefined, recent and profiled queries (name -> SQL), each query once."""
+        sources = []
+        store = self.query_store()
+        if store is not None:
+            sources += [(f"saved: {name}", sql) for name, sql in store.all().items()]
+        sources += [(f"predefined: {name}", sql) for name, sql in PREDEFINED_QUERIES.items()]
+        sources += [(f"recent #{i}", sql) for i, sql in enumerate(reversed(self.recent_queries), 1)]
+        store = ProfileStore(self.db_path)
+        try:
+            sources += [(f"profiled: {name}" if name else f"profiled #{i}", sql)
+                        for i, (sql, name) in enumerate(store.queries(), 1)]
+        finally:
+            store.close()
+        queries, seen = {}, set()
+        for name, sql in sources:
+            key = normalize_sql(sql)
+            if key and key not in seen:
+                seen.add(key)
+                queries[name] = sql
+        return queries
+
+    def index_advisor(self):
+        """Looks for full scans and temp B-trees in the plans of the known queries and proposes indexes."""
+        if not self.conn:
+            QMessageBox.warning(self, "No Database", "Please open a database first.")
+            return
+        if self.advisor is not None:
+            return
+        from IndexAdvisor import IndexAdvisor
+        advisor = IndexAdvisor(self.db_path, self._advisor_queries(), connect=self._entry_connect())
+        self.advisor = advisor
+        self.ui.query_button_cancel.setEnabled(True)
+
+        def done(report, error):
+            self.advisor = None
+            self._update_cancel_button()
+            if error:
+                self.status.showMessage(error)
+                if not advisor.cancelled:
+                    QMessageBox.critical(self, "Error", f"Index advisor failed: {error}")
+                return
+            self.status.showMessage(f"Index advisor: {len(report['indexes'])} indexes proposed "
+                                    f"for {len(report['queries'])} queries")
+            self.show_index_advice(report)
+
+        self.run_task(advisor.run, done)
+
+    def show_index_advice(self, report):
+        dlg = QDialog(self)
+        dlg.setWindowTitle("Index Advisor")
+        dlg.resize(900, 600)
+        layout = QVBoxLayout(dlg)
+        ms = lambda seconds: "" if seconds is None else f"{seconds * 1000:.3f}"
+
+        layout.addWidget(QLabel(
+            "Proposed indexes (latency measured on a scratch copy of the database):"
+            if report['indexes'] else "No index to propose: the plans have no full scan or temp B-tree an index removes."
+        ))
+        by_name = {q['name']: q for q in report['queries']}
+        indexes = QTreeWidget(dlg)
+        indexes.setHeaderLabels(["Index", "Queries", "Before (ms)", "After (ms)"])
+        indexes.setRootIsDecorated(False)
+        items = []
+        for ix in report['indexes']:
+            timed = [by_name[n] for n in ix['queries'] if by_name[n]['before'] is not None]
+            before = sum(q['before'] for q in timed) if timed else None
+            after = sum(q['after'] for q in timed) if timed else None
+            item = QTreeWidgetItem(indexes, [f"{ix['table']} ({', '.join(ix['columns'])})",
+                                             ", ".join(ix['queries']), ms(before), ms(after)])
+            item.setToolTip(0, ix['sql'])
+            item.setCheckState(0, Qt.CheckState.Checked)
+            items.append((item, ix))
+        indexes.resizeColumnToContents(0)
+        layout.addWidget(indexes)
+
+        queries = QTreeWidget(dlg)
+        queries.setHeaderLabels(["Query", "Plan issues", "Indexes", "Before (ms)", "After (ms)"])
+        queries.setRootIsDecorated(False)
+        for q in report['queries']:
+            item = QTreeWidgetItem(queries, [q['name'], q.get('error') or "; ".join(q['issues']),
+                                             ", ".join(q['indexes']), ms(q['before']), ms(q['after'])])
+            item.setToolTip(0, q['sql'])
+        queries.resizeColumnToContents(0)
+        layout.addWidget(QLabel("Analyzed queries:"))
+        layout.addWidget(queries)
+
+        btns = QDialogButtonBox(QDialogButtonBox.StandardButton.Close)
+        apply = btns.addButton("Apply Selected", QDialogButtonBox.ButtonRole.ApplyRole)
+        apply.setEnabled(bool(items))
+
+        def apply_selected():
+            selected = [ix for item, ix in items if item.checkState(0) == Qt.CheckState.Checked]
+            if not selected:
+                return
+            from IndexAdvisor import apply_indexes
+            try:
+                apply_indexes(self.conn, selected)
+            except sqlite3.Error as e:
+                QMessageBox.critical(dlg, "Error", f"Failed to create the indexes:\n{e}")
+                return
+            self.load_structure()
+            self.status.showMessage(f"Created {len(selected)} indexes")
+            dlg.accept()
+
+        apply.clicked.connect(apply_selected)
+        btns.rejected.connect(dlg.reject)
+        layout.addWidget(btns)
+        dlg.exec()
+
+
+    # ---- Recipe search ----
+    def rebuild_recipe_index(self, on_done=None):
+        """Index all the recipes again from their JSON files, in the background."""
+        if self.profile['immutable']:
+            QMessageBox.warning(self, "Recipe Search", "The database is opened with an immutable (read-only) profile.")
+            return
+        path, profile = self.db_path, self.profile
+
+        def rebuild(progress):
+            conn = connect(path, profile)
+            try:
+                return recipeSearch.rebuild_index(conn, progress=progress)
+            finally:
+                conn.close()
+
+        def done(counts, error):
+            self.load_structure()
+            if error:
+                QMessageBox.critical(self, "Error", f"Recipe index failed: {error}")
+                return
+            indexed, missing = counts
+            self.status.showMessage(f"{indexed} recipes indexed" + (f", {missing} JSON files missing" if missing else ""))
+            if on_done is not None:
+                on_done()
+
+        self.run_task(rebuild, done)
+
+    def search_recipes(self):
+        """Full-text search over the names, descriptions, ingredients and steps of the recipes."""
+        if not self.conn:
+            QMessageBox.warning(self, "No Database", "Please open a database first.")
+            return
+        self.load_structure()
+        if 'recipe' not in self.schema.objects:
+            QMessageBox.warning(self, "Recipe Search", f"{self.db_name} has no recipe table.")
+            return
+
+        dlg = QDialog(self)
+        dlg.setWindowTitle("Search Recipes")
+        dlg.resize(800, 600)
+        layout = QVBoxLayout(dlg)
+        search = QLineEdit(dlg)
+        search.setPlaceholderText("Words of the name, description, ingredients or steps...")
+        search.setClearButtonEnabled(True)
+        layout.addWidget(search)
+        results = QTextBrowser(dlg)
+        results.setOpenLinks(False)
+        layout.addWidget(results)
+
+        def fill():
+            if not recipeSearch.has_index(self.conn):
+                results.setHtml("<i>The recipes are not indexed yet: Rebuild Index.</i>")
+                return
+            try:
+                found = recipeSearch.search_recipes(self.conn, search.text())
+            except sqlite3.Error as e:
+                results.setHtml(f"<i>{e}</i>")
+                return
+            results.setHtml("".join(
+                f"<p><a href='recipe:{recipe_id}'><b>{html.escape(name)}</b></a> "
+                f"<small>({-score:.2f})</small><br>{recipeSearch.snippet_html(snippet)}</p>"
+                for recipe_id, name, score, snippet in found) or "<i>No recipe found.</i>")
+
+        def show_recipe(url):
+            dlg.accept()
+            self.ui.query_edit.setPlainText(f"SELECT * FROM recipe WHERE id = {int(url.path())}")
+            self.execute_query()
+
+        search.textChanged.connect(fill)
+        results.anchorClicked.connect(show_recipe)
+        btns = QDialogButtonBox(QDialogButtonBox.StandardButton.Close)
+        btns.addButton("Rebuild Index", QDialogButtonBox.ButtonRole.ActionRole).clicked.connect(
+            lambda: self.rebuild_recipe_index(on_done=fill))
+        btns.rejected.connect(dlg.reject)
+        layout.addWidget(btns)
+        fill()
+        dlg.exec()
 
     def sync_data(self):
         QMessageBox.information(self, "Sync", "Synchronize feature not yet implemented.")
@@ -919,60 +2724,29 @@ class DBManager(QMainWindow):
             QMessageBox.warning(self, "No Database", "Please open a database first.")
             return
 
-        # Choix du fichier .txt
+        # Choix du fichier .txt (éventuellement compressé)
         path, _ = QFileDialog.getSaveFileName(
-            self, "Export SQL Dump", f"{self.db_name}_dump.txt", "Text Files (*.txt)"
+            self, "Export SQL Dump", f"{self.db_name}_dump.txt",
+            "Text Files (*.txt);;Gzip Compressed (*.txt.gz);;Zstandard Compressed (*.txt.zst)"
         )
         if not path:
             return
 
-        try:
-            with open(path, 'w', encoding='utf-8-sig') as f:
-                cursor = self.conn.cursor()
-                # 1) Structure : CREATE statements
-                cursor.execute(
-                    "SELECT type, name, sql FROM sqlite_master "
-                    "WHERE type IN ('table','index','trigger','view') AND sql NOT NULL"
-                )
-                for typ, name, sql in cursor.fetchall():
-                    f.write(f"-- {typ.upper()} {name}\n")
-                    f.write(sql.strip() + ";\n\n")
-
-                # 2) Données : pour chaque table, on émet des INSERT
-                cursor.execute(
-                    "SELECT name FROM sqlite_master WHERE type='table' "
-                    "AND name NOT LIKE 'sqlite_%'"
-                )
-                tables = [r[0] for r in cursor.fetchall()]
-                for tbl in tables:
-                    cursor.execute(f"PRAGMA table_info('{tbl}')")
-                    cols = [col[1] for col in cursor.fetchall()]
-                    col_list = ", ".join(f"\"{c}\"" for c in cols)
-
-                    cursor.execute(f"SELECT * FROM \"{tbl}\"")
-                    rows = cursor.fetchall()
-                    if not rows:
-                        continue
-
-                    f.write(f"-- Dumping data for table {tbl}\n")
-                    for row in rows:
-                        # on prépare chaque valeur pour SQL
-                        vals = []
-                        for v in row:
-                            if v is None:
-                                vals.append("NULL")
-                            elif isinstance(v, (int, float)):
-                                vals.append(str(v))
-                            else:
-                                escaped = str(v).replace("'", "''")
-                                vals.append(f"'{escaped}'")
-                        val_list = ", ".join(vals)
-                        f.write(f"INSERT INTO \"{tbl}\" ({col_list}) VALUES ({val_list});\n")
-                    f.write("\n")
-
-            QMessageBox.information(self, "Export Successful", f"SQL dump saved to:\n{path}")
-        except Exception as e:
-            QMessageBox.critical(self, "Export Failed", f"Error while exporting SQL dump:\n{e}")
+        def dump(progress):
+            dataTransfer.export_sql_dump(self.db_path, path, progress=lambda table, rows, number, count: progress(
+                f"Exporting SQL dump: {table} ({number}/{count}), {rows} rows"), connect=self._read_connect())
+
+        def done(_, error):
+            self.actions['export_dump'].setEnabled(True)
+            if error:
+                self.status.showMessage("SQL dump failed")
+                QMessageBox.critical(self, "Export Failed", f"Error while exporting SQL dump:\n{error}")
+            else:
+                self.status.showMessage(f"SQL dump saved to {path}")
+                QMessageBox.information(self, "Export Successful", f"SQL dump saved to:\n{path}")
+
+        self.actions['export_dump'].setEnabled(False)
+        self.run_task(dump, done)
 
 
 if __name__ == '__main__':
@@ -1,6 +1,7 @@
 import sqlite3
 from tabulate import tabulate
 from predefined_queries import PREDEFINED_QUERIES
+from queryParameters import bind, parameters
 import csv
 
 class DatabaseManager:
@@ -113,24 +114,31 @@ class DatabaseManager:
         except Exception as e:
             return f"Error bulk updating data from {file_path}: {e}"
 
-    def execute_query(self, query):
-        """Run a raw SQL query and return the result."""
+    def execute_query(self, query, params=()):
+        """Run a raw SQL query (with its bound ``params``) and return the result."""
         try:
-            self.cursor.execute(query)
+            self.cursor.execute(query, params)
             rows = self.cursor.fetchall()
             headers = [description[0] for description in self.cursor.description]
             return tabulate(rows, headers=headers, tablefmt="pretty")
         except Exception as e:
             return f"Error executing query: {e}"
 
+    def get_identifiers(self):
+        """Names of the tables, views and columns, the only values accepted for {identifier} parameters."""
+        self.cursor.execute("SELECT m.name, p.name FROM sqlite_master m JOIN pragma_table_info(m.name) p "
+                            "WHERE m.type IN ('table', 'view')")
+        return {name for row in self.cursor.fetchall() for name in row}
+
     def execute_predefined_query(self, query_name, **kwargs):
-        """Run a predefined query by name."""
+        """Run a predefined query by name, with its parameters given as keyword arguments."""
         try:
             query = PREDEFINED_QUERIES.get(query_name)
             if not query:
                 return f"No predefined query found with the name '{query_name}'"
-            query = query.format(**kwargs)  # Format the query with any passed variables
-            return self.execute_query(query)
+            # values are bound, table / column names checked against the schema
+            query, params = bind(query, kwargs, self.get_identifiers())
+            return self.execute_query(query, params)
         except Exception as e:
             return f"Error executing predefined query '{query_name}': {e}"
 
@@ -246,7 +254,8 @@ def main():
         elif choice == '10':
             print(f"Available predefined queries: {list(PREDEFINED_QUERIES.keys())}")
             query_name = input("Enter the predefined query name: ")
-            result = db.execute_predefined_query(query_name)
+            values = {name: input(f"Enter {name}: ") for name, _ in parameters(PREDEFINED_QUERIES.get(query_name, ''))}
+            result = db.execute_predefined_query(query_name, **values)
             print(result)
 
 
@@ -0,0 +1,154 @@
+"""
+Responsive images of the recipes.
+
+Each source image is decoded once (EXIF orientation applied by
+QImageReader.setAutoTransform, at most at the largest width) and written at
+several widths as JPEG and WebP, named after the hash of the source content:
+``<folder>/<hash>-<width>.jpg|.webp``. The sources are processed by a pool of
+processes (QImage works without an application, so the workers only import
+QtGui). The ``image`` table records the size of each image, the hash of its
+source and its variants (JSON, for a srcset); a source whose hash is already
+in the table, with its files still there, is not decoded again.
+"""
+import concurrent.futures
+import hashlib
+import json
+import multiprocessing
+import os
+from pathlib import Path
+from PyQt6.QtCore import Qt
+from PyQt6.QtGui import QImage, QImageReader, QPainter
+
+WIDTHS = (320, 640, 1280)
+FORMATS = (('jpg', 'JPEG', 'image/jpeg'), ('webp', 'WEBP', 'image/webp'))
+QUALITY = 82
+
+# columns added to the image table, see ensure_image_columns
+IMAGE_COLUMNS = {'width': 'INTEGER', 'height': 'INTEGER', 'source_hash': 'TEXT', 'variants': 'TEXT'}
+
+
+def ensure_image_columns(conn):
+    """Add the columns of the pipeline to the ``image`` table (and its index on source_hash) if needed. No commit."""
+    existing = {row[1] for row in conn.execute("PRAGMA table_info(image)")}
+    if not existing:
+        return   # not a recipe database
+    for column, kind in IMAGE_COLUMNS.items():
+        if column not in existing:
+            conn.execute(f"ALTER TABLE image ADD COLUMN {column} {kind}")
+    conn.execute("CREATE INDEX IF NOT EXISTS image_source_hash ON image (source_hash)")
+
+
+def file_hash(path, chunk=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while block := f.read(chunk):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def target_widths(width, widths=WIDTHS):
+    """Widths to write for a source ``width`` px wide: never upscaled, the source width itself if smaller."""
+    kept = [w for w in widths if w < width]
+    return kept + [min(width, max(widths))]
+
+
+def opaque(image):
+    """JPEG has no alpha: transparent images are put on white (instead of black)."""
+    if not image.hasAlphaChannel():
+        return image.convertToFormat(QImage.Format.Format_RGB32)
+    background = QImage(image.size(), QImage.Format.Format_RGB32)
+    background.fill(Qt.GlobalColor.white)
+    painter = QPainter(background)
+    painter.drawImage(0, 0, image)
+    painter.end()
+    return background
+
+
+def process_image(source, folder, url_folder, source_hash, widths=WIDTHS, quality=QUALITY):
+    """
+    Write the variants of ``source`` in ``folder``; return its record:
+    {'url', 'width', 'height', 'source_hash', 'variants': [{'url', 'width', 'height', 'type'}]}.
+    ``url`` (the largest JPEG) is what the site shows by default.
+    """
+    reader = QImageReader(str(source))
+    reader.setAutoTransform(True)
+    size = reader.size()   # as stored: the scaled size applies before the EXIF rotation
+    if size.isValid():
+        width = size.height() if reader.transformation().value & 4 else size.width()   # rotated by 90°
+        if width > max(widths):
+            # decode directly at the largest width (JPEG decodes a smaller size faster)
+            factor = max(widths) / width
+            size.setWidth(round(size.width() * factor))
+            size.setHeight(round(size.height() * factor))
+            reader.setScaledSize(size)
+    image = reader.read()
+    if image.isNull():
+        raise ValueError(f"{source}: {reader.errorString()}")
+    image = opaque(image)
+    stem = source_hash[:16]
+    variants = []
+    for width in sorted(target_widths(image.width(), widths), reverse=True):
+        scaled = image if width == image.width() else image.scaledToWidth(
+            width, Qt.TransformationMode.SmoothTransformation)
+        image = scaled   # the next (smaller) width is scaled from this one
+        for suffix, fmt, mime in FORMATS:
+            name = f"{stem}-{width}.{suffix}"
+            if not scaled.save(str(Path(folder) / name), fmt, quality):
+                raise OSError(f"Can not write {Path(folder) / name}")
+            variants.append({'url': f"{url_folder}/{name}", 'width': scaled.width(),
+                             'height': scaled.height(), 'type': mime})
+    largest = variants[0]
+    return {'url': largest['url'], 'width': largest['width'], 'height': largest['height'],
+            'source_hash': source_hash, 'variants': variants}
+
+
+def known_image(conn, source_hash, root):
+    """Record of an image already processed from the same source content, if its files still exist."""
+    if conn is None:
+        return None
+    row = conn.execute("SELECT url, width, height, variants FROM image WHERE source_hash = ? AND variants IS NOT NULL "
+                       "ORDER BY id DESC LIMIT 1", (source_hash,)).fetchone()
+    if row is None:
+        return None
+    url, width, height, variants = row
+    variants = json.loads(variants)
+    if not all((Path(root) / v['url'].lstrip('/')).exists() for v in variants):
+        return None
+    return {'url': url, 'width': width, 'height': height, 'source_hash': source_hash, 'variants': variants}
+
+
+def save_images(images, root, branch, conn=None, workers=None, widths=WIDTHS, quality=QUALITY):
+    """
+    Process the ``images`` (paths) of a recipe into ``root/branch``; return
+    their records (see process_image) in the same order. ``conn`` is the
+    recipe database, to skip the sources already processed (it must have
+    the columns of ensure_image_columns).
+    """
+    folder = Path(root) / branch
+    folder.mkdir(parents=True, exist_ok=True)
+    url_folder = '/' + Path(branch).as_posix().strip('/')
+    hashes = [file_hash(image) for image in images]
+    records, todo = {}, {}
+    for image, source_hash in zip(images, hashes):
+        if source_hash in records or source_hash in todo:
+            continue   # the same picture twice
+        known = known_image(conn, source_hash, root)
+        if known is not None:
+            records[source_hash] = known
+        else:
+            todo[source_hash] = image
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = max(1, min(workers, len(todo)))
+    if workers == 1:
+        for source_hash, image in todo.items():
+            records[source_hash] = process_image(image, folder, url_folder, source_hash, widths, quality)
+    else:
+        # spawn: forking a process that runs Qt threads is not safe
+        with concurrent.futures.ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+            futures = {source_hash: pool.submit(process_image, str(image), str(folder), url_folder, source_hash,
+                                                widths, quality)
+                       for source_hash, image in todo.items()}
+            for source_hash, future in futures.items():
+                records[source_hash] = future.result()
+    return [records[source_hash] for source_hash in hashes]
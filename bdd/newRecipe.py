@@ -4,116 +4,178 @@ import json
 from PyQt6.QtWidgets import (QApplication, QMainWindow, QLabel, QLineEdit, QPushButton,
                              QVBoxLayout, QWidget, QStatusBar, QMessageBox, QSplitter,
                              QComboBox, QHBoxLayout, QFormLayout, QGroupBox, QTextEdit,
-                             QDateTimeEdit, QFileDialog, QSpinBox, QGridLayout, QScrollArea,
-                             QListView, QFrame)
-from PyQt6.QtCore import Qt, QDateTime, QByteArray, QStringListModel, QSize, pyqtSignal, QMimeData
-from PyQt6.QtGui import QPixmap, QMouseEvent, QCursor, QDrag, QDragEnterEvent, QDragMoveEvent, QDropEvent
+                             QDateTimeEdit, QFileDialog, QSpinBox, QListView, QAbstractItemView,
+                             QStyledItemDelegate, QStyle)
+from PyQt6.QtCore import (Qt, QTimer, QDateTime, QByteArray, QStringListModel, QSize, pyqtSignal, QMimeData,
+                          QAbstractListModel, QModelIndex, QRect, QRectF, QPoint, QEvent)
+from PyQt6.QtGui import QCursor, QColor, QPainter, QDragEnterEvent, QDragMoveEvent, QDropEvent
 from CheckComboBox import CheckComboBox
+from ThumbnailLoader import ThumbnailLoader
+from BackgroundTask import BackgroundTask
+from ConnectionPool import connect, profile_for
+from recipeSearch import has_index, create_index, rebuild_index, index_recipe, search_recipes, snippet_html
+from imagePipeline import ensure_image_columns, save_images as process_images
 from pathlib import Path
+import html
 import json
-import shutil
+import yaml
+
+CONFIG = Path('./') / '.db_manager_config.yaml'
+
+class ImageListModel(QAbstractListModel):
+    """Paths of the selected images; their thumbnails come from a ThumbnailLoader, decoded off the GUI thread."""
+    MIME = "application/x-image-index"
+
+    def __init__(self, images: list[str], loader: ThumbnailLoader, parent=None):
+        super().__init__(parent)
+        self.images = images  # on garde la liste : selected_images de ImageSelectorWidget
+        self.loader = loader
+        loader.loaded.connect(self._on_loaded)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.images)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        if role == Qt.ItemDataRole.DecorationRole:
+            # only asked for the visible cells: None until the thumbnail is decoded
+            return self.loader.get(self.images[index.row()])
+        if role == Qt.ItemDataRole.ToolTipRole:
+            return self.images[index.row()]
+        return None
+
+    def flags(self, index):
+        flags = super().flags(index)
+        return flags | Qt.ItemFlag.ItemIsDragEnabled if index.isValid() else flags | Qt.ItemFlag.ItemIsDropEnabled
+
+    def supportedDragActions(self):
+        return Qt.DropAction.MoveAction | Qt.DropAction.CopyAction
+
+    def mimeTypes(self):
+        return [self.MIME]
+
+    def mimeData(self, indexes):
+        mime = QMimeData()
+        mime.setData(self.MIME, QByteArray(str(indexes[0].row()).encode()))
+        return mime
+
+    def _on_loaded(self, source):
+        for row, path in enumerate(self.images):
+            if path == source:
+                index = self.index(row)
+                self.dataChanged.emit(index, index, [Qt.ItemDataRole.DecorationRole])
+
+    def add(self, paths):
+        if paths:
+            self.beginInsertRows(QModelIndex(), len(self.images), len(self.images) + len(paths) - 1)
+            self.images.extend(paths)
+            self.endInsertRows()
+
+    def remove(self, row):
+        if 0 <= row < len(self.images):
+            self.beginRemoveRows(QModelIndex(), row, row)
+            self.images.pop(row)
+            self.endRemoveRows()
+
+    def move(self, from_index, to_index):
+        """Move an image before the one at ``to_index`` (at the end if past the last one)."""
+        to_index = max(0, min(to_index, len(self.images)))
+        if not 0 <= from_index < len(self.images) or to_index in (from_index, from_index + 1):
+            return
+        self.beginMoveRows(QModelIndex(), from_index, from_index, QModelIndex(), to_index)
+        image = self.images.pop(from_index)
+        self.images.insert(to_index - 1 if to_index > from_index else to_index, image)
+        self.endMoveRows()
+
+    def clear(self):
+        self.beginResetModel()
+        self.images.clear()
+        self.endResetModel()
 
-class ThumbnailWidget(QFrame):
+
+class ThumbnailDelegate(QStyledItemDelegate):
+    """Cell of the image grid: the thumbnail in a rounded frame and a × to remove the image."""
     removed = pyqtSignal(int)
-    drag_start = pyqtSignal(int)
 
-    def __init__(self, index: int, img_path: str, thumb_size: QSize = QSize(100, 100)):
-        super().__init__()
-        self.index = index  # on stocke l'index et pas le path
-        self.img_path = img_path
+    def __init__(self, thumb_size: QSize, parent=None):
+        super().__init__(parent)
         self.thumb_size = thumb_size
-        self.setFixedSize(thumb_size)
-
-        self.setStyleSheet("""
-            QFrame {
-                border: 1px solid #888;
-                border-radius: 6px;
-                background: #fdfdfd;
-            }
-            QFrame:hover {
-                background: #f5f5f5;
-            }
-        """)
-
-        layout = QVBoxLayout(self)
-        layout.setContentsMargins(2, 2, 2, 2)
-        layout.setSpacing(0)
-
-        close_btn = QPushButton("×", self)
-        close_btn.setFixedSize(18, 18)
-        close_btn.setStyleSheet("""
-            QPushButton {
-                background: transparent;
-                color: red;
-                font-weight: bold;
-                border: none;
-                font-size: 14px;
-            }
-        """)
-        close_btn.clicked.connect(lambda: self.removed.emit(self.index))
-
-        top = QHBoxLayout()
-        top.setContentsMargins(0, 0, 0, 0)
-        top.addStretch()
-        top.addWidget(close_btn)
-        layout.addLayout(top)
-
-        pixmap = QPixmap(self.img_path).scaled(
-            self.thumb_size - QSize(4, 4), Qt.AspectRatioMode.KeepAspectRatio,
-            Qt.TransformationMode.SmoothTransformation
-        )
-        label = QLabel()
-        label.setPixmap(pixmap)
-        label.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        layout.addWidget(label, 1)
-
-    def mousePressEvent(self, event: QMouseEvent):
-        if event.button() == Qt.MouseButton.LeftButton:
-            drag = QDrag(self)
-            mime = QMimeData()
-            mime.setData("application/x-image-index", QByteArray(str(self.index).encode()))
-            drag.setMimeData(mime)
-            drag.setPixmap(self.grab())
-            drag.setHotSpot(event.pos())
-            drag.exec(Qt.DropAction.MoveAction)
-            self.drag_start.emit(self.index)
-
-
-class DropGridWidget(QWidget):
-    reordered = pyqtSignal(int, int)  # from_index, to_index
+
+    def sizeHint(self, option, index):
+        return self.thumb_size
+
+    def close_rect(self, rect):
+        return QRect(rect.right() - 19, rect.top() + 2, 18, 18)
+
+    def paint(self, painter, option, index):
+        painter.save()
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        selected = option.state & QStyle.StateFlag.State_Selected
+        hover = option.state & QStyle.StateFlag.State_MouseOver
+        painter.setPen(option.palette.highlight().color() if selected else QColor('#888'))
+        painter.setBrush(QColor('#f5f5f5' if hover else '#fdfdfd'))
+        painter.drawRoundedRect(QRectF(option.rect).adjusted(0.5, 0.5, -0.5, -0.5), 6, 6)
+
+        pixmap = index.data(Qt.ItemDataRole.DecorationRole)
+        if pixmap is not None:
+            target = QRect(QPoint(0, 0), pixmap.deviceIndependentSize().toSize())
+            target.moveCenter(option.rect.center())
+            painter.drawPixmap(target, pixmap)
+
+        font = painter.font()
+        font.setBold(True)
+        font.setPixelSize(14)
+        painter.setFont(font)
+        painter.setPen(QColor('red'))
+        painter.drawText(self.close_rect(option.rect), Qt.AlignmentFlag.AlignCenter, "×")
+        painter.restore()
+
+    def editorEvent(self, event, model, option, index):
+        if (event.type() == QEvent.Type.MouseButtonRelease
+                and self.close_rect(option.rect).contains(event.position().toPoint())):
+            self.removed.emit(index.row())
+            return True
+        return super().editorEvent(event, model, option, index)
+
+
+class ImageGridView(QListView):
+    """Grid of thumbnails: only the visible cells are painted, a resize only lays them out again."""
 
     def __init__(self, thumb_size: QSize, spacing: int):
         super().__init__()
-        self.thumb_size = thumb_size
-        self.spacing = spacing
-        self.setAcceptDrops(True)
+        self.setViewMode(QListView.ViewMode.IconMode)
+        self.setMovement(QListView.Movement.Static)
+        self.setResizeMode(QListView.ResizeMode.Adjust)
+        self.setUniformItemSizes(True)
+        self.setGridSize(thumb_size + QSize(spacing, spacing))
+        self.setSelectionMode(QAbstractItemView.SelectionMode.SingleSelection)
+        self.setDragDropMode(QAbstractItemView.DragDropMode.InternalMove)
+        self.setMouseTracking(True)
 
     def dragEnterEvent(self, event: QDragEnterEvent):
-        if event.mimeData().hasFormat("application/x-image-index"):
+        if event.mimeData().hasFormat(ImageListModel.MIME):
             event.acceptProposedAction()
 
     def dragMoveEvent(self, event: QDragMoveEvent):
         event.acceptProposedAction()
 
     def dropEvent(self, event: QDropEvent):
-        if not event.mimeData().hasFormat("application/x-image-index"):
+        if not event.mimeData().hasFormat(ImageListModel.MIME):
             return
-
-        from_index = int(bytes(event.mimeData().data("application/x-image-index")).decode())
-        pos = event.position().toPoint()
-
-        thumb_w = self.thumb_size.width()
-        thumb_h = self.thumb_size.height()
-        spacing = self.spacing
-        cols = max(1, self.width() // (thumb_w + spacing))
-
-        col = pos.x() // (thumb_w + spacing)
-        row = pos.y() // (thumb_h + spacing)
-        col = min(col, cols - 1)
-
-        to_index = row * cols + col
-        self.reordered.emit(from_index, to_index)
-        event.acceptProposedAction()
+        from_index = int(bytes(event.mimeData().data(ImageListModel.MIME)).decode())
+        target = self.indexAt(event.position().toPoint())
+        to_index = target.row() if target.isValid() else self.model().rowCount()
+        self.model().move(from_index, to_index)
+        # moved by the model: the drag must not end as a move, the view would remove the row
+        event.setDropAction(Qt.DropAction.CopyAction)
+        event.accept()
+
+    def keyPressEvent(self, event):
+        if event.key() in (Qt.Key.Key_Delete, Qt.Key.Key_Backspace) and self.currentIndex().isValid():
+            self.model().remove(self.currentIndex().row())
+            return
+        super().keyPressEvent(event)
 
 
 class ImageSelectorWidget(QWidget):
@@ -131,72 +193,25 @@ class ImageSelectorWidget(QWidget):
         btn.clicked.connect(self.select_images)
         vbox.addWidget(btn)
 
-        # Scroll & content
-        self.scroll = QScrollArea()
-        self.scroll.setWidgetResizable(True)
-        self.content = DropGridWidget(self.thumb_size, spacing=4)
-        self.content_layout = QGridLayout(self.content)
-        self.content_layout.setContentsMargins(0, 0, 0, 0)
-        self.content_layout.setSpacing(4)
-        self.content.setLayout(self.content_layout)
-        self.scroll.setWidget(self.content)
-        vbox.addWidget(self.scroll)
-
-        # signal drag & drop
-        self.content.reordered.connect(self._reorder_image)
+        # decoded in a thread pool at the size of the cells, kept in a pixmap cache by path
+        self.thumbnails = ThumbnailLoader(size=thumb_size - QSize(4, 4), max_items=1024, parent=self)
+        self.model = ImageListModel(self.selected_images, self.thumbnails, self)
+        self.view = ImageGridView(self.thumb_size, spacing=4)
+        self.view.setModel(self.model)
+        delegate = ThumbnailDelegate(self.thumb_size, self.view)
+        delegate.removed.connect(self.model.remove)
+        self.view.setItemDelegate(delegate)
+        vbox.addWidget(self.view)
 
     def select_images(self):
         files, _ = QFileDialog.getOpenFileNames(
             self, "Choisir des images", "", "Images (*.png *.jpg *.jpeg *.bmp *.gif)"
         )
-        if files:
-            self.selected_images.extend(files)
-            self._refresh_grid()
-
-    def _refresh_grid(self):
-        while self.content_layout.count():
-            item = self.content_layout.takeAt(0)
-            if item.widget():
-                item.widget().deleteLater()
-
-        available_width = self.scroll.viewport().width()
-        cols = max(1, available_width // (self.thumb_size.width() + self.content_layout.spacing()))
-
-        for idx, path in enumerate(self.selected_images):
-            row, col = divmod(idx, cols)
-            thumb = ThumbnailWidget(idx, path, self.thumb_size)
-            thumb.removed.connect(self._remove_image_by_index)
-            self.content_layout.addWidget(thumb, row, col)
-
-    def _remove_image_by_index(self, index: int):
-        if 0 <= index < len(self.selected_images):
-            self.selected_images.pop(index)
-            self._refresh_grid()
-
-
-
-    def _remove_image(self, path: str):
-        if path in self.selected_images:
-            self.selected_images.remove(path)
-            self._refresh_grid()
-
-    def _reorder_image(self, from_index: int, to_index: int):
-        if from_index < 0 or from_index >= len(self.selected_images):
-            return
-
-        img = self.selected_images.pop(from_index)
-
-        if to_index > from_index:
-            to_index -= 1
+        self.model.add(files)
 
-        to_index = max(0, min(to_index, len(self.selected_images)))
-        self.selected_images.insert(to_index, img)
-
-        self._refresh_grid()
-
-    def resizeEvent(self, event):
-        super().resizeEvent(event)
-        self._refresh_grid()
+    def clear(self):
+        self.model.clear()
+        self.view.scrollToTop()
 
 class UI:
     def __init__(self, main_window, title, width, height):
@@ -299,6 +314,13 @@ class UI:
         self.name = QLineEdit()
         self.recipe_dtls_layout.addRow(QLabel("Name:"), self.name)
 
+        # existing recipes close to the typed name
+        self.similar = QLabel()
+        self.similar.setWordWrap(True)
+        self.similar.setTextFormat(Qt.TextFormat.RichText)
+        self.recipe_dtls_layout.addRow(QLabel("Similar:"), self.similar)
+        self.name.textChanged.connect(self.main_window.show_similar_recipes)
+
         # time
         self.time = QSpinBox()
         self.time.setMinimum(0)
@@ -394,6 +416,7 @@ class NewRecipe(QMainWindow):
         # parameters
         self.db_path = db_path
         self.conn = None
+        self.tasks = []   # running BackgroundTasks
         self.folder_parent = folder_parent
         self.folder_recipe = folder_recipe
 
@@ -401,7 +424,8 @@ class NewRecipe(QMainWindow):
         self.ui = UI(self, title, width, height)
 
         self._status()
-        self.load_database(path=self.db_path)
+        # the database is read once the window is shown
+        QTimer.singleShot(0, lambda: self.load_database(path=self.db_path))
 
     def _status(self):
         # Status bar
@@ -412,11 +436,55 @@ class NewRecipe(QMainWindow):
         try:
             if self.conn:
                 self.conn.close()
-            self.conn = sqlite3.connect(path)
-            self.status.showMessage(f"Opened {path}")
+            config = yaml.safe_load(CONFIG.read_text()) if CONFIG.exists() else {}
+            name, profile = profile_for(config, path)
+            self.conn = connect(path, profile)
+            with self.conn:
+                ensure_image_columns(self.conn)
+            self.status.showMessage(f"Opened {path} ({name} profile)")
             self.fill_recipe_details()
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Failed to open database: {e}")
+            return
+        try:
+            # full-text index of the recipes, built from the JSON files the first time
+            created = create_index(self.conn)
+        except sqlite3.Error as e:
+            self.status.showMessage(f"Opened {path} ({name} profile), recipe search unavailable: {e}")
+            return
+        if not created:
+            return
+
+        def rebuild(progress):
+            conn = connect(path, profile)   # the window's connection belongs to the GUI thread
+            try:
+                return rebuild_index(conn, progress=progress)
+            finally:
+                conn.close()
+
+        def done(counts, error):
+            if error:
+                self.status.showMessage(f"Opened {path} ({name} profile), recipe search unavailable: {error}")
+                return
+            indexed, missing = counts
+            self.status.showMessage(f"Opened {path} ({name} profile), {indexed} recipes indexed"
+                                    + (f", {missing} JSON files missing" if missing else ""))
+
+        self.run_task(rebuild, done)
+
+    def search_recipes(self, text, limit=20):
+        """Recipes matching ``text``, best first: [(id, name, score, snippet)], see recipeSearch.search_recipes."""
+        if self.conn is None:
+            return []
+        try:
+            return search_recipes(self.conn, text, limit)
+        except sqlite3.Error:
+            return []
+
+    def show_similar_recipes(self, text):
+        results = self.search_recipes(text, limit=3)
+        self.ui.similar.setText("<br>".join(f"<b>{html.escape(name)}</b>: {snippet_html(snippet)}"
+                                            for _, name, _, snippet in results))
 
     def fill_form_with_json_recipe(self):
         path, _ = QFileDialog.getOpenFileName(self, "Select recipe JSON", "", "JSON Files (*.json *.JSON)")
@@ -520,10 +588,24 @@ class NewRecipe(QMainWindow):
         if path_recipe == -1:
             return
 
-        values['images'] = self.save_images(values['images'], to_path_root=Path(__file__).parent.parent,  to_path_branch=f'asset/image/recipe/{values['name'].lower()}')
-
         values['path'] = str(Path(self.folder_parent) / path_recipe)
-        self.insert_recipe_to_db(self.conn, values)
+        if not values['images']:
+            self.insert_recipe_to_db(self.conn, values)
+            return
+
+        # the images are encoded in a background thread, the recipe is inserted once they are written
+        def done(records, error):
+            self.ui.submit.setEnabled(True)
+            self.status.clearMessage()
+            if error:
+                QMessageBox.critical(self, "Error", f"Saving the images failed: {error}")
+                return
+            values['images'] = records
+            self.insert_recipe_to_db(self.conn, values)
+
+        self.ui.submit.setEnabled(False)
+        self.save_images(values['images'], to_path_root=Path(__file__).parent.parent,
+                         to_path_branch=f"asset/image/recipe/{values['name'].lower()}", on_done=done)
 
     def create_recipe(self, name, nb_peoples, ingredients, steps, overwrite=-1):
         """overwrite -1=non, 0=if user agree, 1=yes"""
@@ -572,16 +654,20 @@ class NewRecipe(QMainWindow):
 
             recipe_id = cursor.lastrowid
 
-            # Insert images
-            for image_path in values.get('images', []):
+            # Insert images (records of save_images)
+            for image in values.get('images', []):
                 cursor.execute("""
-                    INSERT INTO image (recipe_id, url, alt_text, created_at)
-                    VALUES (?, ?, ?, ?)
+                    INSERT INTO image (recipe_id, url, alt_text, created_at, width, height, source_hash, variants)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
                 """, (
                     recipe_id,
-                    image_path,
+                    image['url'],
                     f"Image de {values['name']}",
-                    created_at
+                    created_at,
+                    image['width'],
+                    image['height'],
+                    image['source_hash'],
+                    json.dumps(image['variants'])
                 ))
 
             # Insert the tags
@@ -592,6 +678,12 @@ class NewRecipe(QMainWindow):
                         VALUES (?, ?)
                     """, (recipe_id, tag_id))
 
+            # Index the recipe for the full-text search, in the same transaction
+            # (the index is created when the database is opened)
+            if has_index(conn):
+                index_recipe(conn, recipe_id, values['name'].capitalize(), values.get('description', ''),
+                             values['ingredients'], values['steps'])
+
             conn.commit()
             QMessageBox.information(
                 self,
@@ -623,9 +715,8 @@ class NewRecipe(QMainWindow):
         self.ui.ingrdts_model.setStringList([])
         self.ui.steps_model.setStringList([])
 
-        # Clear selected images and refresh the grid
-        self.ui.images.selected_images.clear()
-        self.ui.images._refresh_grid()
+        # Clear selected images
+        self.ui.images.clear()
 
         # Uncheck all tags in CheckComboBoxes
         for row in range(self.ui.categories_layout.rowCount()):
@@ -633,27 +724,39 @@ class NewRecipe(QMainWindow):
             if isinstance(widget, CheckComboBox):
                 widget.clearSelection()
 
-        # Optionally reset the scroll position of the image section
-        self.ui.images.scroll.verticalScrollBar().setValue(0)
-
-    def save_images(self, images, to_path_root, to_path_branch):
-        to_path_root, to_path_branch = Path(to_path_root), Path(to_path_branch)
-        to_path_full = to_path_root / to_path_branch
-        to_path_full.mkdir(parents=True, exist_ok=True)
-
-        img_idx = 0
-        new_paths = []
-        for image in images:
-            new_img_path = to_path_full / f'{img_idx}.jpg'
-
-            while new_img_path.exists():
-                img_idx +=1
-                new_img_path = to_path_full / f'{img_idx}.jpg'
-
-            shutil.copy2(image, new_img_path)
-            new_paths.append(str(to_path_branch / f'{img_idx}.jpg'))
-
-        return new_paths
+    def save_images(self, images, to_path_root, to_path_branch, on_done):
+        """
+        Responsive JPEG/WebP variants of the images, in parallel processes driven
+        from a BackgroundTask; ``on_done(records, error)`` gets their records (see imagePipeline).
+        """
+        db_path = self.db_path if self.conn is not None else None
+
+        def process(progress):
+            progress(f"Processing {len(images)} images...")
+            # the connection of the window belongs to the GUI thread: its own one, to skip the known sources
+            conn = connect(db_path, read_only=True) if db_path else None
+            try:
+                return process_images(images, to_path_root, to_path_branch, conn=conn)
+            finally:
+                if conn is not None:
+                    conn.close()
+
+        return self.run_task(process, on_done)
+
+    def run_task(self, func, on_done):
+        """Run ``func(progress)`` in a BackgroundTask; ``on_done(result, error)`` is called in the GUI thread."""
+        task = BackgroundTask(func, self)
+        task.progress.connect(self.status.showMessage)
+        task.done.connect(on_done)
+        task.finished.connect(lambda: self.tasks.remove(task))
+        self.tasks.append(task)
+        task.start()
+        return task
+
+    def closeEvent(self, event):
+        for task in list(self.tasks):
+            task.wait()
+        super().closeEvent(event)
 
 
 if __name__ == '__main__':
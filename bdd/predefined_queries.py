@@ -1,3 +1,5 @@
+# Values are bound parameters (:name); table and column names are written
+# {name} and checked against the schema before being quoted (see queryParameters).
 PREDEFINED_QUERIES = {
     'list_tags_with_categories': """
         SELECT t.id, t.name, c.id, c.name
@@ -7,7 +9,7 @@ PREDEFINED_QUERIES = {
         ORDER BY c.name, t.name;
     """,
     'count_rows_in_table': """
-        SELECT '{table_name}' AS table_name, COUNT(*) AS total_rows
+        SELECT :table_name AS table_name, COUNT(*) AS total_rows
         FROM {table_name};
     """
 }
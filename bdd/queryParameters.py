@@ -0,0 +1,106 @@
+"""
+Parameters of saved and predefined queries.
+
+Values are bound by SQLite (``:name``, ``@name``, ``$name``, ``?NNN`` or
+``?``), so the text of the statement does not change from one run to the next
+and its prepared statement is reused from the connection's statement cache.
+Identifiers (a table or a column name) can not be bound: they are written
+``{name}`` and only replaced by a quoted name that exists in the schema.
+"""
+import re
+from dataTransfer import quote_ident
+
+# strings, quoted identifiers and comments are skipped, then: value parameter | {identifier}
+TOKENS = re.compile(r"""
+      '(?:[^']|'')*'? | "(?:[^"]|"")*"? | `[^`]*`? | \[[^\]]*\]? | --[^\n]* | /\*.*?(?:\*/|$)
+    | (?P<value>\?\d*|[:@$][A-Za-z_][A-Za-z0-9_]*)
+    | \{(?P<ident>[A-Za-z_][A-Za-z0-9_]*)\}
+""", re.X | re.S)
+
+
+def parameters(sql):
+    """
+    [(name, kind)] of the parameters of ``sql`` in order of first use, ``kind``
+    being 'value' or 'identifier'. Anonymous ``?`` are named by their number
+    ('1', '2'...), like SQLite does.
+    """
+    found = {}
+    number = 0
+    for m in TOKENS.finditer(sql):
+        if m.group('value'):
+            token = m.group('value')
+            if token.startswith('?'):
+                number = int(token[1:]) if len(token) > 1 else number + 1
+                name = str(number)
+            else:
+                name = token[1:]
+            found.setdefault(name, 'value')
+        elif m.group('ident'):
+            # a name used both ways is first of all an identifier (it must be validated)
+            found[m.group('ident')] = 'identifier'
+    return list(found.items())
+
+
+# only numerals written the way SQLite prints numbers: "007", "1_000", "1e3", "nan" or "inf" stay text
+INTEGER = re.compile(r"-?(?:0|[1-9]\d*)")
+REAL = re.compile(r"-?(?:0|[1-9]\d*)\.\d+")
+
+
+def number(text):
+    """``text`` (surrounding spaces ignored) as an int or a float if it is a canonical numeral, else ``text`` itself."""
+    value = text.strip()
+    if INTEGER.fullmatch(value):
+        return int(value)
+    if REAL.fullmatch(value):
+        return float(value)
+    return text
+
+
+def convert(text):
+    """Value typed in a form: NULL, an integer, a real or else the text itself."""
+    if not isinstance(text, str):
+        return text
+    if text.strip().upper() == 'NULL':
+        return None
+    return number(text)
+
+
+def bind_identifiers(sql, values, known):
+    """
+    Replace the ``{name}`` placeholders of ``sql`` with the quoted ``values[name]``.
+
+    ``known`` are the valid identifiers (tables, views, columns of the schema):
+    any other value raises ValueError, so nothing else than a name ever gets
+    into the statement text.
+    """
+    def replace(m):
+        name = m.group('ident')
+        if name is None:
+            return m.group()
+        if name not in values:
+            raise ValueError(f"No value for {{{name}}}")
+        value = str(values[name])
+        if value not in known:
+            raise ValueError(f"Unknown table or column for {{{name}}}: {value!r}")
+        return quote_ident(value)
+    return TOKENS.sub(replace, sql)
+
+
+def bind(sql, values, known=()):
+    """
+    (sql, params) ready for ``execute``: identifiers replaced, values converted
+    and given as a dict (named parameters) or a tuple (``?`` parameters).
+    """
+    params = parameters(sql)
+    sql = bind_identifiers(sql, values, known)
+    missing = [name for name, kind in params if kind == 'value' and name not in values]
+    if missing:
+        raise ValueError(f"No value for {', '.join(missing)}")
+    names = [name for name, kind in parameters(sql)]
+    numbered = [int(name) for name in names if name.isdigit()]
+    if numbered:
+        if len(numbered) != len(names):
+            raise ValueError("Use either named (:name) or numbered (?) parameters, not both")
+        # SQLite binds NULL to the numbers that are not used
+        return sql, tuple(convert(values.get(str(i), 'NULL')) for i in range(1, max(numbered) + 1))
+    return sql, {name: convert(values[name]) for name in names}
@@ -0,0 +1,144 @@
+"""
+Full-text search over the recipes.
+
+The ``recipe_fts`` FTS5 table of the recipe database indexes, for each
+recipe (rowid = recipe.id), its name and description from the ``recipe``
+table and its ingredients and steps from the JSON file ``recipe.url`` points
+to. Triggers keep the name and description in sync (a recipe inserted by
+any program is found by its name at once); ingredients and steps are
+indexed when a recipe is inserted (``index_recipe``, in the transaction of
+the insert) or when the whole index is rebuilt from the files
+(``rebuild_index``). Searches are ranked with bm25, the name weighing most,
+and return highlighted snippets.
+"""
+import html
+import json
+import re
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent   # recipe.url is relative to the site root
+WEIGHTS = (10.0, 4.0, 2.0, 1.0)       # bm25 weight of name, description, ingredients, steps
+MARKS = ('\x02', '\x03')              # around the matched words of the snippets, see snippet_html
+
+SCHEMA = """
+    CREATE VIRTUAL TABLE IF NOT EXISTS recipe_fts
+        USING fts5(name, description, ingredients, steps, tokenize='unicode61 remove_diacritics 2', prefix='2 3');
+"""
+TRIGGERS = """
+    CREATE TRIGGER IF NOT EXISTS recipe_fts_insert AFTER INSERT ON recipe BEGIN
+        INSERT INTO recipe_fts (rowid, name, description, ingredients, steps)
+        VALUES (new.id, new.name, coalesce(new.description, ''), '', '');
+    END;
+    CREATE TRIGGER IF NOT EXISTS recipe_fts_update AFTER UPDATE OF name, description ON recipe BEGIN
+        UPDATE recipe_fts SET name = new.name, description = coalesce(new.description, '') WHERE rowid = new.id;
+    END;
+    CREATE TRIGGER IF NOT EXISTS recipe_fts_delete AFTER DELETE ON recipe BEGIN
+        DELETE FROM recipe_fts WHERE rowid = old.id;
+    END;
+"""
+
+
+def has_index(conn):
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'recipe_fts'").fetchone() is not None
+
+
+def create_index(conn):
+    """Create ``recipe_fts`` and its triggers if needed; return whether it was created (and is empty)."""
+    if has_index(conn):
+        # an index created before the insert trigger existed
+        if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'recipe_fts_insert'").fetchone() is None:
+            conn.executescript(TRIGGERS)
+        return False
+    conn.executescript(SCHEMA + TRIGGERS)
+    # ORDER BY rank then uses the weights, sorted by FTS5 itself
+    with conn:
+        conn.execute("INSERT INTO recipe_fts (recipe_fts, rank) VALUES ('rank', ?)",
+                     (f"bm25({', '.join(map(str, WEIGHTS))})",))
+    return True
+
+
+def recipe_file(url, root=ROOT):
+    """Path of the JSON file of a recipe from its ``url`` ('/bdd/recipes/x.json', 'bdd\\recipes\\x.json')."""
+    return Path(root) / url.replace('\\', '/').lstrip('/')
+
+
+def read_recipe_file(path):
+    """(ingredients, steps) texts of a recipe JSON file, one item per line ('' when missing)."""
+    try:
+        with open(path, 'r', encoding='utf-8-sig') as f:
+            recipe = json.load(f)
+    except (OSError, ValueError):
+        return '', ''
+    return ("\n".join(map(str, recipe.get('ingredients') or [])),
+            "\n".join(map(str, recipe.get('steps') or [])))
+
+
+def index_recipe(conn, recipe_id, name, description, ingredients, steps):
+    """(Re)index one recipe; ``ingredients`` and ``steps`` are lists or texts. No commit."""
+    if not isinstance(ingredients, str):
+        ingredients = "\n".join(map(str, ingredients))
+    if not isinstance(steps, str):
+        steps = "\n".join(map(str, steps))
+    conn.execute("DELETE FROM recipe_fts WHERE rowid = ?", (recipe_id,))
+    conn.execute("INSERT INTO recipe_fts (rowid, name, description, ingredients, steps) VALUES (?, ?, ?, ?, ?)",
+                 (recipe_id, name, description or '', ingredients, steps))
+
+
+def rebuild_index(conn, root=ROOT, progress=None):
+    """
+    Index every recipe again, reading all the JSON files, in one transaction.
+    Return (recipes indexed, recipes whose file is missing or unreadable).
+    """
+    create_index(conn)
+    recipes = conn.execute("SELECT id, name, description, url FROM recipe").fetchall()
+    rows, missing = [], 0
+    for n, (recipe_id, name, description, url) in enumerate(recipes, 1):
+        path = recipe_file(url, root)
+        if not path.exists():
+            missing += 1
+        ingredients, steps = read_recipe_file(path)
+        rows.append((recipe_id, name, description or '', ingredients, steps))
+        if progress and n % 1000 == 0:
+            progress(f"Reading recipes: {n}/{len(recipes)}")
+    with conn:
+        conn.execute("DELETE FROM recipe_fts")
+        conn.executemany("INSERT INTO recipe_fts (rowid, name, description, ingredients, steps) "
+                         "VALUES (?, ?, ?, ?, ?)", rows)
+        # one b-tree segment: the fastest to query
+        conn.execute("INSERT INTO recipe_fts (recipe_fts) VALUES ('optimize')")
+    return len(rows), missing
+
+
+WORDS = re.compile(r"\w+")
+
+
+def match_query(text):
+    """
+    FTS5 query of what a user typed: any of its words, each one also as a
+    prefix (so the last one may be incomplete). bm25 ranks the recipes with
+    the most (and the rarest) of them first.
+    """
+    return " OR ".join(f'"{word}"*' for word in WORDS.findall(text))
+
+
+def search_recipes(conn, text, limit=50, highlight=MARKS, tokens=12):
+    """
+    Recipes matching ``text``, best first: [(id, name, score, snippet)].
+    ``snippet`` is the best passage of any column with the matched words
+    between the two ``highlight`` strings; lower scores are better (bm25).
+    """
+    query = match_query(text)
+    if not query:
+        return []
+    start, end = highlight
+    return conn.execute("""
+        SELECT r.id, r.name, f.rank, snippet(recipe_fts, -1, ?, ?, '…', ?)
+        FROM (SELECT rowid, rank FROM recipe_fts WHERE recipe_fts MATCH ? ORDER BY rank LIMIT ?) f
+        JOIN recipe_fts ON recipe_fts.rowid = f.rowid AND recipe_fts MATCH ?
+        JOIN recipe r ON r.id = f.rowid
+        ORDER BY f.rank""", (start, end, tokens, query, limit, query)).fetchall()
+
+
+def snippet_html(snippet):
+    """Snippet of ``search_recipes`` (default highlight) as HTML, the matched words in bold."""
+    return html.escape(snippet).replace(MARKS[0], '<b>').replace(MARKS[1], '</b>').replace('\n', ' ')
@@ -0,0 +1,195 @@
+"""
+Static data of the site, built from recipe.db.
+
+The browser can not query recipe.db efficiently, so the build exports:
+- ``recipes-<n>``: the recipe listing (name, url, rating, description,
+  time, first image, tag ids, people), ``shard_size`` recipes by id range;
+- ``tags-<category id>``: for each category, its tags with the sorted ids of
+  their recipes (inverted index to filter the listing);
+- ``manifest.json``: the file of each shard, written last, so a reader never
+  sees a manifest pointing to a file that is not written yet.
+
+Shards are compact JSON named after their content hash
+(``recipes-0.1a2b3c4d5e6f.json``), so they can be cached forever, and are
+written with gzip (and brotli when the ``brotli`` package is installed)
+precompressed siblings. The build is incremental: a recipe shard is only
+read again (its JSON files) and written when the fingerprint of its recipes
+(id, updated_at, image, tags, mtime of the JSON file) changed since the
+previous manifest; a shard whose content is unchanged keeps its file. Files
+no longer referenced by the manifest are removed.
+
+    python siteData.py [--db recipe.db] [--out ../data] [--shard-size 200] [--full]
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import time
+from pathlib import Path
+try:
+    import brotli
+except ImportError:
+    brotli = None   # .br copies are skipped (pip install brotli)
+
+ROOT = Path(__file__).parent.parent
+SHARD_SIZE = 200
+RECIPE_COLUMNS = ['id', 'name', 'url', 'rating', 'description', 'time', 'image', 'tags', 'nb_peoples', 'updated_at']
+SHARD_FILE = re.compile(r'^(?:recipes|tags)-\d+\.[0-9a-f]{12}\.json(?:\.gz|\.br)?$')
+
+
+def dumps(content):
+    return json.dumps(content, ensure_ascii=False, separators=(',', ':'), sort_keys=True).encode('utf-8')
+
+
+def fingerprint(value):
+    return hashlib.sha1(dumps(value)).hexdigest()
+
+
+def write_file(path, data):
+    """Write ``data`` and its .gz (and .br) precompressed copies, each one atomically."""
+    outputs = [(path, data), (path.with_name(path.name + '.gz'), gzip.compress(data, 9, mtime=0))]
+    if brotli is not None:
+        outputs.append((path.with_name(path.name + '.br'), brotli.compress(data, quality=11)))
+    for target, content in outputs:
+        tmp = target.with_name(target.name + '.tmp')
+        tmp.write_bytes(content)
+        os.replace(tmp, target)
+
+
+def write_shard(out, name, content):
+    """Write a shard unless a file with the same content exists; return (file name, written)."""
+    data = dumps(content)
+    file = f"{name}.{hashlib.sha256(data).hexdigest()[:12]}.json"
+    if (out / file).exists():
+        return file, False
+    write_file(out / file, data)
+    return file, True
+
+
+def read_people(path):
+    try:
+        with open(path, 'r', encoding='utf-8-sig') as f:
+            return json.load(f).get('nb_peoples')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def recipe_path(url, root):
+    # recipeSearch.recipe_file, with os.path: pathlib is most of a build where nothing changed
+    return os.path.join(root, url.replace('\\', '/').lstrip('/'))
+
+
+def mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def build(db_path, out, root=ROOT, shard_size=SHARD_SIZE, full=False, progress=None):
+    """
+    Build (or update) the site data of ``db_path`` in ``out``.
+    Return the stats: shards written / kept, files removed, seconds.
+    """
+    start = time.perf_counter()
+    out = Path(out)
+    out.mkdir(parents=True, exist_ok=True)
+    manifest_path = out / 'manifest.json'
+    previous = {}
+    if manifest_path.exists() and not full:
+        try:
+            previous = json.loads(manifest_path.read_text(encoding='utf-8'))
+        except ValueError:
+            previous = {}
+        if previous.get('shard_size') != shard_size:
+            previous = {}
+    root = os.fspath(root)
+    stats = {'written': 0, 'kept': 0, 'removed': 0}
+
+    conn = sqlite3.connect(f"file:{Path(db_path).resolve().as_posix()}?mode=ro", uri=True)
+    try:
+        images = {}
+        for recipe_id, url in conn.execute("SELECT recipe_id, url FROM image ORDER BY id DESC"):
+            images[recipe_id] = url   # the first image of each recipe wins
+        tags = {}
+        for recipe_id, tag_id in conn.execute("SELECT recipe_id, tag_id FROM recipeTag ORDER BY recipe_id, tag_id"):
+            tags.setdefault(recipe_id, []).append(tag_id)
+
+        # recipes, by shard of ids
+        shards = {}
+        for row in conn.execute("SELECT id, name, url, rating, description, time, updated_at FROM recipe ORDER BY id"):
+            shards.setdefault(row[0] // shard_size, []).append(row)
+        manifest = {'shard_size': shard_size, 'columns': RECIPE_COLUMNS, 'recipes': {}, 'tags': {}}
+        old_recipes = previous.get('recipes', {})
+        for number, rows in sorted(shards.items()):
+            name = f"recipes-{number}"
+            paths = [recipe_path(url, root) for _, _, url, *_ in rows]
+            mark = fingerprint([[r[0], r[6], images.get(r[0]), tags.get(r[0], []), mtime(p)]
+                                for r, p in zip(rows, paths)] + [rows])
+            old = old_recipes.get(name)
+            if old and old.get('fingerprint') == mark and (out / old['file']).exists():
+                manifest['recipes'][name] = old
+                stats['kept'] += 1
+                continue
+            content = {'columns': RECIPE_COLUMNS,
+                       'rows': [[recipe_id, name_, url, rating, description, minutes, images.get(recipe_id),
+                                 tags.get(recipe_id, []), read_people(path), updated_at]
+                                for (recipe_id, name_, url, rating, description, minutes, updated_at), path
+                                in zip(rows, paths)]}
+            file, written = write_shard(out, name, content)
+            stats['written' if written else 'kept'] += 1
+            manifest['recipes'][name] = {'file': file, 'fingerprint': mark, 'first': rows[0][0],
+                                         'last': rows[-1][0], 'count': len(rows)}
+            if progress:
+                progress(f"Site data: {name} ({len(rows)} recipes)")
+
+        # tag -> recipe ids, one shard per category (cheap to compute: only written when changed)
+        recipes_of = {}
+        for recipe_id, tag_ids in tags.items():
+            for tag_id in tag_ids:
+                recipes_of.setdefault(tag_id, []).append(recipe_id)
+        categories = conn.execute("SELECT id, name, multi_tag FROM category ORDER BY id").fetchall()
+        category_tags = {}
+        for tag_id, category_id, name in conn.execute("SELECT id, category_id, name FROM tag ORDER BY name, id"):
+            category_tags.setdefault(category_id, []).append([tag_id, name, sorted(recipes_of.get(tag_id, []))])
+        for category_id, name, multi_tag in categories:
+            content = {'category': {'id': category_id, 'name': name, 'multi_tag': bool(multi_tag)},
+                       'tags': category_tags.get(category_id, [])}
+            file, written = write_shard(out, f"tags-{category_id}", content)
+            stats['written' if written else 'kept'] += 1
+            manifest['tags'][f"tags-{category_id}"] = {'file': file, 'name': name,
+                                                        'count': len(content['tags'])}
+    finally:
+        conn.close()
+
+    if manifest != previous:
+        write_file(manifest_path, dumps(manifest))
+    # files of the previous builds
+    used = {entry['file'] for group in ('recipes', 'tags') for entry in manifest[group].values()}
+    for path in out.iterdir():
+        if SHARD_FILE.match(path.name) and path.name.split('.json')[0] + '.json' not in used:
+            path.unlink()
+            stats['removed'] += 1
+    stats['seconds'] = time.perf_counter() - start
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the static data of the site from the recipe database.")
+    parser.add_argument('--db', default=str(Path(__file__).parent / 'recipe.db'))
+    parser.add_argument('--out', default=str(ROOT / 'data'))
+    parser.add_argument('--shard-size', type=int, default=SHARD_SIZE)
+    parser.add_argument('--full', action='store_true', help="ignore the previous build")
+    args = parser.parse_args()
+    if brotli is None:
+        print("brotli is not installed: only .gz copies are written (pip install brotli)")
+    stats = build(args.db, args.out, shard_size=args.shard_size, full=args.full, progress=print)
+    print(f"{stats['written']} shards written, {stats['kept']} unchanged, {stats['removed']} old files removed "
+          f"in {stats['seconds']:.2f} s -> {args.out}")
+
+
+if __name__ == '__main__':
+    main()
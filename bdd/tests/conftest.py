@@ -0,0 +1,14 @@
+import os
+import sys
+from pathlib import Path
+import pytest
+
+BDD = Path(__file__).parent.parent
+sys.path.insert(0, str(BDD))   # the modules of bdd are imported by name, as the scripts do
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+
+@pytest.fixture(scope='session')
+def qapp():
+    from PyQt6.QtWidgets import QApplication
+    return QApplication.instance() or QApplication([])
@@ -0,0 +1,41 @@
+import sqlite3
+from functools import partial
+import pytest
+from ConnectionPool import PROFILES, connect
+from IndexAdvisor import IndexAdvisor
+from QueryProfiler import QueryProfiler
+
+JOIN = "SELECT r.name, n.note FROM recipe r JOIN notes.note n ON n.recipe_id = r.id WHERE n.note = 'good'"
+NAMED = "SELECT r.name FROM recipe r WHERE r.name = 'r5' AND EXISTS (SELECT 1 FROM notes.note n WHERE n.recipe_id = r.id)"
+
+
+@pytest.fixture
+def databases(tmp_path):
+    main, notes = tmp_path / 'main.db', tmp_path / 'notes.db'
+    conn = sqlite3.connect(main)
+    conn.execute("CREATE TABLE recipe (id INTEGER PRIMARY KEY, name TEXT)")
+    conn.executemany("INSERT INTO recipe (name) VALUES (?)", [(f"r{i}",) for i in range(200)])
+    conn.commit()
+    conn.close()
+    conn = sqlite3.connect(notes)
+    conn.execute("CREATE TABLE note (recipe_id INTEGER, note TEXT)")
+    conn.executemany("INSERT INTO note VALUES (?, ?)", [(i, 'good' if i % 3 else 'bad') for i in range(1, 201)])
+    conn.commit()
+    conn.close()
+    return main, notes
+
+
+@pytest.mark.parametrize('profile', ['default', 'archive'])
+def test_profile_and_advise_queries_on_attached_databases(databases, profile):
+    main, notes = databases
+    connect_entry = partial(connect, profile=PROFILES[profile], attached={'notes': str(notes)})
+
+    result = QueryProfiler(str(main), JOIN, connect=connect_entry).run()
+    assert result['rows'] == 134
+
+    report = IndexAdvisor(str(main), {'join': JOIN, 'named': NAMED}, connect=connect_entry).run()
+    join, named = report['queries']
+    assert 'error' not in join and 'error' not in named
+    assert join['issues']   # the scan of notes.note, planned on the attached file
+    # timed on the scratch copy, which attaches notes.db too
+    assert named['indexes'] == ['idx_recipe_name'] and named['before'] and named['after']
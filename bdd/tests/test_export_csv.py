@@ -0,0 +1,44 @@
+import csv
+import sqlite3
+import threading
+import time
+import pytest
+from dataTransfer import export_tables_csv
+
+TABLES = ('a', 'b', 'c', 'd')
+
+
+@pytest.mark.parametrize('workers', [1, 4])
+def test_tables_come_from_one_snapshot(tmp_path, workers):
+    """A writer adds one row to every table per commit: all the files must have the same number of rows."""
+    db = tmp_path / 'data.db'
+    conn = sqlite3.connect(db)
+    conn.execute("PRAGMA journal_mode = WAL")
+    for table in TABLES:
+        conn.execute(f"CREATE TABLE {table} (x)")
+        conn.executemany(f"INSERT INTO {table} VALUES (?)", [(i,) for i in range(5000)])
+    conn.commit()
+    conn.close()
+
+    stop = threading.Event()
+
+    def write():
+        writer = sqlite3.connect(db, timeout=30)
+        while not stop.is_set():
+            with writer:
+                for table in TABLES:
+                    writer.execute(f"INSERT INTO {table} VALUES (-1)")
+            time.sleep(0.001)
+        writer.close()
+
+    thread = threading.Thread(target=write)
+    thread.start()
+    try:
+        counts = export_tables_csv(str(db), tmp_path / 'csv', workers=workers)
+    finally:
+        stop.set()
+        thread.join()
+    assert len(set(counts.values())) == 1, counts
+    for table in TABLES:
+        with open(tmp_path / 'csv' / f"{table}.csv", newline='', encoding='utf-8') as f:
+            assert sum(1 for _ in csv.reader(f)) - 1 == counts[table]
@@ -0,0 +1,55 @@
+import sqlite3
+from dataTransfer import import_csv
+
+
+def test_import_keeps_indexes_and_triggers(tmp_path):
+    db = tmp_path / 'data.db'
+    conn = sqlite3.connect(db)
+    conn.executescript("""
+        CREATE TABLE item (name TEXT, price REAL);
+        CREATE INDEX item_name ON item (name);
+        CREATE TABLE log (name TEXT);
+        CREATE TRIGGER item_log AFTER INSERT ON item BEGIN INSERT INTO log VALUES (new.name); END;
+    """)
+    conn.close()
+    csv_path = tmp_path / 'item.csv'
+    csv_path.write_text("name,price\napple,1.5\npear,2\n", encoding='utf-8')
+
+    assert import_csv(str(db), csv_path, 'item') == (2, [])
+    conn = sqlite3.connect(db)
+    try:
+        schema = conn.execute("SELECT type, name FROM sqlite_master WHERE tbl_name = 'item' ORDER BY name").fetchall()
+        assert schema == [('table', 'item'), ('trigger', 'item_log'), ('index', 'item_name')]
+        assert conn.execute("SELECT count(*) FROM log").fetchone()[0] == 0   # not fired by the load
+        conn.execute("INSERT INTO item VALUES ('plum', 3)")
+        assert conn.execute("SELECT name FROM log").fetchall() == [('plum',)]
+    finally:
+        conn.close()
+
+
+def test_import_with_other_columns_leaves_out_what_no_longer_fits(tmp_path):
+    db = tmp_path / 'data.db'
+    conn = sqlite3.connect(db)
+    conn.executescript("""
+        CREATE TABLE t (a, b);
+        CREATE INDEX ia ON t (a);
+        CREATE INDEX ib ON t (b);
+        CREATE TABLE log (x);
+        CREATE TRIGGER t_insert AFTER INSERT ON t BEGIN INSERT INTO log VALUES (new.a); END;
+        CREATE TRIGGER t_update AFTER UPDATE ON t BEGIN INSERT INTO log VALUES (old.b); END;
+    """)
+    conn.close()
+    csv_path = tmp_path / 't.csv'
+    csv_path.write_text("a,c\n1,x\n2,y\n", encoding='utf-8')
+
+    assert import_csv(str(db), csv_path, 't') == (2, ['ib', 't_update'])
+    conn = sqlite3.connect(db)
+    try:
+        assert [r[1] for r in conn.execute("PRAGMA table_info(t)")] == ['a', 'c']
+        names = conn.execute("SELECT name FROM sqlite_master WHERE tbl_name = 't' ORDER BY name").fetchall()
+        assert names == [('ia',), ('t',), ('t_insert',)]
+        conn.execute("INSERT INTO t VALUES (3, 'z')")
+        conn.execute("UPDATE t SET c = 'w' WHERE a = 1")
+        assert conn.execute("SELECT x FROM log").fetchall() == [(3,)]
+    finally:
+        conn.close()
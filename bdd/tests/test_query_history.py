@@ -0,0 +1,38 @@
+from QueryHistory import QueryHistory
+
+
+def test_prune_forgets_texts_and_databases_without_runs(tmp_path):
+    history = QueryHistory(tmp_path / 'history.db', size=2)
+    try:
+        history.add("SELECT * FROM recipe", '/data/old.db', 0.5)
+        history.add("SELECT * FROM tag", '/data/new.db', 0.1)
+        history.add("SELECT * FROM tag", '/data/new.db', 0.2)
+        history.prune()
+        conn = history.conn
+        assert conn.execute("SELECT sql FROM query_text").fetchall() == [('SELECT * FROM tag',)]
+        assert conn.execute("SELECT path FROM history_database").fetchall() == [('/data/new.db',)]
+        if history.fts:
+            assert history.search('recipe') == []
+            assert conn.execute("SELECT count(*) FROM query_fts WHERE query_fts MATCH ?", ('"recipe"',)).fetchone()[0] == 0
+            assert len(history.search('tag')) == 2
+    finally:
+        history.close()
+
+
+def test_runs_are_pruned_while_logging_and_statistics_follow(tmp_path):
+    history = QueryHistory(tmp_path / 'history.db', size=3)
+    history.PRUNE_EVERY = 2
+    try:
+        history.add("SELECT * FROM tag", '/data/a.db', 9.0)
+        history.add("SELECT * FROM tag", '/data/a.db', 1.0)
+        history.add("SELECT * FROM tag", '/data/a.db', 5.0, error="locked")
+        history.add("SELECT * FROM tag", '/data/a.db', 2.0)   # prunes the 9 s run
+        assert history.count() == 3
+        assert history.slowest() == [('SELECT * FROM tag', 2, 2.0, 1.5, '/data/a.db')]
+        history.add("SELECT * FROM recipe", '/data/a.db', 0.5)
+        history.add("SELECT * FROM recipe", '/data/a.db', 0.5)   # prunes the 1 s and failed runs
+        assert history.count() == 3
+        assert history.slowest() == [('SELECT * FROM tag', 1, 2.0, 2.0, '/data/a.db'),
+                                     ('SELECT * FROM recipe', 2, 0.5, 0.5, '/data/a.db')]
+    finally:
+        history.close()
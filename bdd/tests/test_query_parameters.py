@@ -0,0 +1,18 @@
+import pytest
+from queryParameters import convert
+from databaseManager import filter_clause
+
+
+@pytest.mark.parametrize('text, value', [
+    ('0', 0), ('42', 42), ('-7', -7), ('3.5', 3.5), ('-0.25', -0.25), ('NULL', None), (' null ', None),
+    (' 42', 42), ('42\n', 42), (' -1.5 ', -1.5), (' 007 ', ' 007 '),
+    ('007', '007'), ('1_000', '1_000'), ('1e3', '1e3'), ('nan', 'nan'), ('inf', 'inf'), ('1.', '1.'), ('', ''),
+])
+def test_convert_only_canonical_numerals(text, value):
+    result = convert(text)
+    assert result == value and type(result) is type(value)
+
+
+def test_filter_keeps_codes_as_text():
+    assert filter_clause('zip', '= 007') == ('"zip" = ?', ('007',))
+    assert filter_clause('rating', '>= 4.5') == ('"rating" >= ?', (4.5,))
@@ -0,0 +1,30 @@
+import sqlite3
+from recipeSearch import SCHEMA, create_index, index_recipe, search_recipes
+
+
+def recipe_db():
+    conn = sqlite3.connect(':memory:')
+    conn.execute("CREATE TABLE recipe (id INTEGER PRIMARY KEY, name TEXT, description TEXT, url TEXT)")
+    return conn
+
+
+def test_recipes_inserted_by_another_program_are_found():
+    conn = recipe_db()
+    assert create_index(conn)
+    with conn:
+        conn.execute("INSERT INTO recipe (name, description, url) VALUES ('Tarte aux pommes', 'Dessert', 'x.json')")
+    assert [r[1] for r in search_recipes(conn, 'pommes')] == ['Tarte aux pommes']
+    # then completed with the ingredients by index_recipe, without a second row
+    with conn:
+        index_recipe(conn, 1, 'Tarte aux pommes', 'Dessert', ['pâte brisée', 'pommes'], ['cuire'])
+    assert [r[1] for r in search_recipes(conn, 'brisée')] == ['Tarte aux pommes']
+    assert conn.execute("SELECT count(*) FROM recipe_fts").fetchone()[0] == 1
+
+
+def test_insert_trigger_added_to_an_older_index():
+    conn = recipe_db()
+    conn.executescript(SCHEMA)   # an index created without the triggers
+    assert not create_index(conn)
+    with conn:
+        conn.execute("INSERT INTO recipe (name, url) VALUES ('Soupe', 'y.json')")
+    assert [r[1] for r in search_recipes(conn, 'soupe')] == ['Soupe']
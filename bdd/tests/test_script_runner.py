@@ -0,0 +1,36 @@
+import sqlite3
+from dataTransfer import ScriptRunner, iter_statements
+
+
+def test_block_comments_before_statements(tmp_path):
+    """A block comment before BEGIN / VACUUM / ATTACH must not make the runner wrap them in its own batch."""
+    other = tmp_path / 'other.db'
+    sqlite3.connect(other).close()
+    script = tmp_path / 'dump.sql'
+    script.write_text("/* dump */ BEGIN TRANSACTION;\n"
+                      "CREATE TABLE t (x);\n"
+                      "INSERT INTO t VALUES (1);\n"
+                      "/* several\n   lines */\n"
+                      "INSERT INTO t VALUES (2);\n"
+                      "COMMIT;\n"
+                      "/* */ VACUUM;\n"
+                      f"/* */ ATTACH '{other.as_posix()}' AS other;\n"
+                      "-- */ DETACH other;\n"
+                      "DETACH other;\n", encoding='utf-8')
+    db = tmp_path / 'target.db'
+    stats = ScriptRunner(str(db), script).run()
+    assert stats['statements'] == 8
+    conn = sqlite3.connect(db)
+    try:
+        assert conn.execute("SELECT x FROM t ORDER BY x").fetchall() == [(1,), (2,)]
+    finally:
+        conn.close()
+
+
+def test_statement_lines_skip_block_comments():
+    lines = ["/* header */\n", "SELECT 1;\n", "/* a\n", "b */ SELECT 2; /* c */ SELECT 3;\n"]
+    assert list(iter_statements(lines)) == [(2, 'SELECT 1;'), (4, 'SELECT 2;'), (4, 'SELECT 3;')]
+    # comments after the last statement are not a statement
+    lines = ['SELECT 1; -- done\n', 'SELECT 2;\n', '/* end */\n']
+    assert list(iter_statements(lines)) == [(1, 'SELECT 1;'), (2, 'SELECT 2;')]
+    assert list(iter_statements(['SELECT 1; -- note'])) == [(1, 'SELECT 1;')]
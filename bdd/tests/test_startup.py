@@ -0,0 +1,37 @@
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+import pytest
+
+BDD = Path(__file__).parent.parent
+
+# budgets of a cold start, in ms: measured medians (manager / recipe window) of about 48 / 32 ms to import
+# and 90 / 95 ms to the first frame, plus a margin for slower machines
+IMPORT_BUDGET = 100
+FIRST_FRAME_BUDGET = 200
+RUNS = 3
+
+
+def startup(gui, *args):
+    """Median of RUNS ``benchmark.py _startup-run`` runs, each in a fresh interpreter."""
+    env = dict(os.environ, QT_QPA_PLATFORM='offscreen')
+    runs = []
+    for _ in range(RUNS):
+        out = subprocess.run([sys.executable, str(BDD / 'benchmark.py'), '_startup-run', gui, *args],
+                             capture_output=True, text=True, env=env, timeout=120, check=True)
+        runs.append(json.loads(out.stdout.strip().splitlines()[-1]))
+    return {key: statistics.median(r[key] for r in runs) for key in runs[0]}
+
+
+@pytest.mark.parametrize('gui', ['manager', 'recipe'])
+def test_startup_budget(gui, tmp_path):
+    # the recipe window adds its columns to the database it opens: not to the one of the repository
+    db = tmp_path / 'recipe.db'
+    shutil.copy(BDD / 'recipe.db', db)
+    result = startup(gui, '--db', str(db))
+    assert result['import ms'] < IMPORT_BUDGET, result
+    assert result['first frame ms'] < FIRST_FRAME_BUDGET, result
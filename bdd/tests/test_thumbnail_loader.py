@@ -0,0 +1,58 @@
+import threading
+import time
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from PyQt6.QtCore import Qt
+from PyQt6.QtGui import QImage
+from ThumbnailLoader import ThumbnailLoader
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def image_server(tmp_path):
+    """Local stand-in for an image host, serving a 300x200 photo.png on a free port."""
+    www = tmp_path / 'www'
+    www.mkdir()
+    image = QImage(300, 200, QImage.Format.Format_RGB32)
+    image.fill(Qt.GlobalColor.red)
+    assert image.save(str(www / 'photo.png'))
+    server = ThreadingHTTPServer(('127.0.0.1', 0), partial(QuietHandler, directory=str(www)))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server, f"http://127.0.0.1:{server.server_address[1]}/photo.png"
+    server.shutdown()
+    server.server_close()
+
+
+def wait_loaded(qapp, loader, source, timeout=10):
+    loaded = []
+    loader.loaded.connect(loaded.append)
+    assert loader.get(source) is None
+    deadline = time.monotonic() + timeout
+    while source not in loaded and time.monotonic() < deadline:
+        qapp.processEvents()
+        time.sleep(0.01)
+    assert source in loaded, f"{source} not loaded in {timeout} s"
+    return loader.get(source)
+
+
+def test_url_thumbnail_then_disk_cache(qapp, tmp_path, image_server):
+    server, url = image_server
+    cache = tmp_path / 'cache'
+
+    pixmap = wait_loaded(qapp, ThumbnailLoader(size=64, cache_dir=cache), url)
+    assert pixmap is not None
+    assert 0 < pixmap.width() <= 64 and 0 < pixmap.height() <= 64
+    assert list(cache.glob('*.png'))
+
+    # a new loader (empty memory cache) without the server: only the disk cache can have it
+    server.shutdown()
+    server.server_close()
+    cached = wait_loaded(qapp, ThumbnailLoader(size=64, cache_dir=cache), url)
+    assert cached is not None
+    assert cached.size() == pixmap.size()